@@ -0,0 +1,179 @@
+"""Global in-flight payload byte budget shared by the MCP server and the plugin proxy.
+
+Each request estimates how many bytes it will hold in memory (base64 input, JSON
+request body, downloaded bytes) and reserves them before doing the work. When the
+budget is exhausted new requests wait in FIFO order, and are rejected with
+`BudgetExceeded` if nothing frees up within the wait limit. A request that fits in
+what is free may go ahead of a larger one at the head of the queue, but only
+`max_bypass` times before the head request is granted, so it can't be starved.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Tuple
+
+DEFAULT_LIMIT_BYTES = int(os.getenv("TWEEKIT_PAYLOAD_BUDGET_BYTES", str(512 * 1024 * 1024)))
+DEFAULT_WAIT_SECONDS = float(os.getenv("TWEEKIT_PAYLOAD_BUDGET_WAIT_SECONDS", "10"))
+DEFAULT_MAX_BYPASS = int(os.getenv("TWEEKIT_PAYLOAD_BUDGET_MAX_BYPASS", "16"))
+
+
+class BudgetExceeded(Exception):
+    """Raised when a reservation cannot be granted within the wait limit."""
+
+
+class ByteBudget:
+    """FIFO byte semaphore with bounded queue-jumping. A limit of 0 or less disables accounting entirely."""
+
+    def __init__(
+        self,
+        limit_bytes: int = DEFAULT_LIMIT_BYTES,
+        wait_seconds: float = DEFAULT_WAIT_SECONDS,
+        on_change: Optional[Callable[[Dict[str, Any]], None]] = None,
+        max_bypass: int = DEFAULT_MAX_BYPASS,
+    ) -> None:
+        self.limit_bytes = limit_bytes
+        self.wait_seconds = wait_seconds
+        self.max_bypass = max_bypass
+        self._on_change = on_change
+        self._used = 0
+        self._rejected = 0
+        self._bypassed = 0  # grants that went ahead of the current head waiter
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+
+    @property
+    def used_bytes(self) -> int:
+        return self._used
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limitBytes": self.limit_bytes,
+            "usedBytes": self._used,
+            "waiting": len(self._waiters),
+            "rejected": self._rejected,
+        }
+
+    def _changed(self) -> None:
+        if self._on_change is not None:
+            self._on_change(self.snapshot())
+
+    def _reject(self, message: str) -> BudgetExceeded:
+        self._rejected += 1
+        self._changed()
+        return BudgetExceeded(message)
+
+    def _fits(self, nbytes: int) -> bool:
+        return self._used + nbytes <= self.limit_bytes
+
+    def _wake(self) -> None:
+        while self._waiters:
+            nbytes, future = self._waiters[0]
+            if not future.done():
+                if not self._fits(nbytes):
+                    break
+                self._used += nbytes
+                future.set_result(None)
+            self._waiters.popleft()
+            self._bypassed = 0
+        # The head doesn't fit; smaller waiters behind it may go first, up to the limit.
+        for entry in list(self._waiters)[1:]:
+            if self._bypassed >= self.max_bypass:
+                break
+            nbytes, future = entry
+            if not future.done() and self._fits(nbytes):
+                self._waiters.remove(entry)
+                self._used += nbytes
+                self._bypassed += 1
+                future.set_result(None)
+        self._changed()
+
+    async def acquire(self, nbytes: int) -> None:
+        if self.limit_bytes <= 0 or nbytes <= 0:
+            return
+        if nbytes > self.limit_bytes:
+            raise self._reject(f"request needs {nbytes} bytes but the payload budget is {self.limit_bytes} bytes")
+        if self._fits(nbytes) and (not self._waiters or self._bypassed < self.max_bypass):
+            if self._waiters:
+                self._bypassed += 1
+            self._used += nbytes
+            self._changed()
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (nbytes, future)
+        self._waiters.append(entry)
+        self._changed()
+        try:
+            await asyncio.wait_for(future, timeout=self.wait_seconds)
+        except BaseException as exc:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled; hand the bytes back.
+                self.release(nbytes)
+            else:
+                if self._waiters and self._waiters[0] is entry:
+                    self._bypassed = 0
+                with contextlib.suppress(ValueError):
+                    self._waiters.remove(entry)
+                self._wake()
+            if isinstance(exc, asyncio.TimeoutError):
+                raise self._reject(
+                    f"timed out after {self.wait_seconds:g}s waiting for {nbytes} bytes "
+                    f"({self._used} of {self.limit_bytes} bytes in use)"
+                ) from None
+            raise
+
+    def release(self, nbytes: int) -> None:
+        if self.limit_bytes <= 0 or nbytes <= 0:
+            return
+        self._used = max(0, self._used - nbytes)
+        self._wake()
+
+    @contextlib.asynccontextmanager
+    async def reserve(self, nbytes: int = 0) -> AsyncIterator["Reservation"]:
+        """Hold a reservation for the duration of the block; it can grow once sizes are known."""
+        reservation = Reservation(self)
+        try:
+            if nbytes:
+                await reservation.resize(nbytes)
+            yield reservation
+        finally:
+            reservation.release()
+
+
+class Reservation:
+    """Bytes held against a `ByteBudget` by a single request."""
+
+    def __init__(self, budget: ByteBudget) -> None:
+        self._budget = budget
+        self.held_bytes = 0
+
+    async def resize(self, nbytes: int) -> None:
+        if nbytes > self.held_bytes:
+            await self._budget.acquire(nbytes - self.held_bytes)
+        elif nbytes < self.held_bytes:
+            self._budget.release(self.held_bytes - nbytes)
+        self.held_bytes = nbytes
+
+    def release(self) -> None:
+        self._budget.release(self.held_bytes)
+        self.held_bytes = 0
+
+
+def estimate_base64_request_bytes(blob_length: int) -> int:
+    """Memory held by a base64 payload plus the JSON body that embeds it."""
+    return 2 * blob_length
+
+
+def estimate_download_request_bytes(content_length: int) -> int:
+    """Memory held by downloaded bytes, their base64 encoding and the JSON body."""
+    return content_length + 2 * estimate_base64_length(content_length)
+
+
+def estimate_base64_length(nbytes: int) -> int:
+    return 4 * ((nbytes + 2) // 3)
+
+
+def estimate_decoded_length(base64_length: int) -> int:
+    return base64_length * 3 // 4
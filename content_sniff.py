@@ -0,0 +1,222 @@
+"""Identify a file's type from its leading bytes.
+
+Used by the server to pick the input extension for downloads whose URL and
+`Content-Type` are missing or wrong, and by `scripts/run_mcp_e2e.py` for test files
+without a suffix. Only confident answers are returned: generic ZIP archives and
+OLE compound files whose streams aren't in the sniffed bytes give None, so the
+caller falls back to its other hints. `image_size` reads the dimensions of common
+raster formats, including TIFF, from their headers.
+"""
+from __future__ import annotations
+
+import struct
+from typing import Dict, FrozenSet, Optional, Tuple
+
+# Enough for every signature below, including the part names near the start of an
+# Office Open XML or OpenDocument archive.
+SNIFF_BYTES = 64 * 1024
+
+_PREFIXES = (
+    (b"%PDF-", "pdf"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"II*\x00", "tiff"),
+    (b"MM\x00*", "tiff"),
+    (b"8BPS\x00\x01", "psd"),
+    (b"8BPS\x00\x02", "psb"),
+    (b"\x00\x00\x01\x00", "ico"),
+    (b"\x00\x00\x00\x0cjP  \r\n\x87\n", "jp2"),
+    (b"%!PS-Adobe-", "eps"),
+    (b"\xc5\xd0\xd3\xc6", "eps"),
+    (b"{\\rtf", "rtf"),
+)
+
+_FTYP_BRANDS = {
+    b"heic": "heic",
+    b"heix": "heic",
+    b"heim": "heic",
+    b"heis": "heic",
+    b"hevc": "heic",
+    b"hevx": "heic",
+    b"avif": "avif",
+    b"avis": "avif",
+    b"qt  ": "mov",
+    b"isom": "mp4",
+    b"iso2": "mp4",
+    b"mp41": "mp4",
+    b"mp42": "mp4",
+    b"M4V ": "m4v",
+    b"crx ": "cr3",
+}
+
+# Generic HEIF brands, used as the major brand by both HEIC and AVIF files.
+_GENERIC_HEIF_BRANDS = frozenset({b"mif1", b"msf1"})
+
+_OPENDOCUMENT = {
+    b"application/vnd.oasis.opendocument.text": "odt",
+    b"application/vnd.oasis.opendocument.spreadsheet": "ods",
+    b"application/vnd.oasis.opendocument.presentation": "odp",
+    b"application/vnd.oasis.opendocument.graphics": "odg",
+}
+_OFFICE_OPEN_XML = ((b"word/", "docx"), (b"xl/", "xlsx"), (b"ppt/", "pptx"), (b"visio/", "vsdx"))
+# Stream names (UTF-16LE) in the directory of an OLE compound file.
+_OLE_STREAMS = (
+    ("WordDocument", "doc"),
+    ("Workbook", "xls"),
+    ("Book", "xls"),
+    ("PowerPoint Document", "ppt"),
+    ("VisioDocument", "vsd"),
+)
+
+# Extensions whose files carry another format's signature. A path or caller that
+# names one of these is more specific than the sniffed type, so it is kept.
+_VARIANTS: Dict[str, FrozenSet[str]] = {
+    "pdf": frozenset({"ai"}),
+    "eps": frozenset({"ps", "ai"}),
+    "jpg": frozenset({"jpeg", "jpe", "jfif"}),
+    "tiff": frozenset({"tif", "dng", "nef", "cr2", "arw", "fff", "3fr", "orf", "pef", "srw", "rw2", "erf", "iiq"}),
+    "heic": frozenset({"heif"}),
+    "docx": frozenset({"docm", "dotx", "dotm"}),
+    "xlsx": frozenset({"xlsm", "xltx", "xltm"}),
+    "pptx": frozenset({"pptm", "potx", "potm", "ppsx", "ppsm"}),
+    "doc": frozenset({"dot"}),
+    "xls": frozenset({"xlt"}),
+    "ppt": frozenset({"pot", "pps"}),
+    "mp4": frozenset({"m4v", "m4a"}),
+}
+
+
+def _sniff_text(head: bytes) -> Optional[str]:
+    text = head[:1024].lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if text.startswith((b"<!doctype html", b"<html")):
+        return "html"
+    if text.startswith(b"<svg") or (text.startswith(b"<?xml") and b"<svg" in text):
+        return "svg"
+    return None
+
+
+def _ftyp_extension(head: bytes) -> Optional[str]:
+    major = head[8:12]
+    if major not in _GENERIC_HEIF_BRANDS:
+        return _FTYP_BRANDS.get(major)
+    # mif1/msf1 only say "HEIF"; the compatible brands name the codec.
+    box_size = min(int.from_bytes(head[:4], "big"), len(head))
+    compatible = {head[start:start + 4] for start in range(16, box_size - 3, 4)}
+    if compatible & {b"avif", b"avis"}:
+        return "avif"
+    return "heic"
+
+
+def sniff_extension(head: bytes) -> Optional[str]:
+    """Return the extension for the format `head` (the first bytes of a file) is in, or None."""
+    for prefix, extension in _PREFIXES:
+        if head.startswith(prefix):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[:2] == b"BM" and len(head) >= 14 and head[6:10] == b"\x00\x00\x00\x00":
+        return "bmp"
+    if head[4:8] == b"ftyp":
+        return _ftyp_extension(head)
+    if head.startswith(b"PK\x03\x04"):
+        if head[30:38] == b"mimetype":
+            for mimetype, extension in _OPENDOCUMENT.items():
+                if mimetype in head[38:200]:
+                    return extension
+        for marker, extension in _OFFICE_OPEN_XML:
+            if marker in head:
+                return extension
+        return None
+    if head.startswith(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"):
+        for name, extension in _OLE_STREAMS:
+            if name.encode("utf-16-le") + b"\x00\x00" in head:
+                return extension
+        return None
+    return _sniff_text(head)
+
+
+def matches(extension: str, sniffed: str) -> bool:
+    """Whether a file named with `extension` may carry the `sniffed` signature."""
+    return extension == sniffed or extension in _VARIANTS.get(sniffed, frozenset())
+
+
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    pos = 2
+    while pos + 9 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker in _JPEG_SOF:
+            height, width = struct.unpack(">HH", data[pos + 5:pos + 9])
+            return width, height
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            pos += 2
+            continue
+        pos += 2 + struct.unpack(">H", data[pos + 2:pos + 4])[0]
+    return None
+
+
+def _tiff_size(data: bytes) -> Optional[Tuple[int, int]]:
+    # Only the first IFD is read, so it has to be within `data`.
+    order = "<" if data[:2] == b"II" else ">"
+    offset = struct.unpack(order + "I", data[4:8])[0]
+    if offset + 2 > len(data):
+        return None
+    count = struct.unpack(order + "H", data[offset:offset + 2])[0]
+    dimensions: Dict[int, int] = {}
+    for start in range(offset + 2, offset + 2 + 12 * count, 12):
+        entry = data[start:start + 12]
+        if len(entry) < 12:
+            return None
+        tag, field_type = struct.unpack(order + "HH", entry[:4])
+        if tag in (256, 257):
+            # SHORT values sit in the first two bytes of the value field, LONG ones fill it.
+            if field_type == 3:
+                dimensions[tag] = struct.unpack(order + "H", entry[8:10])[0]
+            else:
+                dimensions[tag] = struct.unpack(order + "I", entry[8:12])[0]
+    if 256 not in dimensions or 257 not in dimensions:
+        return None
+    return dimensions[256], dimensions[257]
+
+
+def image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """Width and height of a PNG, GIF, BMP, WebP, JPEG or TIFF image from its headers, or None."""
+    if data.startswith(b"\x89PNG\r\n\x1a\n") and data[12:16] == b"IHDR":
+        return struct.unpack(">II", data[16:24])
+    if data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        return struct.unpack("<HH", data[6:10])
+    if data[:2] == b"BM" and len(data) >= 26:
+        width, height = struct.unpack("<ii", data[18:26])
+        return width, abs(height)
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP" and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b"VP8 ":
+            width, height = struct.unpack("<HH", data[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b"VP8L":
+            bits = int.from_bytes(data[21:25], "little")
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8X":
+            return int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+        return None
+    if data.startswith(b"\xff\xd8\xff"):
+        return _jpeg_size(data)
+    if data[:4] in (b"II*\x00", b"MM\x00*") and len(data) >= 8:
+        return _tiff_size(data)
+    return None
+
+
+def png_has_alpha(data: bytes) -> bool:
+    """Whether a PNG has an alpha channel or a transparency chunk."""
+    if not data.startswith(b"\x89PNG\r\n\x1a\n") or len(data) < 26:
+        return False
+    return data[25] in (4, 6) or b"tRNS" in data[:data.find(b"IDAT")]
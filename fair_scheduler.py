@@ -0,0 +1,158 @@
+"""Weighted fair sharing of upstream conversion slots between TweekIT API keys.
+
+A fixed number of conversions may run against TweekIT at once. When they are all
+busy, callers queue and each freed slot goes to the waiter with the lowest virtual
+finish time (start-time fair queueing): every job advances its key's virtual time
+by `cost / weight`, so a key with hundreds of queued jobs takes turns with a key
+that has one instead of everyone waiting behind it in arrival order. Waiters give
+up with `SchedulerTimeout` if no slot is granted within the wait limit.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import os
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_MAX_CONCURRENT = int(os.getenv("TWEEKIT_CONVERT_CONCURRENCY", "32"))
+DEFAULT_WAIT_SECONDS = float(os.getenv("TWEEKIT_CONVERT_QUEUE_WAIT_SECONDS", "30"))
+
+
+class SchedulerTimeout(Exception):
+    """Raised when a caller is not granted a slot within the wait limit."""
+
+
+def parse_weights(value: Optional[str]) -> Dict[str, float]:
+    """Parse `key=weight,key=weight`; malformed or non-positive entries are ignored."""
+    weights: Dict[str, float] = {}
+    for part in (value or "").split(","):
+        key, _, weight = part.strip().rpartition("=")
+        try:
+            parsed = float(weight)
+        except ValueError:
+            continue
+        if key and parsed > 0:
+            weights[key] = parsed
+    return weights
+
+
+class FairScheduler:
+    """Concurrency limit shared fairly between keys. A limit of 0 or less disables it."""
+
+    def __init__(
+        self,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+        wait_seconds: float = DEFAULT_WAIT_SECONDS,
+        weights: Optional[Dict[str, float]] = None,
+        on_change: Optional[Callable[[Dict[str, Any]], None]] = None,
+        on_wait: Optional[Callable[[str, float], None]] = None,
+    ) -> None:
+        self.max_concurrent = max_concurrent
+        self.wait_seconds = wait_seconds
+        self.weights = dict(weights or {})
+        self._on_change = on_change
+        self._on_wait = on_wait
+        self._active = 0
+        self._rejected = 0
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+        self._waiting: Dict[str, int] = {}
+        self._queue: List[Tuple[float, int, float, str, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "maxConcurrent": self.max_concurrent,
+            "active": self._active,
+            "waiting": sum(self._waiting.values()),
+            "waitingByKey": dict(self._waiting),
+            "rejected": self._rejected,
+        }
+
+    def _changed(self) -> None:
+        if self._on_change is not None:
+            self._on_change(self.snapshot())
+
+    def _tags(self, key: str, cost: float) -> Tuple[float, float]:
+        start = max(self._virtual_time, self._last_finish.get(key, 0.0))
+        finish = start + cost / self.weights.get(key, 1.0)
+        self._last_finish[key] = finish
+        return start, finish
+
+    def _advance(self, start: float) -> None:
+        self._virtual_time = max(self._virtual_time, start)
+        # Keys that have caught up with the clock carry no history worth keeping.
+        for key in [key for key, finish in self._last_finish.items() if finish <= self._virtual_time]:
+            del self._last_finish[key]
+
+    def _dequeued(self, key: str) -> None:
+        self._waiting[key] -= 1
+        if not self._waiting[key]:
+            del self._waiting[key]
+
+    def _wake(self) -> None:
+        while self._queue and self._active < self.max_concurrent:
+            _, _, start, key, future = heapq.heappop(self._queue)
+            if future.done():
+                continue
+            self._dequeued(key)
+            self._active += 1
+            self._advance(start)
+            future.set_result(None)
+        self._changed()
+
+    async def acquire(self, key: str, cost: float = 1.0) -> None:
+        if self.max_concurrent <= 0:
+            return
+        started = time.perf_counter()
+        start, finish = self._tags(key, cost)
+        if not self._queue and self._active < self.max_concurrent:
+            self._active += 1
+            self._advance(start)
+            self._changed()
+            if self._on_wait is not None:
+                self._on_wait(key, 0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (finish, next(self._sequence), start, key, future))
+        self._waiting[key] = self._waiting.get(key, 0) + 1
+        self._changed()
+        try:
+            await asyncio.wait_for(future, timeout=self.wait_seconds)
+        except BaseException as exc:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled; hand the slot back.
+                self.release()
+            else:
+                future.cancel()
+                self._dequeued(key)
+                self._wake()
+            if isinstance(exc, asyncio.TimeoutError):
+                self._rejected += 1
+                self._changed()
+                raise SchedulerTimeout(
+                    f"timed out after {self.wait_seconds:g}s waiting for one of "
+                    f"{self.max_concurrent} conversion slots"
+                ) from None
+            raise
+        if self._on_wait is not None:
+            self._on_wait(key, time.perf_counter() - started)
+
+    def release(self) -> None:
+        if self.max_concurrent <= 0:
+            return
+        self._active = max(0, self._active - 1)
+        self._wake()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, key: str, cost: float = 1.0) -> AsyncIterator[None]:
+        """Hold one slot for the duration of the block."""
+        await self.acquire(key, cost)
+        try:
+            yield
+        finally:
+            self.release()
@@ -0,0 +1,202 @@
+"""Private HTTP response cache used by the `fetch` tool, following RFC 9111.
+
+Responses are stored only when the origin allows it (no `no-store`, no `Vary: *`),
+served while fresh according to `Cache-Control: max-age`, `Expires` or a heuristic
+based on `Last-Modified`, and revalidated with `If-None-Match` / `If-Modified-Since`
+once stale. `DiskCache` is the optional second tier behind the in-memory LRU kept by
+the server.
+"""
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass, replace
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+
+# Only these headers are kept; they are all the cache and the fetch tool look at.
+STORED_HEADERS = ("content-type", "etag", "last-modified", "cache-control", "expires", "date", "age", "vary")
+
+# Statuses RFC 9110 marks as heuristically cacheable that the fetch tool can return.
+CACHEABLE_STATUSES = frozenset({200, 203})
+
+HEURISTIC_FRACTION = 0.1
+MAX_HEURISTIC_SECONDS = 24 * 3600
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for part in (value or "").split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else None
+    return directives
+
+
+def _parse_seconds(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(0.0, float(int(value))) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _parse_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def is_storable(status: int, headers: Mapping[str, str]) -> bool:
+    if status not in CACHEABLE_STATUSES:
+        return False
+    directives = parse_cache_control(headers.get("cache-control"))
+    if "no-store" in directives:
+        return False
+    # The fetch tool always sends the same request headers, so any Vary other than
+    # "*" selects the same stored response.
+    return headers.get("vary", "").strip() != "*"
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    status: int
+    headers: Dict[str, str]
+    content: bytes
+    request_time: float
+    response_time: float
+
+    @classmethod
+    def from_response(
+        cls,
+        url: str,
+        status: int,
+        headers: Mapping[str, str],
+        content: bytes,
+        request_time: float,
+        response_time: float,
+    ) -> "CachedResponse":
+        kept = {name: headers[name] for name in STORED_HEADERS if name in headers}
+        return cls(url, status, kept, content, request_time, response_time)
+
+    @property
+    def directives(self) -> Dict[str, Optional[str]]:
+        return parse_cache_control(self.headers.get("cache-control"))
+
+    def freshness_lifetime(self) -> float:
+        directives = self.directives
+        if "no-cache" in directives:
+            return 0.0
+        max_age = _parse_seconds(directives.get("max-age"))
+        if max_age is not None:
+            return max_age
+        if "expires" in self.headers:
+            expires = _parse_date(self.headers["expires"])
+            date = _parse_date(self.headers.get("date")) or self.response_time
+            return max(0.0, expires - date) if expires is not None else 0.0
+        last_modified = _parse_date(self.headers.get("last-modified"))
+        if last_modified is not None and self.status in CACHEABLE_STATUSES:
+            date = _parse_date(self.headers.get("date")) or self.response_time
+            return min(MAX_HEURISTIC_SECONDS, max(0.0, date - last_modified) * HEURISTIC_FRACTION)
+        return 0.0
+
+    def current_age(self, now: Optional[float] = None) -> float:
+        """RFC 9111 section 4.2.3."""
+        now = time.time() if now is None else now
+        date = _parse_date(self.headers.get("date"))
+        apparent_age = max(0.0, self.response_time - date) if date is not None else 0.0
+        corrected_age = (_parse_seconds(self.headers.get("age")) or 0.0) + (self.response_time - self.request_time)
+        return max(apparent_age, corrected_age) + max(0.0, now - self.response_time)
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return self.freshness_lifetime() > self.current_age(now)
+
+    def may_serve_stale(self) -> bool:
+        """Whether a stale copy may stand in when the origin cannot be reached."""
+        directives = self.directives
+        return "must-revalidate" not in directives and "no-cache" not in directives
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if "etag" in self.headers:
+            headers["If-None-Match"] = self.headers["etag"]
+        if "last-modified" in self.headers:
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+    def refreshed(self, headers: Mapping[str, str], request_time: float, response_time: float) -> "CachedResponse":
+        """Apply a 304 Not Modified response (RFC 9111 section 4.3.4)."""
+        updated = dict(self.headers)
+        updated.update({name: headers[name] for name in STORED_HEADERS if name in headers})
+        return replace(self, headers=updated, request_time=request_time, response_time=response_time)
+
+
+class DiskCache:
+    """Directory of cached responses, evicted least recently used first by total size.
+
+    Each entry is one file: a JSON metadata line followed by the raw body. Writes go
+    through a temporary file and `os.replace`, so several worker processes can share
+    the directory.
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.entry"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        path = self._path(key)
+        try:
+            with path.open("rb") as handle:
+                metadata = json.loads(handle.readline())
+                content = handle.read()
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        if metadata.get("key") != key:
+            return None
+        metadata.pop("key")
+        return CachedResponse(content=content, **metadata)
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        if self.max_bytes <= 0 or len(entry.content) > self.max_bytes // 4:
+            return
+        metadata = asdict(entry)
+        metadata.pop("content")
+        metadata["key"] = key
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(json.dumps(metadata).encode("utf-8") + b"\n")
+                handle.write(entry.content)
+            os.replace(tmp_name, self._path(key))
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_name)
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self.directory.glob("*.entry"):
+            with contextlib.suppress(OSError):
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(OSError):
+                path.unlink()
+            total -= size
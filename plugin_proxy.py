@@ -5,6 +5,9 @@ import httpx
 from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
+
+from byte_budget import BudgetExceeded, ByteBudget, estimate_base64_request_bytes
 
 # --- Configuration ---
 DEFAULT_BASE_URL = "https://dapp.tweekit.io/tweekit/api/image/"
@@ -26,6 +29,9 @@ app = FastAPI(
 # A separate app for the manifest, which will be mounted under /mcp
 mcp_manifest_app = FastAPI()
 
+# Caps the bytes held by concurrent /convert requests (TWEEKIT_PAYLOAD_BUDGET_BYTES).
+payload_budget = ByteBudget()
+
 # --- Pydantic Models ---
 class ConvertRequest(BaseModel):
     apiKey: Optional[str] = Field(None, description="API key for TweekIT authentication.")
@@ -110,16 +116,31 @@ async def post_convert(
         "BgColor": payload.bgcolor, "Page": payload.page, "DocDataType": payload.inext,
         "DocData": payload.blob,
     }
-    response = await _call_tweekit("", method="POST", headers=headers, json=body)
+    reserved = estimate_base64_request_bytes(len(payload.blob))
+    try:
+        await payload_budget.acquire(reserved)
+    except BudgetExceeded as exc:
+        raise HTTPException(status_code=503, detail=f"Payload budget exhausted: {exc}", headers={"Retry-After": "5"})
+    try:
+        response = await _call_tweekit("", method="POST", headers=headers, json=body)
+    except BaseException:
+        payload_budget.release(reserved)
+        raise
     content_type = response.headers.get("content-type", "").lower()
     if content_type.startswith("application/json"):
+        payload_budget.release(reserved)
         return response.json()
     disp_filename = f"converted.{payload.outfmt.strip('.') or 'bin'}"
     return StreamingResponse(
         response.aiter_bytes(), media_type=content_type or "application/octet-stream",
         headers={"Content-Disposition": f'attachment; filename="{disp_filename}"'},
+        background=BackgroundTask(payload_budget.release, reserved),
     )
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return {"payloadBudget": payload_budget.snapshot()}
+
 # --- Manifest Endpoint (under /mcp) ---
 @mcp_manifest_app.get("/.well-known/ai-plugin.json", include_in_schema=False)
 async def serve_manifest(request: Request):
@@ -0,0 +1,189 @@
+"""Optional local engine for plain raster conversions.
+
+PNG, JPEG, WebP and BMP inputs converted to PNG, JPEG or WebP with a resize, a crop
+box and/or alpha flattening don't need TweekIT's document engine. With Pillow
+installed (`pip install "tweekit-mcp[raster]"`) the server can do them in its
+worker pool instead and skip the upload, upstream queueing and download. Anything
+`supports` rejects, and any input Pillow fails on, still goes to TweekIT.
+
+Options follow the TweekIT API: the crop box (`x1, y1, x2, y2`) is applied before
+the resize and may extend past the image, in which case the padding is filled with
+`bgColor`. A single `width` or `height` keeps the aspect ratio; both set the exact
+size.
+"""
+from __future__ import annotations
+
+import io
+from typing import Any, Dict, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional
+    Image = None  # type: ignore[assignment]
+
+# Extensions (after alias normalisation) mapped to Pillow's format names.
+INPUT_FORMATS = {"png": "PNG", "jpg": "JPEG", "webp": "WEBP", "bmp": "BMP"}
+OUTPUT_FORMATS = {"png": ("PNG", "image/png"), "jpg": ("JPEG", "image/jpeg"), "webp": ("WEBP", "image/webp")}
+_ALPHA_OUTPUTS = frozenset({"png", "webp"})
+_SAVE_OPTIONS: Dict[str, Dict[str, Any]] = {"jpg": {"quality": 90}, "webp": {"quality": 90}}
+
+
+class RasterError(Exception):
+    """The input can't be rendered locally; convert it upstream instead."""
+
+
+def available() -> bool:
+    return Image is not None
+
+
+def supports(inext: str, outfmt: str, options: Dict[str, Any]) -> bool:
+    """Whether the conversion is one this engine reproduces."""
+    if inext not in INPUT_FORMATS or outfmt not in OUTPUT_FORMATS:
+        return False
+    if options["noRasterize"] or options["page"] != 1:
+        return False
+    if options["width"] < 0 or options["height"] < 0:
+        return False
+    box = (options["x1"], options["y1"], options["x2"], options["y2"])
+    # Only a complete box is handled; partial ones are left to TweekIT's rules.
+    return not any(box) or (box[2] > box[0] and box[3] > box[1])
+
+
+def _background(bg_color: str) -> Tuple[int, int, int]:
+    try:
+        value = int(bg_color.lstrip("#") or "0", 16)
+    except ValueError:
+        value = 0
+    return (value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF
+
+
+def render(content: bytes, inext: str, outfmt: str, options: Dict[str, Any], max_pixels: int) -> Tuple[bytes, str]:
+    """Convert `content`; returns the output bytes and content type. CPU bound."""
+    if Image is None:
+        raise RasterError("Pillow is not installed")
+    try:
+        image = Image.open(io.BytesIO(content))
+        if image.format != INPUT_FORMATS[inext]:
+            raise RasterError(f"input is {image.format}, not {INPUT_FORMATS[inext]}")
+        if image.width * image.height > max_pixels:
+            raise RasterError(f"{image.width}x{image.height} exceeds {max_pixels} pixels")
+        image.load()
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        raise RasterError(str(exc)) from exc
+
+    background = _background(options["bgColor"])
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+
+    x1, y1, x2, y2 = options["x1"], options["y1"], options["x2"], options["y2"]
+    if any((x1, y1, x2, y2)):
+        fill = background + (255,) if has_alpha else background
+        canvas = Image.new(image.mode, (x2 - x1, y2 - y1), fill)
+        canvas.paste(image, (-x1, -y1))
+        image = canvas
+
+    width, height = options["width"], options["height"]
+    if width or height:
+        if not height:
+            height = max(1, round(image.height * width / image.width))
+        elif not width:
+            width = max(1, round(image.width * height / image.height))
+        image = image.resize((width, height), Image.LANCZOS)
+
+    if has_alpha and (not options["alpha"] or outfmt not in _ALPHA_OUTPUTS):
+        flattened = Image.new("RGB", image.size, background)
+        flattened.paste(image, mask=image.getchannel("A"))
+        image = flattened
+
+    pillow_format, content_type = OUTPUT_FORMATS[outfmt]
+    output = io.BytesIO()
+    image.save(output, format=pillow_format, **_SAVE_OPTIONS.get(outfmt, {}))
+    return output.getvalue(), content_type
+
+
+
+# Tried in order when an output has to shrink to a byte budget; WebP keeps alpha.
+_COMPACT_FORMATS = ("webp", "jpg")
+_FIT_QUALITIES = (85, 70, 55, 40)
+_FIT_SHRINK = 0.75
+_FIT_MIN_EDGE = 16
+
+
+def _encode(image: Any, outfmt: str, quality: int) -> bytes:
+    output = io.BytesIO()
+    if outfmt == "jpg" and image.mode != "RGB":
+        image = image.convert("RGB")
+    image.save(output, format=OUTPUT_FORMATS[outfmt][0], quality=quality)
+    return output.getvalue()
+
+
+def fit(content: bytes, max_bytes: int, max_pixels: int, max_input_pixels: int) -> Tuple[bytes, str, Tuple[int, int]]:
+    """Re-encode a converted image to fit `max_bytes` and `max_pixels` (0 for no limit).
+
+    The pixel limit is met by downscaling. Then WebP and, for opaque images, JPEG
+    are tried at falling quality, shrinking further until something fits. Returns
+    the bytes, their content type and the final size. CPU bound.
+    """
+    if Image is None:
+        raise RasterError("Pillow is not installed")
+    try:
+        image = Image.open(io.BytesIO(content))
+        if image.width * image.height > max_input_pixels:
+            raise RasterError(f"{image.width}x{image.height} exceeds {max_input_pixels} pixels")
+        image.load()
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        raise RasterError(str(exc)) from exc
+
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    if max_pixels and image.width * image.height > max_pixels:
+        scale = (max_pixels / (image.width * image.height)) ** 0.5
+        image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))), Image.LANCZOS)
+    formats = [fmt for fmt in _COMPACT_FORMATS if fmt != "jpg" or not has_alpha]
+
+    while True:
+        for outfmt in formats:
+            for quality in _FIT_QUALITIES:
+                encoded = _encode(image, outfmt, quality)
+                if not max_bytes or len(encoded) <= max_bytes:
+                    return encoded, OUTPUT_FORMATS[outfmt][1], image.size
+        if min(image.size) * _FIT_SHRINK < _FIT_MIN_EDGE:
+            raise RasterError(f"no encoding fits in {max_bytes} bytes")
+        image = image.resize((int(image.width * _FIT_SHRINK), int(image.height * _FIT_SHRINK)), Image.LANCZOS)
+
+
+def smallest(content: bytes, formats: Tuple[str, ...], keep_alpha: bool, max_pixels: int) -> Tuple[bytes, str, str]:
+    """Re-encode `content` in each of `formats` and return the smallest result.
+
+    WebP and JPEG are written at quality 90; JPEG is skipped for images with
+    transparency when `keep_alpha` is set. The original bytes compete too. Returns
+    the bytes, their content type and extension. CPU bound.
+    """
+    if Image is None:
+        raise RasterError("Pillow is not installed")
+    try:
+        image = Image.open(io.BytesIO(content))
+        original = next((ext for ext, name in INPUT_FORMATS.items() if name == image.format), "")
+        if original not in OUTPUT_FORMATS:
+            raise RasterError(f"{image.format} images are not re-encoded")
+        if image.width * image.height > max_pixels:
+            raise RasterError(f"{image.width}x{image.height} exceeds {max_pixels} pixels")
+        image.load()
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        raise RasterError(str(exc)) from exc
+
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    best = (content, OUTPUT_FORMATS[original][1], original)
+    for outfmt in formats:
+        if outfmt == original or outfmt not in OUTPUT_FORMATS or (outfmt == "jpg" and has_alpha and keep_alpha):
+            continue
+        if outfmt == "png":
+            output = io.BytesIO()
+            image.save(output, format="PNG", optimize=True)
+            encoded = output.getvalue()
+        else:
+            encoded = _encode(image, outfmt, 90)
+        if len(encoded) < len(best[0]):
+            best = (encoded, OUTPUT_FORMATS[outfmt][1], outfmt)
+    return best
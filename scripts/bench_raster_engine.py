@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Compare local raster conversions with the same conversions done by TweekIT.
+
+Generates noisy RGBA PNGs of each requested edge length and resizes each one to
+half its width as WebP. Local timings use the Pillow engine from `raster_engine`.
+Upstream timings send the same call to TweekIT through the server's own
+`_convert_impl` with the local engine turned off. Upstream calls need
+TWEEKIT_API_KEY / TWEEKIT_API_SECRET (or --api-key / --api-secret); without
+credentials only local timings are printed.
+
+Usage:
+    uv run python scripts/bench_raster_engine.py --sizes 256 1024 2048 --iterations 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+import raster_engine  # noqa: E402
+import server  # noqa: E402
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - the benchmark needs Pillow
+    sys.exit('Pillow is required: pip install "tweekit-mcp[raster]"')
+
+
+def make_png(edge: int) -> bytes:
+    image = Image.frombytes("RGBA", (edge, edge), os.urandom(edge * edge * 4))
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+def options_for(edge: int) -> dict:
+    return {
+        "noRasterize": False,
+        "width": edge // 2,
+        "height": 0,
+        "x1": 0,
+        "y1": 0,
+        "x2": 0,
+        "y2": 0,
+        "page": 1,
+        "alpha": True,
+        "bgColor": "",
+    }
+
+
+def time_local(content: bytes, options: dict, iterations: int) -> float:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        raster_engine.render(content, "png", "webp", options, server.LOCAL_RASTER_MAX_PIXELS)
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return statistics.median(samples)
+
+
+async def time_upstream(content: bytes, options: dict, iterations: int, key: str, secret: str) -> float:
+    blob = server._b64encode(content)
+    samples = []
+    for _ in range(iterations):
+        server._result_cache.clear()
+        started = time.perf_counter()
+        result = await server._convert_impl(apiKey=key, apiSecret=secret, inext="png", outfmt="webp", blob=blob, **options)
+        samples.append((time.perf_counter() - started) * 1000.0)
+        if isinstance(result, dict):
+            raise RuntimeError(f"TweekIT conversion failed: {result}")
+    return statistics.median(samples)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 1024, 2048, 4096], help="Image edge lengths in pixels.")
+    parser.add_argument("--iterations", type=int, default=5, help="Conversions per measurement; the median is reported.")
+    parser.add_argument("--api-key", default=os.getenv("TWEEKIT_API_KEY"))
+    parser.add_argument("--api-secret", default=os.getenv("TWEEKIT_API_SECRET"))
+    args = parser.parse_args()
+
+    server.LOCAL_RASTER = False
+    upstream = bool(args.api_key and args.api_secret)
+    print(f"{'edge px':>8} {'png bytes':>12} {'local ms':>10} {'upstream ms':>12}")
+    for edge in args.sizes:
+        content = make_png(edge)
+        options = options_for(edge)
+        local_ms = time_local(content, options, args.iterations)
+        upstream_ms = f"{await time_upstream(content, options, args.iterations, args.api_key, args.api_secret):>12.1f}" if upstream else f"{'-':>12}"
+        print(f"{edge:>8} {len(content):>12} {local_ms:>10.1f} {upstream_ms}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
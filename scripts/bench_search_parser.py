@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Microbenchmark for the `search` tool's DuckDuckGo result parser.
+
+Times the single-pass `SearchResultParser` against the previous regex-and-slice
+parser on the saved results page in `tests/assets/duckduckgo_results.html`, with
+the result blocks repeated to simulate larger pages. The streaming parser stops
+once it has the requested results, so its cost should stay flat as pages grow.
+
+Usage:
+    uv run python scripts/bench_search_parser.py --repeat 1 5 20 --iterations 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from search_results import SearchResultParser  # noqa: E402
+
+PAGE_PATH = REPO_ROOT / "tests" / "assets" / "duckduckgo_results.html"
+MAX_RESULTS = 10
+
+
+def parse_regex(html: str, max_results: int) -> List[Dict[str, str]]:
+    """The parser `search` used before the single-pass one, kept for comparison."""
+    items: List[Dict[str, str]] = []
+    for m in re.finditer(r'<a[^>]*class="result__a"[^>]*href="([^"]+)"[^>]*>(.*?)</a>', html, re.I | re.S):
+        href = m.group(1)
+        title = re.sub("<.*?>", "", m.group(2))
+        start = m.end()
+        snippet_match = re.search(r'<a[^>]*class="result__snippet"[^>]*>(.*?)</a>|<div[^>]*class="result__snippet"[^>]*>(.*?)</div>', html[start:start+2000], re.I | re.S)
+        snippet_html = snippet_match.group(1) if snippet_match and snippet_match.group(1) else (snippet_match.group(2) if snippet_match and snippet_match.group(2) else "")
+        snippet = re.sub("<.*?>", "", snippet_html)
+        items.append({"title": title.strip(), "url": href, "snippet": snippet.strip()})
+        if len(items) >= max_results:
+            break
+    return items
+
+
+def parse_streaming(html: str, max_results: int, chunk_size: int = 16 * 1024) -> List[Dict[str, str]]:
+    parser = SearchResultParser(max_results)
+    for offset in range(0, len(html), chunk_size):
+        parser.feed(html[offset:offset + chunk_size])
+        if parser.done:
+            break
+    return parser.finish()
+
+
+def build_page(repeat: int) -> str:
+    page = PAGE_PATH.read_text(encoding="utf-8")
+    start = page.index('<div class="result ')
+    end = page.index('<div class="nav-link">')
+    return page[:start] + page[start:end] * repeat + page[end:]
+
+
+def time_parser(fn: Callable[[str, int], List[Dict[str, str]]], html: str, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(html, MAX_RESULTS)
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, nargs="+", default=[1, 5, 20, 50], help="Times to repeat the result blocks.")
+    parser.add_argument("--iterations", type=int, default=200, help="Parses per measurement.")
+    args = parser.parse_args()
+
+    print(f"{'page bytes':>12} {'regex us':>10} {'single-pass us':>15}")
+    for repeat in args.repeat:
+        html = build_page(repeat)
+        regex_us = time_parser(parse_regex, html, args.iterations)
+        streaming_us = time_parser(parse_streaming, html, args.iterations)
+        print(f"{len(html):>12} {regex_us:>10.1f} {streaming_us:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
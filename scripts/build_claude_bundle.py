@@ -14,6 +14,16 @@ REPO_ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_MANIFEST_PATH = REPO_ROOT / "claude" / "manifest.json"
 README_PATH = REPO_ROOT / "claude" / "README.md"
 SERVER_SOURCE = REPO_ROOT / "server.py"
+# Sibling modules imported by server.py that must ship next to it.
+SERVER_SUPPORT_MODULES = [
+    REPO_ROOT / "byte_budget.py",
+    REPO_ROOT / "content_sniff.py",
+    REPO_ROOT / "fair_scheduler.py",
+    REPO_ROOT / "http_cache.py",
+    REPO_ROOT / "raster_engine.py",
+    REPO_ROOT / "search_results.py",
+    REPO_ROOT / "text_extract.py",
+]
 
 # Keep dependency pins in sync with uv.lock / pyproject.toml.
 REQUIRED_DEPENDENCIES = [
@@ -55,6 +65,8 @@ def _stage_server_files(server_dir: Path) -> None:
     """Copy the MCP server entry point into the bundle."""
     server_dir.mkdir(parents=True, exist_ok=True)
     shutil.copy2(SERVER_SOURCE, server_dir / "server.py")
+    for module in SERVER_SUPPORT_MODULES:
+        shutil.copy2(module, server_dir / module.name)
 
 
 def _write_manifest(manifest: dict[str, object], destination: Path) -> None:
@@ -43,6 +43,11 @@ from urllib.parse import quote, urlparse
 
 from fastmcp import Client
 
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from content_sniff import SNIFF_BYTES, sniff_extension  # noqa: E402
+
 
 IMAGE_EXTS = {"png", "jpg", "jpeg", "tif", "tiff", "gif", "bmp", "heic", "heif", "psd", "ai", "fff"}
 DOC_TO_PDF_EXTS = {
@@ -529,12 +534,12 @@ def detect_extension(path: Path) -> str:
 
 
 def extract_extension_from_metadata(path: Path) -> str | None:
-    mime_ext = _detect_extension_via_file(path)
-    if mime_ext and mime_ext != "bin":
-        return mime_ext
+    sniffed_ext = _detect_extension_via_signature(path)
+    if sniffed_ext:
+        return sniffed_ext
 
     if sys.platform != "darwin":
-        return mime_ext
+        return None
 
     utis: list[str] = []
     for attr in ("kMDItemContentType", "kMDItemContentTypeTree"):
@@ -570,22 +575,16 @@ def extract_extension_from_metadata(path: Path) -> str | None:
         if ext:
             return ext
 
-    return mime_ext
+    return None
 
 
-def _detect_extension_via_file(path: Path) -> str | None:
+def _detect_extension_via_signature(path: Path) -> str | None:
     try:
-        result = subprocess.run(
-            ["file", "--brief", "--mime-type", str(path)],
-            capture_output=True,
-            text=True,
-            check=True,
-        )
-    except (subprocess.CalledProcessError, FileNotFoundError):
+        with path.open("rb") as handle:
+            head = handle.read(SNIFF_BYTES)
+    except OSError:
         return None
-
-    mime = result.stdout.strip()
-    return _extension_from_mime(mime)
+    return sniff_extension(head)
 
 
 def _extension_from_uti(uti: str) -> str | None:
@@ -0,0 +1,87 @@
+"""Single-pass parser for DuckDuckGo's HTML results page, used by the `search` tool.
+
+The page can be fed in chunks as it downloads. Result title links (`result__a`)
+and snippets (`result__snippet`) are located by a forward scan for their class
+marker, so every byte is scanned once and nothing is re-sliced or re-searched per
+result. Input is consumed up to the last `</div>`, which no title or snippet
+element spans; the rest waits for the next chunk. Once `limit` results are complete `done` turns true and
+callers can stop reading the response.
+"""
+from __future__ import annotations
+
+import html
+import re
+from typing import Dict, List, Optional
+
+_MARKER = re.compile(r"result__(a|snippet)(?=[\"'\s])")
+_HREF = re.compile(r'\bhref\s*=\s*"([^"]*)"', re.I)
+_TAG = re.compile(r"<[^>]*>")
+_WHITESPACE = re.compile(r"\s+")
+_BOUNDARY = "</div>"
+
+
+def _text(fragment: str) -> str:
+    return _WHITESPACE.sub(" ", html.unescape(_TAG.sub("", fragment))).strip()
+
+
+class SearchResultParser:
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.results: List[Dict[str, str]] = []
+        self._current: Optional[Dict[str, str]] = None
+        self._pending = ""
+
+    @property
+    def done(self) -> bool:
+        return len(self.results) >= self.limit
+
+    def _flush(self) -> None:
+        if self._current is not None and not self.done:
+            self.results.append(self._current)
+        self._current = None
+
+    def _scan(self, text: str) -> None:
+        pos = 0
+        while not self.done:
+            found = _MARKER.search(text, pos)
+            if found is None:
+                return
+            marker, pos = found.start(), found.end()
+            tag_start = text.rfind("<", 0, marker)
+            tag_end = text.find(">", marker)
+            if tag_start < 0 or tag_end < 0 or text.find("class=", tag_start, marker) < 0:
+                continue
+            tag = text[tag_start + 1:tag_end].split(None, 1)[0].lower()
+            close = text.find(f"</{tag}", tag_end)
+            if close < 0:
+                return
+            content = _text(text[tag_end + 1:close])
+            pos = close
+            if found.group(1) == "a":
+                self._flush()
+                href = _HREF.search(text, tag_start, tag_end)
+                self._current = {"title": content, "url": html.unescape(href.group(1)) if href else "", "snippet": ""}
+            elif self._current is not None and not self._current["snippet"]:
+                self._current["snippet"] = content
+                self._flush()
+
+    def feed(self, chunk: str) -> None:
+        if self.done:
+            return
+        # Search only the new chunk (plus a boundary-sized overlap) for the cut point.
+        search_from = max(0, len(self._pending) - len(_BOUNDARY))
+        self._pending += chunk
+        cut = self._pending.rfind(_BOUNDARY, search_from)
+        if cut < 0:
+            return
+        cut += len(_BOUNDARY)
+        ready, self._pending = self._pending[:cut], self._pending[cut:]
+        self._scan(ready)
+
+    def finish(self) -> List[Dict[str, str]]:
+        """Parse whatever is left and return the results, including a trailing one without a snippet."""
+        pending, self._pending = self._pending, ""
+        if not self.done:
+            self._scan(pending)
+            self._flush()
+        return self.results
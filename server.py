@@ -1,20 +1,59 @@
 import argparse
 import asyncio
-import base64
+import binascii
+import contextlib
+import contextvars
+import functools
+import hashlib
+import http.cookiejar
+import io
+import ipaddress
 import json
 import logging
+import math
 import mimetypes
 import os
 import re
+import secrets
+import shutil
+import socket
+import tempfile
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from urllib.parse import quote_plus, urlparse
 
+import anyio
+import httpcore
 import httpx
-from fastmcp import FastMCP
+from httpx._utils import URLPattern, get_environment_proxies
+import uvicorn
+from fastmcp import Context, FastMCP
+from fastmcp.exceptions import ToolError
+from fastmcp.server.dependencies import get_http_request
+from fastmcp.server.middleware import Middleware
 from fastmcp.utilities.types import File, Image
-from typing import Any, Dict, List, Optional, Annotated
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Annotated
 from pydantic import Field
 
+from byte_budget import (
+    BudgetExceeded,
+    ByteBudget,
+    Reservation,
+    estimate_base64_length,
+    estimate_base64_request_bytes,
+    estimate_decoded_length,
+    estimate_download_request_bytes,
+)
+from content_sniff import SNIFF_BYTES, image_size, matches, png_has_alpha, sniff_extension
+from fair_scheduler import DEFAULT_MAX_CONCURRENT, FairScheduler, SchedulerTimeout, parse_weights
+from http_cache import CachedResponse, DiskCache, is_storable
+import raster_engine
+from search_results import SearchResultParser
+from text_extract import EXTRACT_MODES, TextStream
+
 BASE_URL = "https://dapp.tweekit.io/tweekit/api/image/"
 #BASE_URL = "http://localhost:16377/api/image/"
 
@@ -28,6 +67,1500 @@ mcp = FastMCP(
     stateless_http=True
 )
 
+# Directory shared by all worker processes for metrics snapshots. `main` fills it in
+# automatically when running with --workers > 1.
+METRICS_DIR = os.getenv("TWEEKIT_METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("TWEEKIT_METRICS_FLUSH_SECONDS", "5"))
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class _Metrics:
+    """In-process counters, gauges and latency samples for this worker."""
+
+    def __init__(self, sample_size: int = 1024) -> None:
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = defaultdict(float)
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=sample_size))
+
+    def incr(self, name: str, value: float = 1.0) -> None:
+        self._counters[name] += value
+
+    def gauge(self, name: str, value: float) -> None:
+        self._gauges[name] = value
+
+    def adjust(self, name: str, delta: float) -> None:
+        self._gauges[name] += delta
+
+    def observe(self, name: str, value: float) -> None:
+        self._samples[name].append(value)
+
+    def summary(self, name: str) -> Dict[str, float]:
+        ordered = sorted(self._samples.get(name, ()))
+        return {
+            "count": len(ordered),
+            "p50": _percentile(ordered, 0.50),
+            "p90": _percentile(ordered, 0.90),
+            "p99": _percentile(ordered, 0.99),
+            "max": ordered[-1] if ordered else 0.0,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "timestamp": time.time(),
+            "counters": dict(self._counters),
+            "gauges": dict(self._gauges),
+            "summaries": {name: self.summary(name) for name in list(self._samples)},
+        }
+
+
+_metrics = _Metrics()
+
+
+def _worker_snapshot_path() -> Path:
+    return Path(METRICS_DIR) / f"worker-{os.getpid()}.json"
+
+
+def _write_worker_snapshot() -> None:
+    path = _worker_snapshot_path()
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(_metrics.snapshot()))
+    os.replace(tmp_path, path)
+
+
+# Gauges that describe a rate or ratio rather than a quantity; adding them up across
+# workers is meaningless, so their total is the worst (largest) worker value.
+_MAX_GAUGE_PREFIXES = ("event_loop_lag_", "pool_utilization.")
+
+
+def _collect_metrics() -> Dict[str, Any]:
+    """Merge this worker's live metrics with the snapshots flushed by its siblings."""
+    workers: Dict[str, Dict[str, Any]] = {str(os.getpid()): _metrics.snapshot()}
+    if METRICS_DIR:
+        stale_after = max(3 * METRICS_FLUSH_SECONDS, 15.0)
+        for path in Path(METRICS_DIR).glob("worker-*.json"):
+            try:
+                snapshot = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            if time.time() - float(snapshot.get("timestamp", 0)) > stale_after:
+                continue
+            workers.setdefault(str(snapshot.get("pid")), snapshot)
+
+    totals: Dict[str, Dict[str, float]] = {"counters": defaultdict(float), "gauges": defaultdict(float)}
+    for snapshot in workers.values():
+        for section in ("counters", "gauges"):
+            for name, value in (snapshot.get(section) or {}).items():
+                if section == "gauges" and name.startswith(_MAX_GAUGE_PREFIXES):
+                    totals[section][name] = max(totals[section].get(name, value), value)
+                else:
+                    totals[section][name] += value
+    return {
+        "serverVersion": SERVER_VERSION,
+        "workerCount": len(workers),
+        "totals": {section: dict(values) for section, values in totals.items()},
+        "workers": workers,
+    }
+
+
+async def _flush_metrics_periodically() -> None:
+    while True:
+        try:
+            _write_worker_snapshot()
+        except OSError as e:
+            logger.warning("Failed to write metrics snapshot to %s: %s", METRICS_DIR, e)
+        await asyncio.sleep(METRICS_FLUSH_SECONDS)
+
+
+# Payloads at or above this size are base64/JSON encoded on a worker thread so the
+# event loop keeps serving small requests in the meantime. The codecs below work in
+# OFFLOAD_CHUNK_BYTES slices: binascii, str.encode and the JSON encoder hold the GIL
+# for a whole call, so one call on a 60 MB payload would stall the loop anyway.
+OFFLOAD_THRESHOLD_BYTES = int(os.getenv("TWEEKIT_OFFLOAD_THRESHOLD_BYTES", str(1024 * 1024)))
+OFFLOAD_WORKERS = int(os.getenv("TWEEKIT_OFFLOAD_WORKERS", "4"))
+OFFLOAD_CHUNK_BYTES = 3 * 256 * 1024  # a multiple of 3 and 4 keeps base64 chunks aligned
+
+_offload_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_offload_executor() -> ThreadPoolExecutor:
+    global _offload_executor
+    if _offload_executor is None:
+        _offload_executor = ThreadPoolExecutor(max_workers=OFFLOAD_WORKERS, thread_name_prefix="tweekit-offload")
+    return _offload_executor
+
+
+async def _offload(size: int, fn: Callable[..., Any], *args: Any) -> Any:
+    """Run the CPU-bound `fn(*args)` on the worker pool when `size` crosses the threshold."""
+    if size < OFFLOAD_THRESHOLD_BYTES:
+        return fn(*args)
+    _metrics.incr("offload_calls_total")
+    _metrics.incr("offload_bytes_total", size)
+    started = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_offload_executor(), functools.partial(fn, *args))
+    finally:
+        _metrics.observe("offload_ms", (time.perf_counter() - started) * 1000.0)
+
+
+_BASE64_NOISE = re.compile(r"[^A-Za-z0-9+/=]+")
+
+
+def _b64encode(data: bytes) -> str:
+    view = memoryview(data)
+    return "".join(
+        binascii.b2a_base64(view[start:start + OFFLOAD_CHUNK_BYTES], newline=False).decode("ascii")
+        for start in range(0, len(view), OFFLOAD_CHUNK_BYTES)
+    )
+
+
+def _b64decode(text: str) -> Optional[bytes]:
+    try:
+        return b"".join(
+            binascii.a2b_base64(text[start:start + OFFLOAD_CHUNK_BYTES], strict_mode=True)
+            for start in range(0, len(text), OFFLOAD_CHUNK_BYTES)
+        )
+    except (ValueError, binascii.Error):
+        pass
+    # Whitespace or other characters outside the alphabet misalign the chunks;
+    # drop them a slice at a time and decode what remains.
+    text = "".join(
+        _BASE64_NOISE.sub("", text[start:start + OFFLOAD_CHUNK_BYTES])
+        for start in range(0, len(text), OFFLOAD_CHUNK_BYTES)
+    )
+    try:
+        return b"".join(
+            binascii.a2b_base64(text[start:start + OFFLOAD_CHUNK_BYTES])
+            for start in range(0, len(text), OFFLOAD_CHUNK_BYTES)
+        )
+    except ValueError:
+        return None
+
+
+def _encode_json(payload: Dict[str, Any]) -> bytes:
+    parts = [b"{"]
+    for key, value in payload.items():
+        parts.append(json.dumps(key).encode("ascii") + b":")
+        if isinstance(value, str) and len(value) > OFFLOAD_CHUNK_BYTES:
+            # Escaping is per character, so long strings can be encoded a slice at a time.
+            parts.append(b'"')
+            parts.extend(
+                json.dumps(value[start:start + OFFLOAD_CHUNK_BYTES])[1:-1].encode("ascii")
+                for start in range(0, len(value), OFFLOAD_CHUNK_BYTES)
+            )
+            parts.append(b'"')
+        else:
+            parts.append(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+        parts.append(b",")
+    if len(parts) > 1:
+        parts.pop()
+    parts.append(b"}")
+    return b"".join(parts)
+
+
+# Event-loop lag sampling and load shedding. A threshold of 0 disables that check.
+LAG_SAMPLE_INTERVAL_SECONDS = float(os.getenv("TWEEKIT_LAG_SAMPLE_INTERVAL_SECONDS", "0.1"))
+SHED_LAG_MS = float(os.getenv("TWEEKIT_SHED_LAG_MS", "0"))
+SHED_MAX_IN_FLIGHT = int(os.getenv("TWEEKIT_SHED_MAX_IN_FLIGHT", "0"))
+
+_loop_lag_ms = 0.0  # exponentially weighted, so a single slow tick doesn't trip shedding
+_in_flight = 0
+
+
+async def _sample_loop_lag() -> None:
+    global _loop_lag_ms
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + LAG_SAMPLE_INTERVAL_SECONDS
+        await asyncio.sleep(LAG_SAMPLE_INTERVAL_SECONDS)
+        lag_ms = max(0.0, (loop.time() - expected) * 1000.0)
+        _loop_lag_ms = 0.8 * _loop_lag_ms + 0.2 * lag_ms
+        _metrics.observe("event_loop_lag_ms", lag_ms)
+        _metrics.gauge("event_loop_lag_ewma_ms", _loop_lag_ms)
+
+
+def _overload_error(tool: str) -> Optional[Dict[str, Any]]:
+    """Return a quick rejection when the worker is saturated, otherwise None."""
+    reason = None
+    if SHED_MAX_IN_FLIGHT and _in_flight >= SHED_MAX_IN_FLIGHT:
+        reason = f"{_in_flight} requests already in flight"
+    elif SHED_LAG_MS and _loop_lag_ms >= SHED_LAG_MS:
+        reason = f"event loop lag is {_loop_lag_ms:.0f} ms"
+    if reason is None:
+        return None
+    _metrics.incr(f"shed_total.{tool}")
+    logger.warning("Shedding %s call: %s", tool, reason)
+    return {"error": "Server is overloaded; retry shortly.", "details": reason, "retryable": True}
+
+
+@contextlib.contextmanager
+def _in_flight_slot() -> Any:
+    global _in_flight
+    _in_flight += 1
+    _metrics.gauge("requests_in_flight", _in_flight)
+    try:
+        yield
+    finally:
+        _in_flight -= 1
+        _metrics.gauge("requests_in_flight", _in_flight)
+
+
+def _record_payload_budget(snapshot: Dict[str, Any]) -> None:
+    _metrics.gauge("payload_budget_limit_bytes", snapshot["limitBytes"])
+    _metrics.gauge("payload_budget_used_bytes", snapshot["usedBytes"])
+    _metrics.gauge("payload_budget_waiting", snapshot["waiting"])
+    _metrics.gauge("payload_budget_rejected", snapshot["rejected"])
+
+
+# Memory governor for request payloads; sized by TWEEKIT_PAYLOAD_BUDGET_BYTES.
+_payload_budget = ByteBudget(on_change=_record_payload_budget)
+
+
+def _budget_error(exc: BudgetExceeded) -> Dict[str, Any]:
+    logger.warning("Payload budget rejected request: %s", exc)
+    return {"error": "Server payload memory budget exhausted; retry shortly.", "details": str(exc), "retryable": True}
+
+
+# Conversions run in two lanes with their own upstream slots, so small raster jobs
+# keep low latency while whole-document work queues in the bulk lane. Within a lane,
+# slots are shared fairly between API keys; TWEEKIT_TENANT_WEIGHTS
+# (`key=weight,...`) gives some keys a larger share.
+INTERACTIVE_CONCURRENCY = int(os.getenv("TWEEKIT_INTERACTIVE_CONCURRENCY", "16"))
+# Decoded inputs above this size always go to the bulk lane.
+INTERACTIVE_MAX_BYTES = int(os.getenv("TWEEKIT_INTERACTIVE_MAX_BYTES", str(2 * 1024 * 1024)))
+TENANT_WEIGHTS = parse_weights(os.getenv("TWEEKIT_TENANT_WEIGHTS"))
+# Per-key queue wait series are kept for this many keys; waits for any further
+# keys are reported together under `convert_queue_wait_ms.other`.
+TENANT_METRICS_MAX = int(os.getenv("TWEEKIT_TENANT_METRICS_MAX", "100"))
+
+# Single-image inputs. Documents, vector and pro formats have to be rendered first.
+_RASTER_INPUTS = frozenset({"png", "jpg", "gif", "bmp", "webp", "tiff", "ico", "heic", "avif"})
+
+
+def _conversion_lane(inext: str, outfmt: str, blob_length: int, noRasterize: bool) -> str:
+    """`interactive` for small single-page work, `bulk` for large inputs and whole documents."""
+    if estimate_decoded_length(blob_length) > INTERACTIVE_MAX_BYTES or noRasterize:
+        return "bulk"
+    if _normalize_extension(outfmt) == "pdf" and _normalize_extension(inext) not in _RASTER_INPUTS:
+        return "bulk"
+    return "interactive"
+
+
+def _tenant_label(api_key: str) -> str:
+    """Metric label for an API key that doesn't reveal the key."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+def _record_conversion_queue(lane: str, snapshot: Dict[str, Any]) -> None:
+    _metrics.gauge(f"convert_slots_active.{lane}", snapshot["active"])
+    _metrics.gauge(f"convert_queue_waiting.{lane}", snapshot["waiting"])
+    _metrics.gauge(f"convert_queue_rejected.{lane}", snapshot["rejected"])
+
+
+_tenant_series: set[str] = set()
+
+
+def _record_conversion_wait(lane: str, api_key: str, seconds: float) -> None:
+    _metrics.observe(f"convert_queue_wait_ms.{lane}", seconds * 1000.0)
+    label = _tenant_label(api_key)
+    if label not in _tenant_series:
+        if len(_tenant_series) >= TENANT_METRICS_MAX:
+            label = "other"
+        else:
+            _tenant_series.add(label)
+    _metrics.observe(f"convert_queue_wait_ms.{label}", seconds * 1000.0)
+
+
+def _lane_scheduler(lane: str, max_concurrent: int) -> FairScheduler:
+    return FairScheduler(
+        max_concurrent=max_concurrent,
+        weights=TENANT_WEIGHTS,
+        on_change=functools.partial(_record_conversion_queue, lane),
+        on_wait=functools.partial(_record_conversion_wait, lane),
+    )
+
+
+_conversion_lanes: Dict[str, FairScheduler] = {
+    "interactive": _lane_scheduler("interactive", INTERACTIVE_CONCURRENCY),
+    "bulk": _lane_scheduler("bulk", DEFAULT_MAX_CONCURRENT),
+}
+
+
+def _conversion_cost(blob_length: int) -> float:
+    """One unit per conversion plus one per MiB of base64 payload."""
+    return 1.0 + blob_length / (1024 * 1024)
+
+
+def _queue_error(exc: SchedulerTimeout) -> Dict[str, Any]:
+    logger.warning("Conversion queue rejected request: %s", exc)
+    return {"error": "Too many conversions queued; retry shortly.", "details": str(exc), "retryable": True}
+
+
+# Share of a convert_url call's `timeoutMs` its download may use; the conversion gets
+# whatever is left.
+DEADLINE_DOWNLOAD_SHARE = float(os.getenv("TWEEKIT_DEADLINE_DOWNLOAD_SHARE", "0.5"))
+
+
+class _DeadlineExceeded(Exception):
+    def __init__(self, phase: str, timeout_ms: int) -> None:
+        super().__init__(f"Deadline of {timeout_ms} ms exceeded during {phase}.")
+        self.phase = phase
+
+
+class _Deadline:
+    """A per-call `timeoutMs` that the phases of a conversion draw down in turn."""
+
+    def __init__(self, timeout_ms: Optional[int]) -> None:
+        self.timeout_ms = timeout_ms
+        self._expires = time.monotonic() + timeout_ms / 1000.0 if timeout_ms else None
+
+    def remaining(self) -> Optional[float]:
+        if self._expires is None:
+            return None
+        return max(0.0, self._expires - time.monotonic())
+
+    async def run(self, phase: str, awaitable: Awaitable[Any], share: float = 1.0) -> Any:
+        """Await `awaitable` within `share` of the remaining time, cancelling it once that runs out."""
+        remaining = self.remaining()
+        if remaining is None:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, remaining * share)
+        except asyncio.TimeoutError:
+            _metrics.incr(f"deadline_exceeded_total.{phase}")
+            raise _DeadlineExceeded(phase, self.timeout_ms or 0) from None
+
+
+def _deadline_error(exc: _DeadlineExceeded) -> Dict[str, Any]:
+    logger.info("Abandoned call: %s", exc)
+    return {"error": str(exc), "details": f"Phase: {exc.phase}."}
+
+
+# Connection pools. The TweekIT upstream and third-party egress (convert_url
+# downloads, fetch, search) use separate clients so a slow origin cannot take the
+# sockets conversions need. Egress is additionally capped per host.
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("TWEEKIT_UPSTREAM_MAX_CONNECTIONS", "64"))
+EGRESS_MAX_CONNECTIONS = int(os.getenv("TWEEKIT_EGRESS_MAX_CONNECTIONS", "64"))
+EGRESS_MAX_PER_HOST = int(os.getenv("TWEEKIT_EGRESS_MAX_PER_HOST", "8"))
+POOL_WAIT_SECONDS = float(os.getenv("TWEEKIT_POOL_WAIT_SECONDS", "10"))
+
+_USER_AGENT = "tweekit-mcp/0.1 (+https://github.com/equilibrium-team/tweekit-mcp)"
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body wrapper that gives the host slot back once the body is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]) -> None:
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+# Resolved addresses are reused for this long, so new connections skip DNS.
+DNS_CACHE_SECONDS = float(os.getenv("TWEEKIT_DNS_CACHE_SECONDS", "300"))
+DNS_CACHE_MAX_HOSTS = int(os.getenv("TWEEKIT_DNS_CACHE_MAX_HOSTS", "64"))
+
+
+class _CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """httpcore network backend that resolves host names through an in-process TTL cache.
+
+    Connections are opened to the cached addresses in order; TLS still verifies and
+    sends SNI for the original host name, which httpcore passes separately. At most
+    DNS_CACHE_MAX_HOSTS names are kept, least recently used first out.
+    """
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend) -> None:
+        self._backend = backend
+        self._cache: "OrderedDict[str, tuple[float, List[str]]]" = OrderedDict()
+
+    async def resolve(self, host: str, port: int) -> List[str]:
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+        cached = self._cache.get(host)
+        if cached is not None:
+            if cached[0] > time.monotonic():
+                self._cache.move_to_end(host)
+                _metrics.incr("dns_cache_hits_total")
+                return cached[1]
+            del self._cache[host]
+        started = time.perf_counter()
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        _metrics.incr("dns_lookups_total")
+        _metrics.observe("dns_lookup_ms", (time.perf_counter() - started) * 1000.0)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        if DNS_CACHE_SECONDS > 0 and DNS_CACHE_MAX_HOSTS > 0 and addresses:
+            self._cache[host] = (time.monotonic() + DNS_CACHE_SECONDS, addresses)
+            while len(self._cache) > DNS_CACHE_MAX_HOSTS:
+                self._cache.popitem(last=False)
+        return addresses
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options: Optional[Any] = None,
+    ) -> httpcore.AsyncNetworkStream:
+        try:
+            addresses = await self.resolve(host, port)
+        except OSError as exc:
+            raise httpcore.ConnectError(str(exc)) from exc
+        error: Optional[Exception] = None
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as exc:
+                error = exc
+        # Every cached address failed; resolve again next time.
+        self._cache.pop(host, None)
+        raise error or httpcore.ConnectError(f"No addresses found for {host}")
+
+    async def connect_unix_socket(
+        self, path: str, timeout: Optional[float] = None, socket_options: Optional[Any] = None
+    ) -> httpcore.AsyncNetworkStream:
+        return await self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+class _HostLimitedTransport(httpx.AsyncBaseTransport):
+    """Connection pool that also caps concurrent requests per host and records utilization."""
+
+    def __init__(
+        self,
+        name: str,
+        max_connections: int,
+        max_per_host: int,
+        keepalive_expiry: float = 5.0,
+        cache_dns: bool = False,
+    ) -> None:
+        self.name = name
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._transport = httpx.AsyncHTTPTransport(limits=limits)
+        # A client given its own transport ignores HTTP(S)_PROXY and NO_PROXY, so
+        # route the same way httpx would: one pool per proxy, None for direct.
+        self._proxies: Dict[URLPattern, Optional[httpx.AsyncHTTPTransport]] = dict(sorted(
+            (URLPattern(pattern), None if proxy is None else httpx.AsyncHTTPTransport(proxy=proxy, limits=limits))
+            for pattern, proxy in get_environment_proxies().items()
+        ))
+        if cache_dns:
+            # httpx has no hook for a custom network backend, so swap it on the pool it built.
+            pool = self._transport._pool
+            pool._network_backend = _CachingNetworkBackend(pool._network_backend)
+        # Per-host semaphores exist only while a request holds or waits for one,
+        # so origins seen once do not accumulate.
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._slot_users: Dict[str, int] = {}
+        self._active = 0
+
+    def _transport_for(self, url: httpx.URL) -> httpx.AsyncHTTPTransport:
+        for pattern, transport in self._proxies.items():
+            if pattern.matches(url):
+                return transport or self._transport
+        return self._transport
+
+    def _checkout_slot(self, host: str) -> asyncio.Semaphore:
+        slot = self._slots.get(host)
+        if slot is None:
+            slot = self._slots[host] = asyncio.Semaphore(max(1, self.max_per_host))
+        self._slot_users[host] = self._slot_users.get(host, 0) + 1
+        return slot
+
+    def _checkin_slot(self, host: str) -> None:
+        users = self._slot_users[host] - 1
+        if users:
+            self._slot_users[host] = users
+        else:
+            del self._slot_users[host]
+            del self._slots[host]
+
+    def _adjust_active(self, delta: int) -> None:
+        self._active += delta
+        _metrics.gauge(f"pool_active.{self.name}", self._active)
+        if self.max_connections > 0:
+            _metrics.gauge(f"pool_utilization.{self.name}", self._active / self.max_connections)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = f"{request.url.host}:{request.url.port or ''}"
+        slot = self._checkout_slot(host)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(slot.acquire(), timeout=POOL_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            self._checkin_slot(host)
+            _metrics.incr(f"pool_timeouts_total.{self.name}")
+            raise httpx.PoolTimeout(
+                f"Waited {POOL_WAIT_SECONDS:g}s for one of {self.max_per_host} connections to {request.url.host}",
+                request=request,
+            ) from None
+        except BaseException:
+            self._checkin_slot(host)
+            raise
+        _metrics.observe(f"pool_wait_ms.{self.name}", (time.perf_counter() - started) * 1000.0)
+        self._adjust_active(1)
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                slot.release()
+                self._checkin_slot(host)
+                self._adjust_active(-1)
+
+        try:
+            response = await self._transport_for(request.url).handle_async_request(request)
+        except httpx.PoolTimeout:
+            _metrics.incr(f"pool_timeouts_total.{self.name}")
+            release()
+            raise
+        except BaseException:
+            release()
+            raise
+        response.stream = _ReleasingStream(response.stream, release)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+        for transport in self._proxies.values():
+            if transport is not None:
+                await transport.aclose()
+
+
+class _DiscardingCookieJar(http.cookiejar.CookieJar):
+    """A cookie jar that never stores anything, so shared clients stay stateless."""
+
+    def set_cookie(self, cookie: http.cookiejar.Cookie) -> None:
+        pass
+
+    def extract_cookies(self, response: Any, request: Any) -> None:
+        pass
+
+
+_clients: Dict[str, tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+
+def _pooled_client(name: str, factory: Callable[[], httpx.AsyncClient]) -> httpx.AsyncClient:
+    """Return the shared client `name` for the running event loop, creating it on first use.
+
+    Pooled clients serve every tenant, so their cookie jar discards whatever
+    responses set rather than replaying it on another caller's requests.
+    """
+    loop = asyncio.get_running_loop()
+    current = _clients.get(name)
+    if current is None or current[0] is not loop or current[1].is_closed:
+        client = factory()
+        client.cookies = _DiscardingCookieJar()
+        current = (loop, client)
+        _clients[name] = current
+    return current[1]
+
+
+# Upstream connections opened at startup and kept warm with a periodic version
+# request; idle upstream connections are kept for three ping intervals.
+UPSTREAM_PREWARM_CONNECTIONS = int(os.getenv("TWEEKIT_UPSTREAM_PREWARM_CONNECTIONS", "2"))
+UPSTREAM_KEEPALIVE_SECONDS = float(os.getenv("TWEEKIT_UPSTREAM_KEEPALIVE_SECONDS", "30"))
+
+
+def _upstream_client() -> httpx.AsyncClient:
+    return _pooled_client("upstream", lambda: httpx.AsyncClient(
+        timeout=httpx.Timeout(60.0, pool=POOL_WAIT_SECONDS),
+        transport=_HostLimitedTransport(
+            "upstream",
+            UPSTREAM_MAX_CONNECTIONS,
+            UPSTREAM_MAX_CONNECTIONS,
+            keepalive_expiry=max(5.0, 3 * UPSTREAM_KEEPALIVE_SECONDS),
+            cache_dns=True,
+        ),
+    ))
+
+
+def _egress_client() -> httpx.AsyncClient:
+    return _pooled_client("egress", lambda: httpx.AsyncClient(
+        timeout=httpx.Timeout(20.0, read=60.0, pool=POOL_WAIT_SECONDS),
+        headers={"User-Agent": _USER_AGENT},
+        follow_redirects=True,
+        transport=_HostLimitedTransport("egress", EGRESS_MAX_CONNECTIONS, EGRESS_MAX_PER_HOST),
+    ))
+
+
+def _timeout(seconds: float) -> httpx.Timeout:
+    """Per-request timeout that keeps the shared pool wait limit."""
+    return httpx.Timeout(seconds, pool=POOL_WAIT_SECONDS)
+
+
+async def _warm_upstream() -> int:
+    """Open (or reuse) UPSTREAM_PREWARM_CONNECTIONS connections with concurrent version requests."""
+    client = _upstream_client()
+    results = await asyncio.gather(
+        *(client.get(f"{BASE_URL}version", timeout=_timeout(10.0)) for _ in range(UPSTREAM_PREWARM_CONNECTIONS)),
+        return_exceptions=True,
+    )
+    failures = [result for result in results if isinstance(result, BaseException)]
+    if failures:
+        _metrics.incr("upstream_prewarm_failures_total", len(failures))
+        logger.info("Upstream prewarm: %d of %d requests failed: %s", len(failures), len(results), failures[0])
+    return len(results) - len(failures)
+
+
+async def _keep_upstream_warm() -> None:
+    while True:
+        await _warm_upstream()
+        if UPSTREAM_KEEPALIVE_SECONDS <= 0:
+            return
+        await asyncio.sleep(UPSTREAM_KEEPALIVE_SECONDS)
+
+
+class _LRUCache:
+    """Byte-bounded LRU cache with optional per-entry expiry."""
+
+    def __init__(self, name: str, max_bytes: int, max_entry_bytes: Optional[int] = None) -> None:
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 4
+        self._entries: "OrderedDict[str, tuple[Any, int, float]]" = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def bytes_used(self) -> int:
+        return self._bytes
+
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None and entry[2] and entry[2] <= time.monotonic():
+            self.pop(key)
+            entry = None
+        if entry is None:
+            _metrics.incr(f"cache_misses_total.{self.name}")
+            return None
+        self._entries.move_to_end(key)
+        _metrics.incr(f"cache_hits_total.{self.name}")
+        return entry[0]
+
+    def put(self, key: str, value: Any, size: int, ttl: Optional[float] = None) -> None:
+        if self.max_bytes <= 0 or size > self.max_entry_bytes or (ttl is not None and ttl <= 0):
+            return
+        self.pop(key)
+        expires = time.monotonic() + ttl if ttl is not None else 0.0
+        self._entries[key] = (value, size, expires)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            self.pop(next(iter(self._entries)))
+            _metrics.incr(f"cache_evictions_total.{self.name}")
+        _metrics.gauge(f"cache_bytes.{self.name}", self._bytes)
+
+    def pop(self, key: str) -> Any:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self._bytes -= entry[1]
+        _metrics.gauge(f"cache_bytes.{self.name}", self._bytes)
+        return entry[0]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+        _metrics.gauge(f"cache_bytes.{self.name}", 0)
+
+
+def _digest_text(text: str) -> str:
+    digest = hashlib.sha256()
+    for start in range(0, len(text), OFFLOAD_CHUNK_BYTES):
+        digest.update(text[start:start + OFFLOAD_CHUNK_BYTES].encode("utf-8"))
+    return digest.hexdigest()
+
+
+# Successful conversions keyed by API key, input digest and every conversion option.
+RESULT_CACHE_BYTES = int(os.getenv("TWEEKIT_RESULT_CACHE_BYTES", str(128 * 1024 * 1024)))
+RESULT_CACHE_SECONDS = float(os.getenv("TWEEKIT_RESULT_CACHE_SECONDS", "600"))
+
+_result_cache = _LRUCache("result", RESULT_CACHE_BYTES)
+
+
+def _result_cache_key(apiKey: str, blob_digest: str, inext: str, outfmt: str, options: Dict[str, Any]) -> str:
+    material = json.dumps([apiKey, blob_digest, inext, outfmt, options], sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _conversion_payload(content: bytes, content_type: str, outfmt: str) -> Any:
+    """Wrap binary TweekIT output as an `Image`/`File`; None for JSON or unknown types."""
+    lowered_ct = content_type.lower()
+    if lowered_ct.startswith("image/"):
+        image_format = lowered_ct.split("/")[-1]
+        return Image(data=content, format=image_format)
+    if lowered_ct == "application/pdf":
+        return File(data=content, format="pdf")
+    if "json" in lowered_ct:
+        return None
+    if lowered_ct.startswith("application/") or lowered_ct == "application/octet-stream":
+        ext = outfmt.lower().strip(".") or "bin"
+        return File(data=content, format=ext)
+    return None
+
+
+# Outputs that are the input itself when no other option is set, with the leading
+# bytes a matching input starts with. PDF only counts with noRasterize; otherwise
+# TweekIT renders its first page.
+_IDENTITY_FORMATS: Dict[str, tuple[str, tuple[tuple[int, bytes], ...]]] = {
+    "png": ("image/png", ((0, b"\x89PNG\r\n\x1a\n"),)),
+    "jpg": ("image/jpeg", ((0, b"\xff\xd8\xff"),)),
+    "webp": ("image/webp", ((0, b"RIFF"), (8, b"WEBP"))),
+    "bmp": ("image/bmp", ((0, b"BM"),)),
+    "pdf": ("application/pdf", ((0, b"%PDF-"),)),
+}
+_IDENTITY_OPTIONS = {"width": 0, "height": 0, "x1": 0, "y1": 0, "x2": 0, "y2": 0, "page": 1, "alpha": True, "bgColor": ""}
+
+
+def _is_identity(inext: str, outfmt: str, options: Dict[str, Any]) -> bool:
+    """Whether converting would hand back the input file unchanged."""
+    fmt = _normalize_extension(outfmt)
+    if fmt not in _IDENTITY_FORMATS or _normalize_extension(inext) != fmt:
+        return False
+    if fmt == "pdf" and not options["noRasterize"]:
+        return False
+    return all(options[name] == default for name, default in _IDENTITY_OPTIONS.items())
+
+
+def _identity_payload(outfmt: str, content: Optional[bytes]) -> Any:
+    """Wrap the input as the result of an identity conversion; None if it isn't really that format."""
+    fmt = _normalize_extension(outfmt)
+    content_type, signature = _IDENTITY_FORMATS[fmt]
+    # A mislabelled input still goes upstream, where it is actually converted.
+    if not content or any(content[offset:offset + len(magic)] != magic for offset, magic in signature):
+        return None
+    _metrics.incr(f"convert_identity_total.{fmt}")
+    return _conversion_payload(content, content_type, outfmt)
+
+
+# Plain raster resizes, crops and alpha flattening can be done in the worker pool
+# with Pillow (`tweekit-mcp[raster]`) instead of round-tripping through TweekIT.
+LOCAL_RASTER = os.getenv("TWEEKIT_LOCAL_RASTER", "0") != "0"
+LOCAL_RASTER_MAX_PIXELS = int(os.getenv("TWEEKIT_LOCAL_RASTER_MAX_PIXELS", str(40_000_000)))
+
+
+async def _render_locally(inext: str, outfmt: str, source: Optional[bytes], blob: str, options: Dict[str, Any]) -> Optional[tuple[bytes, str]]:
+    """Run the conversion with the local raster engine; None when it should go upstream."""
+    ext, fmt = _normalize_extension(inext), _normalize_extension(outfmt)
+    if not (LOCAL_RASTER and raster_engine.available() and raster_engine.supports(ext, fmt, options)):
+        return None
+    if source is None:
+        source = await _offload(len(blob), _b64decode, blob)
+    if not source:
+        return None
+    started = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            _get_offload_executor(),
+            functools.partial(raster_engine.render, source, ext, fmt, options, LOCAL_RASTER_MAX_PIXELS),
+        )
+    except raster_engine.RasterError as exc:
+        _metrics.incr("raster_local_fallback_total")
+        logger.info("Converting %s to %s upstream: %s", ext, fmt, exc)
+        return None
+    _metrics.incr(f"raster_local_total.{fmt}")
+    _metrics.observe("raster_local_ms", (time.perf_counter() - started) * 1000.0)
+    return result
+
+
+# Upstream conversions tried per call to fit maxBytes/maxPixels when Pillow isn't
+# installed to re-encode the first result locally.
+BUDGET_MAX_ATTEMPTS = int(os.getenv("TWEEKIT_BUDGET_MAX_ATTEMPTS", "4"))
+_COMPACT_OUTPUTS = frozenset({"webp", "jpg"})
+
+
+async def _convert_within_budget(
+    attempt: Callable[..., Awaitable[Any]],
+    outfmt: str,
+    width: int,
+    height: int,
+    max_bytes: int,
+    max_pixels: int,
+) -> Any:
+    """Convert with `attempt(outfmt=, width=, height=)` until the image fits the budget.
+
+    A fixed requested size is scaled down to `max_pixels` up front. If the result is
+    still too large it is re-encoded locally with Pillow when available; otherwise it
+    is converted again as WebP and then at smaller widths. Every attempt goes through
+    the result cache. Results that aren't images are returned unchanged.
+    """
+    if max_pixels and width and height and width * height > max_pixels:
+        scale = math.sqrt(max_pixels / (width * height))
+        width, height = max(1, int(width * scale)), max(1, int(height * scale))
+
+    # The first conversion always happens, so fewer than one attempt means one.
+    max_attempts = max(1, BUDGET_MAX_ATTEMPTS)
+    result = await attempt(outfmt=outfmt, width=width, height=height)
+    for attempts in range(1, max_attempts + 1):
+        if not isinstance(result, Image) or result.data is None:
+            return result
+        data = result.data
+        size = image_size(data)
+        pixels = size[0] * size[1] if size else 0
+        over_pixels = bool(max_pixels and pixels > max_pixels)
+        over_bytes = bool(max_bytes and len(data) > max_bytes)
+        if not over_pixels and not over_bytes:
+            _metrics.observe("budget_fit_attempts", attempts)
+            return result
+
+        if raster_engine.available():
+            try:
+                loop = asyncio.get_running_loop()
+                content, content_type, _ = await loop.run_in_executor(
+                    _get_offload_executor(),
+                    functools.partial(raster_engine.fit, data, max_bytes, max_pixels, LOCAL_RASTER_MAX_PIXELS),
+                )
+            except raster_engine.RasterError as exc:
+                logger.info("Could not fit the output locally: %s", exc)
+            else:
+                _metrics.incr("budget_fit_total.local")
+                _metrics.observe("budget_fit_attempts", attempts)
+                return Image(data=content, format=content_type.split("/")[-1])
+        if attempts == max_attempts:
+            break
+
+        next_format, next_width, next_height = outfmt, width, height
+        scale = math.sqrt(max_pixels / pixels) if over_pixels else 1.0
+        if over_bytes and _normalize_extension(outfmt) not in _COMPACT_OUTPUTS:
+            next_format = "webp"
+        elif over_bytes:
+            scale = min(scale, 0.9 * math.sqrt(max_bytes / len(data)))
+        if size is not None and scale < 1.0:
+            next_width, next_height = max(1, int(size[0] * scale)), 0
+        if (next_format, next_width, next_height) == (outfmt, width, height):
+            break
+        outfmt, width, height = next_format, next_width, next_height
+        _metrics.incr("budget_fit_total.upstream")
+        result = await attempt(outfmt=outfmt, width=width, height=height)
+
+    _metrics.incr("budget_fit_failed_total")
+    detail = f"{len(result.data)} bytes" + (f" at {size[0]}x{size[1]}" if size else "")
+    return {
+        "error": "Could not fit the converted image within the requested maxBytes/maxPixels.",
+        "details": f"The last attempt was {detail} as {outfmt}.",
+    }
+
+
+# Candidates for outfmt="auto"; the smallest result wins. List only raster formats
+# both TweekIT and your MCP clients accept. Savings are reported against the first.
+AUTO_FORMATS = tuple(part.strip() for part in os.getenv("TWEEKIT_AUTO_FORMATS", "png,webp,jpg").split(",") if part.strip())
+
+
+def _auto_formats_error(formats: List[str]) -> Optional[Dict[str, Any]]:
+    allowed = set(raster_engine.OUTPUT_FORMATS) | {_normalize_extension(fmt) for fmt in AUTO_FORMATS}
+    unsupported = [fmt for fmt in formats if _normalize_extension(fmt) not in allowed]
+    if formats and not unsupported:
+        return None
+    return {
+        "error": "Unsupported autoFormats." if unsupported else "autoFormats must list at least one format.",
+        "details": f"Choose from: {', '.join(sorted(allowed))}.",
+    }
+
+
+async def _convert_auto(
+    attempt: Callable[..., Awaitable[Any]], keep_alpha: bool, formats: Optional[List[str]] = None
+) -> Any:
+    """Convert to the smallest of `formats` (default AUTO_FORMATS) with `attempt(outfmt=)`.
+
+    With Pillow, only the first format is converted upstream and the others are
+    encoded locally from it. Without Pillow, each candidate costs an upstream
+    conversion, so they are only compared when the caller listed `formats`;
+    otherwise the first of AUTO_FORMATS is returned. JPEG is not chosen when it
+    would drop transparency the caller asked to keep. Returns the image followed
+    by a summary of the bytes saved.
+    """
+    requested = formats is not None
+    formats = tuple(dict.fromkeys(_normalize_extension(fmt) for fmt in (formats or AUTO_FORMATS)))
+    baseline_format = formats[0]
+    if not raster_engine.available() and not requested:
+        baseline = chosen = await attempt(outfmt=baseline_format)
+        if not isinstance(baseline, Image) or not baseline.data:
+            return baseline
+        _metrics.incr("auto_format_fallback_total")
+    elif raster_engine.available():
+        baseline = await attempt(outfmt=baseline_format)
+        if not isinstance(baseline, Image) or not baseline.data:
+            return baseline
+        chosen = baseline
+        try:
+            loop = asyncio.get_running_loop()
+            content, content_type, _ = await loop.run_in_executor(
+                _get_offload_executor(),
+                functools.partial(raster_engine.smallest, baseline.data, formats, keep_alpha, LOCAL_RASTER_MAX_PIXELS),
+            )
+        except raster_engine.RasterError as exc:
+            logger.info("Keeping the %s result for outfmt=auto: %s", baseline_format, exc)
+        else:
+            if content is not baseline.data:
+                chosen = Image(data=content, format=content_type.split("/")[-1])
+    else:
+        results = await asyncio.gather(*(attempt(outfmt=fmt) for fmt in formats))
+        baseline = results[0]
+        if not isinstance(baseline, Image) or not baseline.data:
+            return baseline
+        drop_jpg = keep_alpha and png_has_alpha(baseline.data)
+        candidates = [
+            result for fmt, result in zip(formats, results)
+            if isinstance(result, Image) and result.data and not (drop_jpg and fmt == "jpg")
+        ]
+        chosen = min(candidates, key=lambda result: len(result.data))
+
+    chosen_format = sniff_extension(chosen.data[:SNIFF_BYTES]) or baseline_format
+    saved = len(baseline.data) - len(chosen.data)
+    _metrics.incr(f"auto_format_total.{chosen_format}")
+    _metrics.incr("auto_format_bytes_saved_total", saved)
+    return [chosen, {
+        "format": chosen_format,
+        "bytes": len(chosen.data),
+        "baselineFormat": baseline_format,
+        "baselineBytes": len(baseline.data),
+        "bytesSaved": saved,
+    }]
+
+
+# Progressive conversions: a preview this wide is returned first while the full
+# render finishes in the background as an artifact fetched with `get_artifact`.
+PREVIEW_WIDTH = int(os.getenv("TWEEKIT_PREVIEW_WIDTH", "512"))
+ARTIFACT_SECONDS = float(os.getenv("TWEEKIT_ARTIFACT_SECONDS", "600"))
+ARTIFACT_BYTES = int(os.getenv("TWEEKIT_ARTIFACT_BYTES", str(256 * 1024 * 1024)))
+ARTIFACT_MAX_PENDING = int(os.getenv("TWEEKIT_ARTIFACT_MAX_PENDING", "16"))
+# Directory shared by worker processes, so any worker can answer `get_artifact`.
+ARTIFACT_DIR = os.getenv("TWEEKIT_ARTIFACT_DIR", "")
+ARTIFACT_DISK_BYTES = int(os.getenv("TWEEKIT_ARTIFACT_DISK_BYTES", str(1024 * 1024 * 1024)))
+_ARTIFACT_POLL_SECONDS = 0.1
+
+_PREVIEW_FORMATS = frozenset({"png", "jpg", "webp", "gif", "bmp", "tiff", "auto"})
+
+
+def _result_size(result: Any) -> int:
+    """Approximate bytes held by a tool result, counting Image/File payloads in lists."""
+    if isinstance(result, (Image, File)):
+        return len(result.data or b"")
+    if isinstance(result, (list, tuple)):
+        return sum(_result_size(item) for item in result)
+    return len(repr(result))
+
+
+def _flatten_result(value: Any, payloads: List[bytes]) -> Any:
+    """JSON-ready copy of a tool result with Image/File bodies moved to `payloads`."""
+    if isinstance(value, (Image, File)):
+        data = value.data or b""
+        payloads.append(data)
+        return {
+            "$media": "image" if isinstance(value, Image) else "file",
+            "format": value._format,
+            "name": getattr(value, "_name", None),
+            "bytes": len(data),
+        }
+    if isinstance(value, (list, tuple)):
+        return [_flatten_result(item, payloads) for item in value]
+    if isinstance(value, dict):
+        return {key: _flatten_result(item, payloads) for key, item in value.items()}
+    return value
+
+
+def _inflate_result(value: Any, body: memoryview) -> tuple[Any, memoryview]:
+    if isinstance(value, list):
+        items = []
+        for item in value:
+            item, body = _inflate_result(item, body)
+            items.append(item)
+        return items, body
+    if isinstance(value, dict) and "$media" in value:
+        data, body = bytes(body[:value["bytes"]]), body[value["bytes"]:]
+        if value["$media"] == "image":
+            return Image(data=data, format=value["format"]), body
+        return File(data=data, format=value["format"], name=value["name"]), body
+    if isinstance(value, dict):
+        inflated = {}
+        for key, item in value.items():
+            inflated[key], body = _inflate_result(item, body)
+        return inflated, body
+    return value, body
+
+
+class _ArtifactDirectory:
+    """Artifacts in a directory shared by worker processes.
+
+    Each artifact is one file: a JSON metadata line (owner, and the result with
+    Image/File bodies replaced by their lengths) followed by those bodies. A
+    pending marker without a result is written when a render starts. Files expire
+    `ttl` seconds after they were last written and the directory is kept under
+    `max_bytes` by removing the oldest first. Writes go through a temporary file
+    and `os.replace`, like `http_cache.DiskCache`.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, ttl: float) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+    def _path(self, artifact_id: str) -> Path:
+        return self.directory / f"{hashlib.sha256(artifact_id.encode('utf-8')).hexdigest()}.artifact"
+
+    def read(self, artifact_id: str) -> Optional[tuple[str, bool, Any]]:
+        """Return (owner, ready, result), or None if the artifact is unknown or expired."""
+        path = self._path(artifact_id)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                path.unlink()
+                return None
+            with path.open("rb") as handle:
+                metadata = json.loads(handle.readline())
+                body = handle.read()
+        except (OSError, ValueError):
+            return None
+        if metadata.get("id") != artifact_id:
+            return None
+        if "result" not in metadata:
+            return metadata["owner"], False, None
+        result, _ = _inflate_result(metadata["result"], memoryview(body))
+        return metadata["owner"], True, result
+
+    def write(self, artifact_id: str, owner: str, ready: bool, result: Any = None) -> None:
+        """Store a pending marker, or the finished result; unstorable results remove the marker."""
+        metadata: Dict[str, Any] = {"id": artifact_id, "owner": owner}
+        payloads: List[bytes] = []
+        if ready:
+            metadata["result"] = _flatten_result(result, payloads)
+        try:
+            header = json.dumps(metadata).encode("utf-8") + b"\n"
+        except (TypeError, ValueError):
+            self.remove(artifact_id)
+            return
+        if len(header) + sum(len(payload) for payload in payloads) > self.max_bytes // 4:
+            self.remove(artifact_id)
+            return
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(header)
+                for payload in payloads:
+                    handle.write(payload)
+            os.replace(tmp_name, self._path(artifact_id))
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_name)
+            return
+        if ready:
+            self._evict()
+
+    def remove(self, artifact_id: str) -> None:
+        with contextlib.suppress(OSError):
+            self._path(artifact_id).unlink()
+
+    def _evict(self) -> None:
+        now = time.time()
+        entries = []
+        for path in self.directory.glob("*.artifact"):
+            with contextlib.suppress(OSError):
+                stat = path.stat()
+                if now - stat.st_mtime > self.ttl:
+                    path.unlink()
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(OSError):
+                path.unlink()
+            total -= size
+
+
+class _Artifacts:
+    """Background renders by id: running tasks, then finished results until they expire.
+
+    Finished results are kept in memory by the worker that rendered them and, when
+    a directory is configured, written there so every worker can serve them.
+    Artifacts belong to the API key that asked for them.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, directory: str = "", disk_bytes: int = 0) -> None:
+        self.ttl = ttl
+        self._pending: Dict[str, tuple[str, asyncio.Task]] = {}
+        self._done = _LRUCache("artifact", max_bytes, max_entry_bytes=max_bytes)
+        self._shared = _ArtifactDirectory(directory, disk_bytes or max_bytes, ttl) if directory else None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def _in_executor(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(_get_offload_executor(), fn, *args)
+
+    def start(self, owner: str, work: Awaitable[Any]) -> str:
+        artifact_id = secrets.token_urlsafe(16)
+        if self._shared is not None:
+            # A small marker, written before the id is handed out so other workers report it as pending.
+            self._shared.write(artifact_id, owner, ready=False)
+        task = asyncio.ensure_future(self._settle(artifact_id, owner, work))
+        self._pending[artifact_id] = (owner, task)
+        _metrics.gauge("artifacts_pending", len(self._pending))
+        task.add_done_callback(functools.partial(self._finished, artifact_id))
+        return artifact_id
+
+    async def _settle(self, artifact_id: str, owner: str, work: Awaitable[Any]) -> None:
+        try:
+            result = await work
+        except asyncio.CancelledError:
+            if self._shared is not None:
+                self._shared.remove(artifact_id)
+            raise
+        except Exception as exc:
+            result = {"error": f"An unexpected error occurred: {exc}"}
+        await self._store(artifact_id, owner, result)
+
+    def _finished(self, artifact_id: str, task: asyncio.Task) -> None:
+        self._pending.pop(artifact_id)
+        _metrics.gauge("artifacts_pending", len(self._pending))
+
+    async def _store(self, artifact_id: str, owner: str, result: Any) -> None:
+        self._done.put(artifact_id, (owner, result), _result_size(result), self.ttl)
+        if self._shared is not None:
+            await self._in_executor(self._shared.write, artifact_id, owner, True, result)
+
+    async def put(self, owner: str, result: Any) -> str:
+        """Keep a finished result as an artifact and return its id."""
+        artifact_id = secrets.token_urlsafe(16)
+        await self._store(artifact_id, owner, result)
+        return artifact_id
+
+    async def get(self, owner: str, artifact_id: str, wait: float) -> tuple[bool, Any]:
+        """Return (found, result); result is None while the render is still running."""
+        pending = self._pending.get(artifact_id)
+        if pending is not None and pending[0] == owner:
+            await asyncio.wait({pending[1]}, timeout=wait)
+            if not pending[1].done():
+                return True, None
+        done = self._done.get(artifact_id)
+        if done is not None:
+            return (True, done[1]) if done[0] == owner else (False, None)
+        if self._shared is None:
+            return False, None
+        # Rendered, or still rendering, in another worker process.
+        deadline = time.monotonic() + wait
+        while True:
+            stored = await self._in_executor(self._shared.read, artifact_id)
+            if stored is None or stored[0] != owner:
+                return False, None
+            if stored[1]:
+                self._done.put(artifact_id, (owner, stored[2]), _result_size(stored[2]), self.ttl)
+                return True, stored[2]
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True, None
+            await asyncio.sleep(min(_ARTIFACT_POLL_SECONDS, remaining))
+
+    async def aclose(self) -> None:
+        tasks = [task for _, task in self._pending.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._done.clear()
+
+
+_artifacts = _Artifacts(ARTIFACT_BYTES, ARTIFACT_SECONDS, ARTIFACT_DIR, ARTIFACT_DISK_BYTES)
+
+
+def _preview_size(width: int, height: int) -> Optional[tuple[int, int]]:
+    """Preview dimensions for a render of `width` x `height`, or None if it is already small."""
+    largest = max(width, height)
+    if PREVIEW_WIDTH <= 0 or 0 < largest <= PREVIEW_WIDTH:
+        return None
+    if width and height:
+        scale = PREVIEW_WIDTH / largest
+        return max(1, round(width * scale)), max(1, round(height * scale))
+    if height:
+        return 0, PREVIEW_WIDTH
+    return PREVIEW_WIDTH, 0
+
+
+async def _convert_progressive(
+    attempt: Callable[..., Awaitable[Any]], apiKey: str, outfmt: str, width: int, height: int, blob_length: int
+) -> Any:
+    """Return a quick preview while `attempt(width=, height=)` renders in full in the background.
+
+    The full render starts first and runs under its own payload reservation. If it
+    finishes before the preview, or the output isn't an image, the call just
+    returns the full result.
+    """
+    preview_size = _preview_size(width, height)
+    if (
+        preview_size is None
+        or _normalize_extension(outfmt) not in _PREVIEW_FORMATS
+        or len(_artifacts) >= ARTIFACT_MAX_PENDING
+    ):
+        return await attempt(width=width, height=height)
+
+    async def render_full() -> Any:
+        started = time.perf_counter()
+        try:
+            async with _payload_budget.reserve(estimate_base64_request_bytes(blob_length)):
+                return await attempt(width=width, height=height)
+        except BudgetExceeded as exc:
+            return _budget_error(exc)
+        finally:
+            _metrics.observe("artifact_render_ms", (time.perf_counter() - started) * 1000.0)
+
+    full = asyncio.ensure_future(render_full())
+    try:
+        preview = await attempt(width=preview_size[0], height=preview_size[1])
+    except BaseException:
+        full.cancel()
+        raise
+    preview_image = preview[0] if isinstance(preview, list) else preview
+    if full.done() or not isinstance(preview_image, Image):
+        return await full
+
+    artifact_id = _artifacts.start(_tenant_label(apiKey), full)
+    _metrics.incr("progressive_total")
+    summary = {
+        "artifactId": artifact_id,
+        "status": "pending",
+        "previewWidth": preview_size[0],
+        "previewHeight": preview_size[1],
+        "expiresInSeconds": ARTIFACT_SECONDS,
+    }
+    return [preview_image, summary]
+
+
+# Speculative page prefetch: after page N of a document converts, pages N+1..N+K are
+# rendered into the result cache in the background while the lane has spare slots.
+PREFETCH_PAGES = int(os.getenv("TWEEKIT_PREFETCH_PAGES", "0"))
+PREFETCH_CONCURRENCY = int(os.getenv("TWEEKIT_PREFETCH_CONCURRENCY", "2"))
+PREFETCH_MAX_BYTES = int(os.getenv("TWEEKIT_PREFETCH_MAX_BYTES", str(16 * 1024 * 1024)))
+
+_prefetching: contextvars.ContextVar[bool] = contextvars.ContextVar("tweekit_prefetching", default=False)
+_prefetch_tasks: "set[asyncio.Task]" = set()
+_prefetch_inflight: Dict[str, "asyncio.Future[None]"] = {}
+# Cache keys of prefetched pages not yet requested, oldest first.
+_prefetched: "OrderedDict[str, None]" = OrderedDict()
+_PREFETCHED_MAX_KEYS = 4096
+
+
+def _lane_has_room(lane: str) -> bool:
+    snapshot = _conversion_lanes[lane].snapshot()
+    return snapshot["waiting"] == 0 and snapshot["active"] < snapshot["maxConcurrent"]
+
+
+def _payload_budget_has_room(nbytes: int) -> bool:
+    snapshot = _payload_budget.snapshot()
+    if snapshot["limitBytes"] <= 0:
+        return True
+    return snapshot["waiting"] == 0 and snapshot["usedBytes"] + nbytes <= snapshot["limitBytes"]
+
+
+def _record_prefetched(cache_key: str) -> None:
+    _metrics.incr("prefetch_pages_total")
+    _prefetched[cache_key] = None
+    _prefetched.move_to_end(cache_key)
+    while len(_prefetched) > _PREFETCHED_MAX_KEYS:
+        _prefetched.popitem(last=False)
+
+
+def _record_prefetch_hit(cache_key: str) -> None:
+    if not _prefetching.get() and _prefetched.pop(cache_key, "missing") is None:
+        _metrics.incr("prefetch_hits_total")
+
+
+@contextlib.contextmanager
+def _prefetch_claim(cache_key: str) -> Any:
+    """Mark a page as being prefetched so a request for it waits instead of converting it again."""
+    future = asyncio.get_running_loop().create_future()
+    _prefetch_inflight[cache_key] = future
+    try:
+        yield
+    finally:
+        _prefetch_inflight.pop(cache_key, None)
+        future.set_result(None)
+
+
+async def _prefetch_pages(
+    attempt: Callable[..., Awaitable[Any]], cache_key: Callable[[int], str], page: int, lane: str, blob_length: int
+) -> None:
+    """Convert the pages after `page` with `attempt(page=)`, stopping at the first that fails."""
+    _prefetching.set(True)
+    request_bytes = estimate_base64_request_bytes(blob_length)
+    for next_page in range(page + 1, page + 1 + PREFETCH_PAGES):
+        if cache_key(next_page) in _prefetch_inflight:
+            continue
+        if not _lane_has_room(lane) or not _payload_budget_has_room(request_bytes):
+            _metrics.incr("prefetch_skipped_total.busy")
+            return
+        try:
+            async with _payload_budget.reserve(request_bytes):
+                with _prefetch_claim(cache_key(next_page)):
+                    result = await attempt(page=next_page)
+        except BudgetExceeded:
+            _metrics.incr("prefetch_skipped_total.busy")
+            return
+        if not isinstance(result, (Image, File)):
+            # Usually the page after the last one.
+            return
+
+
+def _schedule_prefetch(
+    attempt: Callable[..., Awaitable[Any]],
+    cache_key: Callable[[int], str],
+    inext: str,
+    outfmt: str,
+    blob_length: int,
+    options: Dict[str, Any],
+) -> None:
+    """Start prefetching the pages after `options["page"]` when the input has pages and budget allows."""
+    if PREFETCH_PAGES <= 0 or _prefetching.get() or options["noRasterize"]:
+        return
+    # Cropped renders are tiles or regions of one page, not a page walk.
+    if any(options[name] for name in ("x1", "y1", "x2", "y2")):
+        return
+    if _normalize_extension(inext) in _RASTER_INPUTS - {"tiff"}:
+        return
+    if estimate_decoded_length(blob_length) > PREFETCH_MAX_BYTES:
+        _metrics.incr("prefetch_skipped_total.size")
+        return
+    if len(_prefetch_tasks) >= PREFETCH_CONCURRENCY:
+        _metrics.incr("prefetch_skipped_total.concurrency")
+        return
+    lane = _conversion_lane(inext, outfmt, blob_length, options["noRasterize"])
+    task = asyncio.create_task(_prefetch_pages(attempt, cache_key, options["page"], lane, blob_length))
+    _prefetch_tasks.add(task)
+    task.add_done_callback(_prefetch_tasks.discard)
+
+
+def _cached_conversion(apiKey: str, blob_digest: str, inext: str, outfmt: str, options: Dict[str, Any]) -> Any:
+    cached = _result_cache.get(_result_cache_key(apiKey, blob_digest, inext, outfmt, options))
+    if cached is None:
+        return None
+    content, content_type = cached
+    return _conversion_payload(content, content_type, outfmt)
+
+
+@contextlib.asynccontextmanager
+async def _background_services() -> AsyncIterator[None]:
+    """Run per-worker housekeeping tasks for the lifetime of the server."""
+    global _offload_executor
+    tasks: List[asyncio.Task] = [asyncio.create_task(_sample_loop_lag())]
+    if METRICS_DIR:
+        tasks.append(asyncio.create_task(_flush_metrics_periodically()))
+    if UPSTREAM_PREWARM_CONNECTIONS > 0:
+        tasks.append(asyncio.create_task(_keep_upstream_warm()))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await _artifacts.aclose()
+        for task in list(_prefetch_tasks):
+            task.cancel()
+        await asyncio.gather(*_prefetch_tasks, return_exceptions=True)
+        if METRICS_DIR:
+            with contextlib.suppress(OSError):
+                _worker_snapshot_path().unlink()
+        loop = asyncio.get_running_loop()
+        for owner, client in list(_clients.values()):
+            if owner is loop:
+                await client.aclose()
+        if _offload_executor is not None:
+            _offload_executor.shutdown(wait=False)
+            _offload_executor = None
+
+
+class _ToolMetricsMiddleware(Middleware):
+    """Count tool calls and record their latency."""
+
+    async def on_call_tool(self, context, call_next):
+        name = context.message.name
+        _metrics.incr(f"tool_calls_total.{name}")
+        _metrics.adjust("tool_calls_in_flight", 1)
+        started = time.perf_counter()
+        try:
+            return await call_next(context)
+        except Exception:
+            _metrics.incr(f"tool_errors_total.{name}")
+            raise
+        finally:
+            _metrics.adjust("tool_calls_in_flight", -1)
+            _metrics.observe(f"tool_latency_ms.{name}", (time.perf_counter() - started) * 1000.0)
+
+
+# How often a tool call served over HTTP checks whether its client is still connected.
+DISCONNECT_POLL_SECONDS = float(os.getenv("TWEEKIT_DISCONNECT_POLL_SECONDS", "0.5"))
+
+
+async def _watch_disconnect(request: Any, scope: anyio.CancelScope) -> None:
+    while not scope.cancel_called:
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+        if await request.is_disconnected():
+            scope.cancel()
+
+
+class _CancelOnDisconnectMiddleware(Middleware):
+    """Cancel a tool call once the HTTP client that made it goes away.
+
+    With stateless HTTP every message is its own session, so a cancellation
+    notification cannot reach the call it names; the dropped connection is the
+    signal that does. Sessions that stay open (stdio) already cancel calls on
+    notification. Either way the tool unwinds, aborting its httpx requests and
+    releasing its payload budget.
+    """
+
+    async def on_call_tool(self, context, call_next):
+        try:
+            request = get_http_request()
+        except RuntimeError:
+            request = None
+        if request is None or DISCONNECT_POLL_SECONDS <= 0:
+            return await call_next(context)
+
+        with anyio.CancelScope() as scope:
+            watcher = asyncio.create_task(_watch_disconnect(request, scope))
+            try:
+                return await call_next(context)
+            finally:
+                watcher.cancel()
+        _metrics.incr(f"tool_cancellations_total.{context.message.name}")
+        logger.info("Client disconnected; cancelled %s call", context.message.name)
+        raise ToolError("Client disconnected; the call was cancelled.")
+
+
+mcp.add_middleware(_ToolMetricsMiddleware())
+mcp.add_middleware(_CancelOnDisconnectMiddleware())
+
 # Remapping table so files with the alternate versions of known filename extensions aren't rejected.
 # (Though I think MediaRich already supports these, so I don't know why this is here....)
 _EXTENSION_ALIASES: Dict[str, str] = {
@@ -45,16 +1578,24 @@ def _normalize_extension(ext: str) -> str:
     return _EXTENSION_ALIASES.get(normalized, normalized)
 
 
-def _resolve_extension(url: str, override: Optional[str], content_type: Optional[str]) -> str:
-    """Determine the best input extension for a downloaded file."""
+def _resolve_extension(url: str, override: Optional[str], content_type: Optional[str], head: bytes = b"") -> str:
+    """Determine the best input extension for a downloaded file.
+
+    `head` is the start of the body, when it has been read. A type recognised from
+    it beats the URL path unless the path names a variant of that type.
+    """
     if override:
         candidate = _normalize_extension(override)
         if candidate:
             return candidate
 
+    sniffed = sniff_extension(head) if head else None
     path_ext = _normalize_extension(Path(urlparse(url).path).suffix)
-    if path_ext:
+    if path_ext and (sniffed is None or matches(path_ext, sniffed)):
         return path_ext
+    if sniffed:
+        _metrics.incr("content_sniff_resolved_total")
+        return sniffed
 
     if content_type:
         mime = content_type.split(";", 1)[0].strip()
@@ -70,6 +1611,24 @@ def _resolve_extension(url: str, override: Optional[str], content_type: Optional
     return "bin"
 
 
+def _reconcile_extension(inext: str, head: Optional[bytes]) -> str:
+    """Fill in a blank `inext` from the payload's signature.
+
+    An extension the caller gave is kept even when the signature disagrees; the
+    mismatch is only logged and counted. Extensions taken from a URL path are
+    checked against the signature earlier, in `_resolve_extension`.
+    """
+    sniffed = sniff_extension(head) if head else None
+    if sniffed is None or (inext and matches(_normalize_extension(inext), sniffed)):
+        return inext
+    if not inext.strip():
+        _metrics.incr("content_sniff_resolved_total")
+        return sniffed
+    _metrics.incr("content_sniff_mismatch_total")
+    logger.info("Input declared as '%s' looks like '%s'; converting it as declared", inext, sniffed)
+    return inext
+
+
 def _resolve_credentials(provided_key: Optional[str], provided_secret: Optional[str]) -> tuple[str, str]:
     api_key = (provided_key or os.getenv("TWEEKIT_API_KEY") or "").strip()
     api_secret = (provided_secret or os.getenv("TWEEKIT_API_SECRET") or "").strip()
@@ -113,11 +1672,10 @@ async def version() -> str:
     """Get current version of the TweekIT API."""
     url = f"{BASE_URL}version"
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            body = (response.text or "").strip()
-            return body or "unknown"
+        response = await _upstream_client().get(url, timeout=_timeout(10.0))
+        response.raise_for_status()
+        body = (response.text or "").strip()
+        return body or "unknown"
     except httpx.HTTPStatusError as e:
         logger.warning("TweekIT version probe failed: status=%s", getattr(e.response, "status_code", "unknown"))
         details = _extract_error_details(e.response)
@@ -135,6 +1693,11 @@ async def mcp_version() -> str:
     """Return the TweekIT MCP server version."""
     return SERVER_VERSION
 
+@mcp.resource("config://tweekit-metrics", mime_type="application/json")
+async def metrics() -> str:
+    """Return server metrics as JSON, aggregated across worker processes."""
+    return json.dumps(_collect_metrics())
+
 @mcp.tool()
 async def doctype(
     apiKey: Annotated[Optional[str], Field(description="TweekIT API key passed via the ApiKey header. Defaults to the TWEEKIT_API_KEY environment variable when omitted.")] = None,
@@ -158,26 +1721,28 @@ async def doctype(
         return {"error": str(exc)}
 
     url = f"{BASE_URL}doctype"
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        try:
-            response = await client.get(url, headers={"ApiKey": key, "ApiSecret": secret}, params={"extension": extension})
-            response.raise_for_status()  # Raise an exception for HTTP errors
+    client = _upstream_client()
+    try:
+        response = await client.get(
+            url, headers={"ApiKey": key, "ApiSecret": secret}, params={"extension": extension}, timeout=_timeout(10.0)
+        )
+        response.raise_for_status()  # Raise an exception for HTTP errors
 
-            data = response.json()
-            if isinstance(data, dict):
-                return data
-            else:
-                return {"result": data}
-
-        except httpx.HTTPStatusError as e:
-            print(f"HTTP error fetching supported file formats given '{extension}': {e}")
-            return {"error": f"Failed to fetch user data. Status: {e.response.status_code}"}
-        except httpx.RequestError as e:
-            print(f"Network error fetching supported file formats given '{extension}': {e}")
-            return {"error": f"Network error: {e}"}
-        except Exception as e:
-            print(f"An unexpected error occurred: {e}")
-            return {"error": f"An unexpected error occurred: {e}"}
+        data = response.json()
+        if isinstance(data, dict):
+            return data
+        else:
+            return {"result": data}
+
+    except httpx.HTTPStatusError as e:
+        print(f"HTTP error fetching supported file formats given '{extension}': {e}")
+        return {"error": f"Failed to fetch user data. Status: {e.response.status_code}"}
+    except httpx.RequestError as e:
+        print(f"Network error fetching supported file formats given '{extension}': {e}")
+        return {"error": f"Network error: {e}"}
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+        return {"error": f"An unexpected error occurred: {e}"}
 
 async def _convert_impl(
     apiKey: str,
@@ -194,9 +1759,118 @@ async def _convert_impl(
     y2: int = 0,
     page: int = 1,
     alpha: bool = True,
-    bgColor: str = ""
+    bgColor: str = "",
+    blob_digest: Optional[str] = None,
+    source: Optional[bytes] = None,  # the decoded blob, when the caller already has it
+    maxBytes: int = 0,
+    maxPixels: int = 0,
+    progressive: bool = False,
+    autoFormats: Optional[List[str]] = None,
 ) -> Any:
+    auto = outfmt.strip().lower() == "auto"
+    if auto and autoFormats is not None:
+        invalid = _auto_formats_error(autoFormats)
+        if invalid:
+            return invalid
+    if progressive or auto or maxBytes > 0 or maxPixels > 0:
+        if blob_digest is None and RESULT_CACHE_BYTES > 0:
+            blob_digest = await _offload(len(blob), _digest_text, blob)
+        attempt = functools.partial(
+            _convert_impl,
+            apiKey=apiKey,
+            apiSecret=apiSecret,
+            inext=inext,
+            blob=blob,
+            noRasterize=noRasterize,
+            x1=x1,
+            y1=y1,
+            x2=x2,
+            y2=y2,
+            page=page,
+            alpha=alpha,
+            bgColor=bgColor,
+            blob_digest=blob_digest,
+            source=source,
+            autoFormats=autoFormats,
+        )
+        if progressive:
+            return await _convert_progressive(
+                functools.partial(attempt, outfmt=outfmt, maxBytes=maxBytes, maxPixels=maxPixels),
+                apiKey,
+                outfmt,
+                width,
+                height,
+                len(blob),
+            )
+        if auto:
+            return await _convert_auto(
+                functools.partial(attempt, width=width, height=height, maxBytes=maxBytes, maxPixels=maxPixels),
+                keep_alpha=alpha,
+                formats=autoFormats,
+            )
+        return await _convert_within_budget(attempt, outfmt, width, height, maxBytes, maxPixels)
+
     url = BASE_URL
+    if source is not None:
+        inext = _reconcile_extension(inext, source[:SNIFF_BYTES])
+    else:
+        inext = _reconcile_extension(inext, _b64decode(blob[:estimate_base64_length(SNIFF_BYTES)]))
+    options = {
+        "noRasterize": noRasterize,
+        "width": width,
+        "height": height,
+        "x1": x1,
+        "y1": y1,
+        "x2": x2,
+        "y2": y2,
+        "page": page,
+        "alpha": alpha,
+        "bgColor": bgColor,
+    }
+    if _is_identity(inext, outfmt, options):
+        if source is None:
+            source = await _offload(len(blob), _b64decode, blob)
+        identity = _identity_payload(outfmt, source)
+        if identity is not None:
+            return identity
+
+    def page_key(page: int) -> str:
+        return _result_cache_key(apiKey, blob_digest, inext, outfmt, {**options, "page": page})
+
+    def prefetch_next() -> None:
+        attempt = functools.partial(
+            _convert_impl,
+            apiKey=apiKey,
+            apiSecret=apiSecret,
+            inext=inext,
+            outfmt=outfmt,
+            blob=blob,
+            blob_digest=blob_digest,
+            **{name: value for name, value in options.items() if name != "page"},
+        )
+        _schedule_prefetch(attempt, page_key, inext, outfmt, len(blob), options)
+
+    cache_key = None
+    if RESULT_CACHE_BYTES > 0:
+        if blob_digest is None:
+            blob_digest = await _offload(len(blob), _digest_text, blob)
+        cache_key = _result_cache_key(apiKey, blob_digest, inext, outfmt, options)
+        pending_prefetch = _prefetch_inflight.get(cache_key)
+        if pending_prefetch is not None and not _prefetching.get():
+            _metrics.incr("prefetch_joined_total")
+            await asyncio.shield(pending_prefetch)
+        cached = _result_cache.get(cache_key)
+        if cached is not None:
+            _record_prefetch_hit(cache_key)
+            prefetch_next()
+            return _conversion_payload(cached[0], cached[1], outfmt)
+
+    local = await _render_locally(inext, outfmt, source, blob, options)
+    if local is not None:
+        if cache_key:
+            _result_cache.put(cache_key, local, len(local[0]), RESULT_CACHE_SECONDS)
+        return _conversion_payload(local[0], local[1], outfmt)
+
     # Convert bgcolor from hex string (e.g., '#FFFFFF' or 'FFFFFF') to integer
     bg = 0
     if bgColor:
@@ -206,93 +1880,103 @@ async def _convert_impl(
         except ValueError:
             bg = 0  # fallback to black if invalid
 
+    # Serializing a multi-megabyte DocData string is CPU bound, so large bodies are
+    # encoded off the event loop before the request is sent.
+    body = await _offload(len(blob), _encode_json, {
+        "Fmt": outfmt,
+        "Width": width,
+        "Height": height,
+        "X1": x1,
+        "Y1": y1,
+        "X2": x2,
+        "Y2": y2,
+        "Bg": bg,
+        "Alpha": alpha,
+        "Page": page,
+        "NoRasterize": noRasterize,
+        "DocDataType": inext,
+        "DocData": blob
+    })
+
     # Call TweekIT
-    async with httpx.AsyncClient(default_encoding="ascii", timeout=60.0) as client:
-        try:
-            client.headers["ApiKey"] = apiKey
-            client.headers["ApiSecret"] = apiSecret
-            response = await client.post(url, json={
-                "Fmt": outfmt,
-                "Width": width,
-                "Height": height,
-                "X1": x1,
-                "Y1": y1,
-                "X2": x2,
-                "Y2": y2,
-                "Bg": bg,
-                "Alpha": alpha,
-                "Page": page,
-                "NoRasterize": noRasterize,
-                "DocDataType": inext,
-                "DocData": blob
-            })
-            response.raise_for_status()  # Raise an exception for HTTP errors
+    client = _upstream_client()
+    try:
+        lane = _conversion_lane(inext, outfmt, len(blob), noRasterize)
+        _metrics.incr(f"convert_lane_total.{lane}")
+        async with _conversion_lanes[lane].slot(apiKey, _conversion_cost(len(blob))):
+            response = await client.post(
+                url,
+                content=body,
+                headers={"Content-Type": "application/json", "ApiKey": apiKey, "ApiSecret": apiSecret},
+            )
+        response.raise_for_status()  # Raise an exception for HTTP errors
+
+        content_type = response.headers.get("content-type") or ""
+        payload = _conversion_payload(response.content, content_type, outfmt)
+        if payload is not None:
+            if cache_key:
+                _result_cache.put(cache_key, (response.content, content_type), len(response.content), RESULT_CACHE_SECONDS)
+                if _prefetching.get():
+                    _record_prefetched(cache_key)
+                prefetch_next()
+            return payload
+        if "json" in content_type.lower():
+            try:
+                return response.json()
+            except Exception:
+                pass
 
-            content_type = response.headers.get("content-type") or ""
-            lowered_ct = content_type.lower()
-            if lowered_ct.startswith("image/"):
-                image_format = lowered_ct.split("/")[-1]
-                return Image(data=response.content, format=image_format)
-            if lowered_ct == "application/pdf":
-                return File(data=response.content, format="pdf")
-            if "json" in lowered_ct:
+        # Attempt to surface TweekIT error payloads even if content type is unexpected
+        error_details = _extract_error_details(response)
+        if error_details:
+            return {"error": error_details}
+
+        return {"error": f"Unsupported content type in response: '{content_type or 'unknown'}'"}
+
+    except httpx.HTTPStatusError as e:
+        message = _extract_error_details(e.response)
+        status = getattr(e.response, "status_code", "unknown")
+        error_payload: Dict[str, Any] = {
+            "error": f"HTTP {status} from TweekIT",
+        }
+        if message:
+            error_payload["details"] = message
+        if e.request is not None and (e.request.headers.get("content-type") or "").startswith("application/json"):
+            payload_bytes = None
+            try:
+                payload_bytes = e.request.content  # type: ignore[attr-defined]
+            except AttributeError:
                 try:
-                    return response.json()
+                    payload_bytes = e.request.read()
                 except Exception:
-                    pass
-            if lowered_ct.startswith("application/") or lowered_ct == "application/octet-stream":
-                ext = outfmt.lower().strip(".") or "bin"
-                return File(data=response.content, format=ext)
-
-            # Attempt to surface TweekIT error payloads even if content type is unexpected
-            error_details = _extract_error_details(response)
-            if error_details:
-                return {"error": error_details}
-
-            return {"error": f"Unsupported content type in response: '{content_type or 'unknown'}'"}
-
-        except httpx.HTTPStatusError as e:
-            message = _extract_error_details(e.response)
-            status = getattr(e.response, "status_code", "unknown")
-            error_payload: Dict[str, Any] = {
-                "error": f"HTTP {status} from TweekIT",
-            }
-            if message:
-                error_payload["details"] = message
-            if e.request is not None and (e.request.headers.get("content-type") or "").startswith("application/json"):
-                payload_bytes = None
+                    payload_bytes = None
+            payload_json = None
+            if payload_bytes:
                 try:
-                    payload_bytes = e.request.content  # type: ignore[attr-defined]
-                except AttributeError:
-                    try:
-                        payload_bytes = e.request.read()
-                    except Exception:
-                        payload_bytes = None
-                payload_json = None
-                if payload_bytes:
-                    try:
-                        payload_json = json.loads(payload_bytes.decode("utf-8"))
-                    except Exception:
-                        payload_json = None
-                if isinstance(payload_json, dict):
-                    error_payload["tweekitPayload"] = {
-                        "DocDataType": payload_json.get("DocDataType"),
-                        "Fmt": payload_json.get("Fmt"),
-                    }
-            logger.warning("TweekIT convert error (%s): %s", status, message or str(e))
-            return error_payload
-        except httpx.RequestError as e:
-            print(f"Network error fetching document from {url}: {e}")
-            return {"error": "Network error"}
-        except Exception as e:
-            print(f"An unexpected error occurred: {e}")
-            return {"error": f"An unexpected error occurred: {e}"}
+                    payload_json = json.loads(payload_bytes.decode("utf-8"))
+                except Exception:
+                    payload_json = None
+            if isinstance(payload_json, dict):
+                error_payload["tweekitPayload"] = {
+                    "DocDataType": payload_json.get("DocDataType"),
+                    "Fmt": payload_json.get("Fmt"),
+                }
+        logger.warning("TweekIT convert error (%s): %s", status, message or str(e))
+        return error_payload
+    except SchedulerTimeout as exc:
+        return _queue_error(exc)
+    except httpx.RequestError as e:
+        print(f"Network error fetching document from {url}: {e}")
+        return {"error": "Network error"}
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+        return {"error": f"An unexpected error occurred: {e}"}
 
 
 @mcp.tool()
 async def convert(
     inext: Annotated[str, Field(description="Input file extension (e.g., pdf, docx, png).")],
-    outfmt: Annotated[str, Field(description="Requested output format to send as Fmt.")],
+    outfmt: Annotated[str, Field(description="Requested output format to send as Fmt, or \"auto\" for the smallest of TWEEKIT_AUTO_FORMATS.")],
     blob: Annotated[str, Field(description="Base64 encoded document payload (DocData).")],
     apiKey: Annotated[Optional[str], Field(description="TweekIT API key passed via the ApiKey header. Defaults to the TWEEKIT_API_KEY environment variable when omitted.")] = None,
     apiSecret: Annotated[Optional[str], Field(description="TweekIT API secret paired with the apiKey. Defaults to the TWEEKIT_API_SECRET environment variable when omitted.")] = None,
@@ -306,6 +1990,11 @@ async def convert(
     page: Annotated[int, Field(description="Page number to convert for multi-page inputs.")] = 1,
     alpha: Annotated[bool, Field(description="Preserve alpha transparency when producing raster formats.")] = True,
     bgColor: Annotated[str, Field(description="Background color (hex RGB) to composite behind transparent pixels.")] = "",
+    timeoutMs: Annotated[Optional[int], Field(description="Optional deadline for the whole call in milliseconds; the conversion is abandoned once it passes.", gt=0)] = None,
+    maxBytes: Annotated[Optional[int], Field(description="Optional size limit for an image result; its dimensions, format and quality are chosen to fit.", gt=0)] = None,
+    maxPixels: Annotated[Optional[int], Field(description="Optional limit on width x height for an image result; it is scaled down to fit.", gt=0)] = None,
+    progressive: Annotated[bool, Field(description="Return a low-resolution preview first; the full render is delivered later through get_artifact.")] = False,
+    autoFormats: Annotated[Optional[List[str]], Field(description="Formats outfmt=\"auto\" may choose from, most compatible first. Defaults to TWEEKIT_AUTO_FORMATS.")] = None,
 ) -> Any:
     """Convert an uploaded document payload with TweekIT.
 
@@ -315,7 +2004,9 @@ async def convert(
 
     Args:
         inext: Source file extension such as `pdf`, `docx`, or `png`.
-        outfmt: Desired output format (`Fmt` in the API body).
+        outfmt: Desired output format (`Fmt` in the API body). `auto` picks the
+            smallest image among `TWEEKIT_AUTO_FORMATS` and adds a summary of
+            the chosen format and bytes saved to the result.
         blob: Base64 encoded document payload (`DocData`).
         apiKey: TweekIT API key (`ApiKey` header). Falls back to `TWEEKIT_API_KEY` env var.
         apiSecret: TweekIT API secret (`ApiSecret` header). Falls back to `TWEEKIT_API_SECRET` env var.
@@ -329,32 +2020,440 @@ async def convert(
         page: Page number to extract for multipage inputs.
         alpha: Whether the output should preserve alpha transparency.
         bgColor: Background color to composite behind transparent pixels.
+        timeoutMs: Optional deadline in milliseconds; the upstream request is cancelled when it passes.
+        maxBytes: Optional byte limit for image outputs. The image is re-encoded
+            (WebP/JPEG, lower quality) or scaled down until it fits.
+        maxPixels: Optional pixel-count limit for image outputs.
+        progressive: Return a `TWEEKIT_PREVIEW_WIDTH` preview of an image output
+            as soon as it is ready, followed by an `artifactId`. The full render
+            continues in the background; fetch it with `get_artifact`.
+        autoFormats: Optional formats for `outfmt="auto"` to choose from instead
+            of `TWEEKIT_AUTO_FORMATS`.
+
+    Returns:
+        A FastMCP `Image` or `File` payload (followed by the format summary for
+        `outfmt="auto"`, or by the artifact for `progressive`), or an error
+        description.
+    """
+    overloaded = _overload_error("convert")
+    if overloaded:
+        return overloaded
+
+    try:
+        key, secret = _resolve_credentials(apiKey, apiSecret)
+    except RuntimeError as exc:
+        return {"error": str(exc)}
+
+    deadline = _Deadline(timeoutMs)
+    with _in_flight_slot():
+        try:
+            async with _payload_budget.reserve(estimate_base64_request_bytes(len(blob))):
+                return await deadline.run("conversion", _convert_impl(
+                    apiKey=key,
+                    apiSecret=secret,
+                    inext=inext,
+                    outfmt=outfmt,
+                    blob=blob,
+                    noRasterize=noRasterize,
+                    width=width,
+                    height=height,
+                    x1=x1,
+                    y1=y1,
+                    x2=x2,
+                    y2=y2,
+                    page=page,
+                    alpha=alpha,
+                    bgColor=bgColor,
+                    maxBytes=maxBytes or 0,
+                    maxPixels=maxPixels or 0,
+                    progressive=progressive,
+                    autoFormats=autoFormats,
+                ))
+        except BudgetExceeded as exc:
+            return _budget_error(exc)
+        except _DeadlineExceeded as exc:
+            return _deadline_error(exc)
+
+
+# Remote sources larger than this are rejected from their Content-Length, or aborted
+# mid-stream when the origin doesn't declare one.
+MAX_DOWNLOAD_BYTES = int(os.getenv("TWEEKIT_MAX_DOWNLOAD_BYTES", str(100 * 1024 * 1024)))
+# Set to 0 to skip the TweekIT doctype lookup during convert_url pre-flight.
+PREFLIGHT_DOCTYPE = os.getenv("TWEEKIT_PREFLIGHT_DOCTYPE", "1") != "0"
+DOCTYPE_CACHE_SECONDS = float(os.getenv("TWEEKIT_DOCTYPE_CACHE_SECONDS", "3600"))
+
+_doctype_cache: Dict[str, tuple[float, Optional[bool]]] = {}
+
+
+@dataclass
+class _Download:
+    """A remote source that has been read into memory."""
+
+    url: str
+    content: bytes
+    content_type: str
+    digest: Optional[str] = None  # digest of the base64 form, filled in once computed
+
+
+def _doctype_supported(data: Any) -> Optional[bool]:
+    """Interpret a doctype lookup; an empty document type means the input can't be read."""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key.lower() in {"doctype", "documenttype", "type"}:
+                return bool(value)
+    return None
+
+
+async def _input_supported(ext: str, apiKey: str, apiSecret: str) -> Optional[bool]:
+    """Ask TweekIT whether it can read `ext`, caching the answer. None means unknown."""
+    cached = _doctype_cache.get(ext)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    try:
+        response = await _upstream_client().get(
+            f"{BASE_URL}doctype",
+            headers={"ApiKey": apiKey, "ApiSecret": apiSecret},
+            params={"extension": ext},
+            timeout=_timeout(5.0),
+        )
+        response.raise_for_status()
+        supported = _doctype_supported(response.json())
+    except Exception as e:
+        logger.info("Doctype pre-flight for '%s' unavailable: %s", ext, e)
+        return None
+    _doctype_cache[ext] = (time.monotonic() + DOCTYPE_CACHE_SECONDS, supported)
+    return supported
+
+
+def _preflight_error(response: httpx.Response) -> Optional[Dict[str, Any]]:
+    """Reject a download from its headers alone, before any of the body is read."""
+    declared = _declared_length(response)
+    if declared > MAX_DOWNLOAD_BYTES:
+        return _too_large_error(f"Content-Length {declared} exceeds the {MAX_DOWNLOAD_BYTES} byte limit.")
+    return None
+
+
+async def _peek(chunks: AsyncIterator[bytes], head: bytes = b"", size: int = 1024) -> bytes:
+    """Read from `chunks` until `head` holds at least `size` bytes or the body ends."""
+    if len(head) >= size:
+        return head
+    async for chunk in chunks:
+        head += chunk
+        if len(head) >= size:
+            break
+    return head
+
+
+async def _html_page_error(
+    url: str, response: httpx.Response, inext: Optional[str], chunks: AsyncIterator[bytes]
+) -> tuple[bytes, Optional[Dict[str, Any]]]:
+    """Reject an HTML page served where another type was expected.
+
+    Such pages are typically a login wall or error page with a 200 status. The
+    `text/html` header alone is only a hint, since some origins send it for every
+    file, so the first bytes are read from `chunks` and must be HTML as well.
+    Returns those bytes, for the caller to keep, and the error if any.
+    """
+    mime = (response.headers.get("content-type") or "").split(";", 1)[0].strip().lower()
+    expected = _normalize_extension(inext or "") or _normalize_extension(Path(urlparse(url).path).suffix)
+    if mime != "text/html" or not expected or expected == "html":
+        return b"", None
+    head = await _peek(chunks)
+    if sniff_extension(head) != "html":
+        return head, None
+    _metrics.incr("download_rejected_total.type")
+    return head, {
+        "error": f"Expected a '{expected}' file but the server returned an HTML page.",
+        "details": "Check that the URL is a direct download link and that any required fetchHeaders are set.",
+    }
+
+
+async def _doctype_error(
+    url: str,
+    response: httpx.Response,
+    inext: Optional[str],
+    credentials: Optional[tuple[str, str]],
+    chunks: AsyncIterator[bytes],
+    head: bytes,
+) -> tuple[bytes, Optional[Dict[str, Any]]]:
+    """Reject a source TweekIT says it cannot read.
+
+    The type is resolved from the first bytes of the body as well as the URL and
+    headers, so a PDF behind `download.aspx` is looked up as a PDF. Returns the
+    bytes read so far and the error if any.
+    """
+    if not credentials or not PREFLIGHT_DOCTYPE:
+        return head, None
+    head = await _peek(chunks, head)
+    content_type = response.headers.get("content-type") or ""
+    resolved = _resolve_extension(url, inext, content_type, head)
+    if resolved == "bin" or await _input_supported(resolved, *credentials) is not False:
+        return head, None
+    _metrics.incr("download_rejected_total.type")
+    return head, {"error": f"TweekIT cannot read '{resolved}' files.", "details": f"Content-Type: {content_type or 'unknown'}"}
+
+
+def _declared_length(response: httpx.Response) -> int:
+    try:
+        return max(0, int(response.headers.get("content-length") or 0))
+    except ValueError:
+        return 0
+
+
+# Large sources from origins that advertise `Accept-Ranges: bytes` are fetched as
+# several concurrent range requests and assembled in a spooled temporary file.
+RANGED_DOWNLOAD_MIN_BYTES = int(os.getenv("TWEEKIT_RANGED_DOWNLOAD_MIN_BYTES", str(16 * 1024 * 1024)))
+RANGED_DOWNLOAD_PARTS = int(os.getenv("TWEEKIT_RANGED_DOWNLOAD_PARTS", "4"))
+DOWNLOAD_RESUME_ATTEMPTS = int(os.getenv("TWEEKIT_DOWNLOAD_RESUME_ATTEMPTS", "3"))
+SPOOL_MEMORY_BYTES = int(os.getenv("TWEEKIT_SPOOL_MEMORY_BYTES", str(8 * 1024 * 1024)))
+
+
+class _RangeNotHonored(Exception):
+    """The origin answered a range request with something other than 206."""
+
+
+def _supports_ranges(response: httpx.Response) -> bool:
+    return (
+        response.headers.get("accept-ranges", "").lower() == "bytes"
+        and response.headers.get("content-encoding", "identity").lower() == "identity"
+        and _declared_length(response) > 0
+    )
+
+
+def _range_validator(response: httpx.Response) -> Optional[str]:
+    """Strong validator for If-Range, so a file that changes mid-download isn't spliced."""
+    etag = response.headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("last-modified")
+
+
+def _too_large_error(details: str) -> Dict[str, Any]:
+    _metrics.incr("download_rejected_total.size")
+    return {"error": "Remote file is too large to convert.", "details": details}
+
+
+async def _fetch_range(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Optional[Dict[str, str]],
+    start: int,
+    end: int,
+    sink: Any,
+    validator: Optional[str],
+) -> None:
+    """Write bytes `start..end` (inclusive) into `sink`, resuming where a dropped connection stopped."""
+    position = start
+    failures = 0
+    while position <= end:
+        request_headers = dict(headers or {})
+        request_headers["Range"] = f"bytes={position}-{end}"
+        if validator:
+            request_headers["If-Range"] = validator
+        try:
+            async with client.stream("GET", url, headers=request_headers) as response:
+                if response.status_code != 206:
+                    raise _RangeNotHonored(f"origin answered a range request with HTTP {response.status_code}")
+                async for chunk in response.aiter_bytes():
+                    chunk = chunk[: end + 1 - position]
+                    sink.seek(position)
+                    sink.write(chunk)
+                    position += len(chunk)
+                    if position > end:
+                        break
+            if position <= end:
+                raise httpx.RemoteProtocolError("range response ended early")
+        except httpx.TransportError as e:
+            failures += 1
+            if failures > DOWNLOAD_RESUME_ATTEMPTS:
+                raise
+            _metrics.incr("download_resumes_total")
+            logger.info("Resuming download of '%s' at byte %s after: %s", url, position, e)
+
+
+async def _ranged_download(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Optional[Dict[str, str]],
+    size: int,
+    validator: Optional[str],
+) -> bytes:
+    part_size = -(-size // RANGED_DOWNLOAD_PARTS)
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES) as spool:
+        tasks = [
+            asyncio.create_task(_fetch_range(client, url, headers, start, min(start + part_size, size) - 1, spool, validator))
+            for start in range(0, size, part_size)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        _metrics.incr("download_ranged_total")
+        spool.seek(0)
+        return spool.read()
+
+
+async def _chain(head: bytes, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    if head:
+        yield head
+    async for chunk in chunks:
+        yield chunk
+
+
+async def _read_body(
+    client: httpx.AsyncClient,
+    response: httpx.Response,
+    headers: Optional[Dict[str, str]],
+    resumable: bool,
+    head: bytes = b"",
+    chunks: Optional[AsyncIterator[bytes]] = None,
+    reservation: Optional[Reservation] = None,
+) -> Any:
+    """Read a streamed body up to MAX_DOWNLOAD_BYTES, resuming with a range request if it drops.
+
+    `head` is the start of the body when it was already read from `chunks`, the
+    response's byte iterator. When the origin declared no length, `reservation`
+    grows with the body and BudgetExceeded is raised if it can't.
+    """
+    buffer = io.BytesIO()
+    try:
+        async for chunk in _chain(head, chunks if chunks is not None else response.aiter_bytes()):
+            if buffer.tell() + len(chunk) > MAX_DOWNLOAD_BYTES:
+                logger.warning("Aborted download of '%s' after %s bytes", response.url, buffer.tell() + len(chunk))
+                return _too_large_error(f"Download exceeded the {MAX_DOWNLOAD_BYTES} byte limit.")
+            if reservation is not None:
+                needed = estimate_download_request_bytes(buffer.tell() + len(chunk))
+                if needed > reservation.held_bytes:
+                    await reservation.resize(needed)
+            buffer.write(chunk)
+    except httpx.TransportError as e:
+        declared = _declared_length(response)
+        if not resumable or buffer.tell() >= declared:
+            raise
+        _metrics.incr("download_resumes_total")
+        logger.info("Resuming download of '%s' at byte %s after: %s", response.url, buffer.tell(), e)
+        await _fetch_range(client, str(response.url), headers, buffer.tell(), declared - 1, buffer, _range_validator(response))
+    return buffer.getvalue()
+
+
+# Downloaded sources that carry ETag/Last-Modified validators, keyed by URL and
+# fetchHeaders, so repeat convert_url calls can revalidate instead of downloading.
+SOURCE_CACHE_BYTES = int(os.getenv("TWEEKIT_SOURCE_CACHE_BYTES", str(256 * 1024 * 1024)))
+
+_source_cache = _LRUCache("source", SOURCE_CACHE_BYTES)
+
+
+@dataclass
+class _CachedSource:
+    download: _Download
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+def _source_cache_key(url: str, headers: Optional[Dict[str, str]]) -> str:
+    material = json.dumps([url, sorted((k.lower(), v) for k, v in (headers or {}).items())])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _conditional_headers(headers: Optional[Dict[str, str]], cached: Optional[_CachedSource]) -> Optional[Dict[str, str]]:
+    if cached is None:
+        return headers
+    conditional = dict(headers or {})
+    if cached.etag:
+        conditional["If-None-Match"] = cached.etag
+    if cached.last_modified:
+        conditional["If-Modified-Since"] = cached.last_modified
+    return conditional
+
+
+async def _download_source(
+    url: str,
+    headers: Optional[Dict[str, str]],
+    reservation: Reservation,
+    inext: Optional[str] = None,
+    credentials: Optional[tuple[str, str]] = None,
+) -> Any:
+    """Stream a remote file into memory after a pre-flight check of its headers.
 
-    Returns:
-        A FastMCP `Image` or `File` payload, or an error description.
+    Payload budget is reserved from Content-Length, and the body is abandoned as
+    soon as it exceeds MAX_DOWNLOAD_BYTES. Large files from range-capable origins
+    are fetched in parallel parts. Returns a `_Download` or an error payload.
     """
+    cache_key = _source_cache_key(url, headers)
+    cached: Optional[_CachedSource] = _source_cache.get(cache_key)
     try:
-        key, secret = _resolve_credentials(apiKey, apiSecret)
-    except RuntimeError as exc:
-        return {"error": str(exc)}
+        client = _egress_client()
+        async with client.stream("GET", url, headers=_conditional_headers(headers, cached)) as response:
+            if cached is not None and response.status_code == 304:
+                _metrics.incr("source_cache_revalidated_total")
+                return cached.download
+            if response.is_error:
+                await response.aread()
+            response.raise_for_status()
 
-    return await _convert_impl(
-        apiKey=key,
-        apiSecret=secret,
-        inext=inext,
-        outfmt=outfmt,
-        blob=blob,
-        noRasterize=noRasterize,
-        width=width,
-        height=height,
-        x1=x1,
-        y1=y1,
-        x2=x2,
-        y2=y2,
-        page=page,
-        alpha=alpha,
-        bgColor=bgColor,
-    )
+            rejection = _preflight_error(response)
+            chunks = response.aiter_bytes()
+            head = b""
+            if not rejection:
+                head, rejection = await _html_page_error(url, response, inext, chunks)
+            if not rejection:
+                head, rejection = await _doctype_error(url, response, inext, credentials, chunks, head)
+            if rejection:
+                logger.warning("Rejected download of '%s': %s", url, rejection["error"])
+                return rejection
+
+            declared = _declared_length(response)
+            if declared:
+                await reservation.resize(estimate_download_request_bytes(declared))
+
+            final_url = str(response.url)
+            content_type = response.headers.get("content-type") or ""
+            resumable = _supports_ranges(response)
+            validator = _range_validator(response)
+            etag = response.headers.get("etag")
+            last_modified = response.headers.get("last-modified")
+            cacheable = "no-store" not in response.headers.get("cache-control", "").lower()
+            content: Any = None
+            # Leaving the stream unread closes it; the parts are fetched below.
+            if not (resumable and declared >= RANGED_DOWNLOAD_MIN_BYTES and RANGED_DOWNLOAD_PARTS > 1):
+                content = await _read_body(client, response, headers, resumable, head, chunks, reservation)
+
+        if content is None:
+            try:
+                content = await _ranged_download(client, final_url, headers, declared, validator)
+            except _RangeNotHonored as e:
+                _metrics.incr("download_range_fallback_total")
+                logger.info("Falling back to a single stream for '%s': %s", final_url, e)
+                async with client.stream("GET", final_url, headers=headers) as response:
+                    response.raise_for_status()
+                    content = await _read_body(client, response, headers, False, reservation=reservation)
+        if isinstance(content, dict):
+            return content
+        download = _Download(url=final_url, content=content, content_type=content_type)
+        if cacheable and (etag or last_modified):
+            _source_cache.put(cache_key, _CachedSource(download, etag, last_modified), len(content))
+        return download
+    except httpx.HTTPStatusError as e:
+        status = getattr(e.response, "status_code", "unknown")
+        message = _extract_error_details(e.response)
+        error_payload = {
+            "error": f"Failed to download remote content. Status: {status}",
+        }
+        if message:
+            error_payload["details"] = message
+        logger.warning("HTTP error downloading '%s': status=%s details=%s", url, status, message)
+        return error_payload
+    except httpx.RequestError as e:
+        logger.error("Network error downloading '%s': %s", url, e)
+        return {"error": f"Network error downloading remote content: {e}"}
+    except BudgetExceeded:
+        raise
+    except Exception as e:
+        logger.exception("Unexpected error downloading '%s'", url)
+        return {"error": f"Unexpected error downloading remote content: {e}"}
 
 
 async def _convert_url_impl(
@@ -374,6 +2473,11 @@ async def _convert_url_impl(
     alpha: bool = True,
     bgColor: str = "",
     fetchHeaders: Optional[Dict[str, str]] = None,
+    timeoutMs: Optional[int] = None,
+    maxBytes: int = 0,
+    maxPixels: int = 0,
+    progressive: bool = False,
+    autoFormats: Optional[List[str]] = None,
 ) -> Any:
     """Download a remote document and convert it via TweekIT."""
 
@@ -381,57 +2485,80 @@ async def _convert_url_impl(
     if fetchHeaders:
         headers = {str(k): str(v) for k, v in fetchHeaders.items()}
 
-    timeout = httpx.Timeout(20.0, read=60.0)
+    deadline = _Deadline(timeoutMs)
     try:
-        async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-    except httpx.HTTPStatusError as e:
-        status = getattr(e.response, "status_code", "unknown")
-        message = _extract_error_details(e.response)
-        error_payload = {
-            "error": f"Failed to download remote content. Status: {status}",
-        }
-        if message:
-            error_payload["details"] = message
-        logger.warning("HTTP error downloading '%s': status=%s details=%s", url, status, message)
-        return error_payload
-    except httpx.RequestError as e:
-        logger.error("Network error downloading '%s': %s", url, e)
-        return {"error": f"Network error downloading remote content: {e}"}
-    except Exception as e:
-        logger.exception("Unexpected error downloading '%s'", url)
-        return {"error": f"Unexpected error downloading remote content: {e}"}
-
-    if not response.content:
-        return {"error": "Downloaded content was empty."}
-
-    resolved_inext = _resolve_extension(url, inext, response.headers.get("content-type"))
-    blob = base64.b64encode(response.content).decode("ascii")
-
-    return await _convert_impl(
-        apiKey=apiKey,
-        apiSecret=apiSecret,
-        inext=resolved_inext,
-        outfmt=outfmt,
-        blob=blob,
-        noRasterize=noRasterize,
-        width=width,
-        height=height,
-        x1=x1,
-        y1=y1,
-        x2=x2,
-        y2=y2,
-        page=page,
-        alpha=alpha,
-        bgColor=bgColor,
-    )
+        async with _payload_budget.reserve() as reservation:
+            download = await deadline.run(
+                "download",
+                _download_source(url, headers, reservation, inext=inext, credentials=(apiKey, apiSecret)),
+                DEADLINE_DOWNLOAD_SHARE,
+            )
+            if isinstance(download, dict):
+                return download
+
+            if not download.content:
+                return {"error": "Downloaded content was empty."}
+
+            await reservation.resize(estimate_download_request_bytes(len(download.content)))
+            resolved_inext = _resolve_extension(url, inext, download.content_type, download.content[:SNIFF_BYTES])
+            options = {
+                "noRasterize": noRasterize,
+                "width": width,
+                "height": height,
+                "x1": x1,
+                "y1": y1,
+                "x2": x2,
+                "y2": y2,
+                "page": page,
+                "alpha": alpha,
+                "bgColor": bgColor,
+            }
+            if not (maxBytes or maxPixels) and _is_identity(resolved_inext, outfmt, options):
+                identity = _identity_payload(outfmt, download.content)
+                if identity is not None:
+                    return identity
+            if download.digest and not (maxBytes or maxPixels):
+                # A revalidated source can be answered without re-encoding it.
+                cached = _cached_conversion(apiKey, download.digest, resolved_inext, outfmt, options)
+                if cached is not None:
+                    return cached
+            blob = await _offload(len(download.content), _b64encode, download.content)
+            if download.digest is None and RESULT_CACHE_BYTES > 0:
+                download.digest = await _offload(len(blob), _digest_text, blob)
+
+            return await deadline.run("conversion", _convert_impl(
+                apiKey=apiKey,
+                apiSecret=apiSecret,
+                inext=resolved_inext,
+                outfmt=outfmt,
+                blob=blob,
+                noRasterize=noRasterize,
+                width=width,
+                height=height,
+                x1=x1,
+                y1=y1,
+                x2=x2,
+                y2=y2,
+                page=page,
+                alpha=alpha,
+                bgColor=bgColor,
+                blob_digest=download.digest,
+                source=download.content,
+                maxBytes=maxBytes,
+                maxPixels=maxPixels,
+                progressive=progressive,
+                autoFormats=autoFormats,
+            ))
+    except BudgetExceeded as exc:
+        return _budget_error(exc)
+    except _DeadlineExceeded as exc:
+        return _deadline_error(exc)
 
 
 @mcp.tool()
 async def convert_url(
     url: Annotated[str, Field(description="Direct download URL for the source document or image.")],
-    outfmt: Annotated[str, Field(description="Requested output format to send as Fmt.")],
+    outfmt: Annotated[str, Field(description="Requested output format to send as Fmt, or \"auto\" for the smallest of TWEEKIT_AUTO_FORMATS.")],
     apiKey: Annotated[Optional[str], Field(description="TweekIT API key passed via the ApiKey header. Defaults to the TWEEKIT_API_KEY environment variable when omitted.")] = None,
     apiSecret: Annotated[Optional[str], Field(description="TweekIT API secret paired with the apiKey. Defaults to the TWEEKIT_API_SECRET environment variable when omitted.")] = None,
     inext: Annotated[Optional[str], Field(description="Override for the detected input extension (e.g., pdf).")] = None,
@@ -446,6 +2573,11 @@ async def convert_url(
     alpha: Annotated[bool, Field(description="Preserve alpha transparency when producing raster formats.")] = True,
     bgColor: Annotated[str, Field(description="Background color (hex RGB) to composite behind transparent pixels.")] = "",
     fetchHeaders: Annotated[Optional[Dict[str, str]], Field(description="Optional HTTP headers to include when downloading the URL.")] = None,
+    timeoutMs: Annotated[Optional[int], Field(description="Optional deadline for the whole call in milliseconds, split between the download and the conversion.", gt=0)] = None,
+    maxBytes: Annotated[Optional[int], Field(description="Optional size limit for an image result; its dimensions, format and quality are chosen to fit.", gt=0)] = None,
+    maxPixels: Annotated[Optional[int], Field(description="Optional limit on width x height for an image result; it is scaled down to fit.", gt=0)] = None,
+    progressive: Annotated[bool, Field(description="Return a low-resolution preview first; the full render is delivered later through get_artifact.")] = False,
+    autoFormats: Annotated[Optional[List[str]], Field(description="Formats outfmt=\"auto\" may choose from, most compatible first. Defaults to TWEEKIT_AUTO_FORMATS.")] = None,
 ) -> Any:
     """Download a remote file and convert it with TweekIT in one step.
 
@@ -455,7 +2587,7 @@ async def convert_url(
 
     Args:
         url: Direct download URL for the source document or image.
-        outfmt: Desired output format (`Fmt`).
+        outfmt: Desired output format (`Fmt`), or `auto` as for `convert`.
         apiKey: TweekIT API key (`ApiKey` header). Falls back to `TWEEKIT_API_KEY` env var.
         apiSecret: TweekIT API secret (`ApiSecret` header). Falls back to `TWEEKIT_API_SECRET` env var.
         inext: Optional override for the source extension if it cannot be
@@ -471,33 +2603,548 @@ async def convert_url(
         alpha: Whether the output should preserve alpha transparency.
         bgColor: Background color to composite behind transparent pixels.
         fetchHeaders: Optional mapping of HTTP headers to include when fetching.
+        timeoutMs: Optional deadline in milliseconds. The download may use up to
+            `TWEEKIT_DEADLINE_DOWNLOAD_SHARE` of it and the conversion the rest.
+        maxBytes: Optional byte limit for image outputs, as for `convert`.
+        maxPixels: Optional pixel-count limit for image outputs, as for `convert`.
+        progressive: Return a preview first and the full render as an artifact, as for `convert`.
+        autoFormats: Optional formats for `outfmt="auto"`, as for `convert`.
 
     Returns:
-        A FastMCP `Image` or `File` payload, or an error description.
+        A FastMCP `Image` or `File` payload (followed by the format summary for
+        `outfmt="auto"`, or by the artifact for `progressive`), or an error
+        description.
     """
+    overloaded = _overload_error("convert_url")
+    if overloaded:
+        return overloaded
+
     try:
         key, secret = _resolve_credentials(apiKey, apiSecret)
     except RuntimeError as exc:
         return {"error": str(exc)}
 
-    return await _convert_url_impl(
-        apiKey=key,
-        apiSecret=secret,
-        url=url,
-        outfmt=outfmt,
-        inext=inext,
-        noRasterize=noRasterize,
-        width=width,
-        height=height,
-        x1=x1,
-        y1=y1,
-        x2=x2,
-        y2=y2,
-        page=page,
-        alpha=alpha,
-        bgColor=bgColor,
-        fetchHeaders=fetchHeaders,
-    )
+    with _in_flight_slot():
+        return await _convert_url_impl(
+            apiKey=key,
+            apiSecret=secret,
+            url=url,
+            outfmt=outfmt,
+            inext=inext,
+            noRasterize=noRasterize,
+            width=width,
+            height=height,
+            x1=x1,
+            y1=y1,
+            x2=x2,
+            y2=y2,
+            page=page,
+            alpha=alpha,
+            bgColor=bgColor,
+            fetchHeaders=fetchHeaders,
+            timeoutMs=timeoutMs,
+            maxBytes=maxBytes or 0,
+            maxPixels=maxPixels or 0,
+            progressive=progressive,
+            autoFormats=autoFormats,
+        )
+
+
+@dataclass
+class _Source:
+    """A tool's input, given as a base64 `blob` or downloaded from a URL."""
+
+    inext: str
+    blob: str
+    digest: Optional[str] = None
+    content: Optional[bytes] = None  # the decoded bytes, when they were downloaded
+
+
+async def _open_source(
+    url: Optional[str],
+    blob: Optional[str],
+    inext: Optional[str],
+    fetchHeaders: Optional[Dict[str, str]],
+    credentials: tuple[str, str],
+    reservation: Reservation,
+) -> Any:
+    """Load a tool's source from `url` or `blob` under `reservation`; returns a `_Source` or an error payload."""
+    if blob is not None:
+        await reservation.resize(estimate_base64_request_bytes(len(blob)))
+        return _Source(inext=inext or "", blob=blob)
+
+    headers = {str(k): str(v) for k, v in fetchHeaders.items()} if fetchHeaders else None
+    download = await _download_source(url or "", headers, reservation, inext=inext, credentials=credentials)
+    if isinstance(download, dict):
+        return download
+    if not download.content:
+        return {"error": "Downloaded content was empty."}
+    await reservation.resize(estimate_download_request_bytes(len(download.content)))
+    resolved_inext = _resolve_extension(url or "", inext, download.content_type, download.content[:SNIFF_BYTES])
+    encoded = await _offload(len(download.content), _b64encode, download.content)
+    return _Source(inext=resolved_inext, blob=encoded, digest=download.digest, content=download.content)
+
+
+# Tiled rendering: each tile is a crop of the source converted on its own, so very
+# large images are never rendered (or returned) in one piece.
+TILES_MAX = int(os.getenv("TWEEKIT_TILES_MAX", "256"))
+TILES_CONCURRENCY = int(os.getenv("TWEEKIT_TILES_CONCURRENCY", "8"))
+
+
+def _tile_grid(
+    width: int, height: int, tile_size: int, levels: int, region: Optional[tuple[int, int, int, int]]
+) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Levels and tiles of a pyramid over a `width` x `height` source.
+
+    Level 0 is full resolution and each further level halves it, stopping once a
+    level fits in one tile. Tile coordinates are source pixels; `region` keeps
+    only the tiles that overlap it.
+    """
+    pyramid: List[Dict[str, Any]] = []
+    tiles: List[Dict[str, Any]] = []
+    for level in range(levels):
+        scale = 2 ** level
+        span = tile_size * scale
+        columns, rows = math.ceil(width / span), math.ceil(height / span)
+        pyramid.append({
+            "level": level,
+            "width": math.ceil(width / scale),
+            "height": math.ceil(height / scale),
+            "columns": columns,
+            "rows": rows,
+        })
+        for row in range(rows):
+            for column in range(columns):
+                x1, y1 = column * span, row * span
+                x2, y2 = min(width, x1 + span), min(height, y1 + span)
+                if region and (x2 <= region[0] or x1 >= region[2] or y2 <= region[1] or y1 >= region[3]):
+                    continue
+                tiles.append({
+                    "level": level,
+                    "column": column,
+                    "row": row,
+                    "x1": x1,
+                    "y1": y1,
+                    "x2": x2,
+                    "y2": y2,
+                    "width": math.ceil((x2 - x1) / scale),
+                    "height": math.ceil((y2 - y1) / scale),
+                })
+        if columns == 1 and rows == 1:
+            break
+    return pyramid, tiles
+
+
+async def _convert_tiles_impl(
+    apiKey: str,
+    apiSecret: str,
+    inext: str,
+    outfmt: str,
+    blob: str,
+    size: tuple[int, int],
+    tile_size: int,
+    levels: int,
+    region: Optional[tuple[int, int, int, int]],
+    page: int,
+    alpha: bool,
+    bgColor: str,
+    blob_digest: Optional[str],
+    source: Optional[bytes],
+) -> Dict[str, Any]:
+    pyramid, tiles = _tile_grid(size[0], size[1], tile_size, levels, region)
+    if len(tiles) > TILES_MAX:
+        return {
+            "error": f"Too many tiles: {len(tiles)} needed, at most {TILES_MAX} allowed.",
+            "details": "Use a larger tileSize, fewer levels or a smaller region.",
+        }
+    if blob_digest is None and RESULT_CACHE_BYTES > 0:
+        blob_digest = await _offload(len(blob), _digest_text, blob)
+
+    owner = _tenant_label(apiKey)
+    slots = asyncio.Semaphore(max(1, TILES_CONCURRENCY))
+    started = time.perf_counter()
+
+    async def render(tile: Dict[str, Any]) -> None:
+        # Each tile's request body repeats the whole source, so it is reserved
+        # separately from the source the caller already holds.
+        async with slots:
+            try:
+                async with _payload_budget.reserve(estimate_base64_request_bytes(len(blob))):
+                    result = await _convert_impl(
+                        apiKey=apiKey,
+                        apiSecret=apiSecret,
+                        inext=inext,
+                        outfmt=outfmt,
+                        blob=blob,
+                        width=tile["width"],
+                        height=tile["height"],
+                        x1=tile["x1"],
+                        y1=tile["y1"],
+                        x2=tile["x2"],
+                        y2=tile["y2"],
+                        page=page,
+                        alpha=alpha,
+                        bgColor=bgColor,
+                        blob_digest=blob_digest,
+                        source=source,
+                    )
+            except BudgetExceeded as exc:
+                result = _budget_error(exc)
+        if isinstance(result, (Image, File)):
+            tile["artifactId"] = await _artifacts.put(owner, result)
+            tile["bytes"] = len(result.data or b"")
+        else:
+            tile["error"] = result.get("error", "Conversion failed.") if isinstance(result, dict) else "Conversion failed."
+
+    await asyncio.gather(*(render(tile) for tile in tiles))
+    failed = sum(1 for tile in tiles if "error" in tile)
+    _metrics.incr("tiles_rendered_total", len(tiles) - failed)
+    _metrics.incr("tiles_failed_total", failed)
+    _metrics.observe("tiles_ms", (time.perf_counter() - started) * 1000.0)
+    return {
+        "source": {"width": size[0], "height": size[1], "format": inext},
+        "format": outfmt,
+        "tileSize": tile_size,
+        "levels": pyramid,
+        "tiles": tiles,
+        "rendered": len(tiles) - failed,
+        "failed": failed,
+        "expiresInSeconds": ARTIFACT_SECONDS,
+    }
+
+
+@mcp.tool()
+async def convert_tiles(
+    outfmt: Annotated[str, Field(description="Output format of each tile (e.g., png, jpg, webp).")],
+    url: Annotated[Optional[str], Field(description="Direct download URL for the source image or drawing. Give either url or blob.")] = None,
+    blob: Annotated[Optional[str], Field(description="Base64 encoded source payload. Give either url or blob.")] = None,
+    inext: Annotated[Optional[str], Field(description="Input file extension; required with blob, detected for url when omitted.")] = None,
+    apiKey: Annotated[Optional[str], Field(description="TweekIT API key passed via the ApiKey header. Defaults to the TWEEKIT_API_KEY environment variable when omitted.")] = None,
+    apiSecret: Annotated[Optional[str], Field(description="TweekIT API secret paired with the apiKey. Defaults to the TWEEKIT_API_SECRET environment variable when omitted.")] = None,
+    tileSize: Annotated[int, Field(description="Edge length of each tile in output pixels.", ge=64, le=4096)] = 512,
+    levels: Annotated[int, Field(description="Zoom levels to render; each level halves the resolution of the one before.", ge=1, le=16)] = 1,
+    region: Annotated[Optional[List[int]], Field(description="Optional [x1, y1, x2, y2] in source pixels; only tiles overlapping it are rendered.", min_length=4, max_length=4)] = None,
+    sourceWidth: Annotated[Optional[int], Field(description="Source width in pixels, for inputs whose size can't be read from the file (e.g., PDF drawings).", gt=0)] = None,
+    sourceHeight: Annotated[Optional[int], Field(description="Source height in pixels, paired with sourceWidth.", gt=0)] = None,
+    page: Annotated[int, Field(description="Page number to tile for multi-page inputs.")] = 1,
+    alpha: Annotated[bool, Field(description="Preserve alpha transparency when producing raster formats.")] = True,
+    bgColor: Annotated[str, Field(description="Background color (hex RGB) to composite behind transparent pixels.")] = "",
+    fetchHeaders: Annotated[Optional[Dict[str, str]], Field(description="Optional HTTP headers to include when downloading the URL.")] = None,
+) -> Dict[str, Any]:
+    """Render a large image as a grid or zoom pyramid of tiles.
+
+    Each tile is a crop of the source (`x1, y1, x2, y2`) converted separately and
+    concurrently, so gigapixel TIFFs and large-format drawings never have to be
+    rendered in one call. Tiles are stored as artifacts; the returned manifest
+    lists every tile's level, grid position, source rectangle, output size and
+    `artifactId`, and clients fetch only the tiles they need with `get_artifact`.
+
+    Args:
+        outfmt: Output format for each tile.
+        url: Direct download URL for the source. Give either `url` or `blob`.
+        blob: Base64 encoded source payload (`DocData`).
+        inext: Source extension; required with `blob`.
+        apiKey: TweekIT API key (`ApiKey` header). Falls back to `TWEEKIT_API_KEY` env var.
+        apiSecret: TweekIT API secret (`ApiSecret` header). Falls back to `TWEEKIT_API_SECRET` env var.
+        tileSize: Tile edge length in output pixels.
+        levels: Number of zoom levels; level 0 is full resolution.
+        region: Optional `[x1, y1, x2, y2]` source rectangle to limit the tiles to.
+        sourceWidth: Source width, when it can't be read from the file header.
+        sourceHeight: Source height, when it can't be read from the file header.
+        page: Page number to tile for multipage inputs.
+        alpha: Whether tiles should preserve alpha transparency.
+        bgColor: Background color to composite behind transparent pixels.
+        fetchHeaders: Optional mapping of HTTP headers to include when fetching `url`.
+
+    Returns:
+        A tile manifest, or an error description.
+    """
+    if (url is None) == (blob is None):
+        return {"error": "Provide either url or blob."}
+    if blob is not None and not inext:
+        return {"error": "inext is required with blob."}
+    if region is not None and (region[2] <= region[0] or region[3] <= region[1]):
+        return {"error": "region must be [x1, y1, x2, y2] with x2 > x1 and y2 > y1."}
+    if (sourceWidth is None) != (sourceHeight is None):
+        return {"error": "Provide both sourceWidth and sourceHeight, or neither."}
+
+    overloaded = _overload_error("convert_tiles")
+    if overloaded:
+        return overloaded
+
+    try:
+        key, secret = _resolve_credentials(apiKey, apiSecret)
+    except RuntimeError as exc:
+        return {"error": str(exc)}
+
+    options = {
+        "tile_size": tileSize,
+        "levels": levels,
+        "region": tuple(region) if region else None,
+        "page": page,
+        "alpha": alpha,
+        "bgColor": bgColor,
+    }
+    with _in_flight_slot():
+        try:
+            async with _payload_budget.reserve() as reservation:
+                source = await _open_source(url, blob, inext, fetchHeaders, (key, secret), reservation)
+                if isinstance(source, dict):
+                    return source
+                if sourceWidth and sourceHeight:
+                    size: Optional[tuple[int, int]] = (sourceWidth, sourceHeight)
+                elif source.content is not None:
+                    size = image_size(source.content)
+                else:
+                    size = image_size(_b64decode(source.blob[:estimate_base64_length(SNIFF_BYTES)]) or b"")
+                if size is None:
+                    return {
+                        "error": "Could not read the source dimensions.",
+                        "details": "Pass sourceWidth and sourceHeight for this input.",
+                    }
+                return await _convert_tiles_impl(
+                    key, secret, source.inext, outfmt, source.blob, size,
+                    blob_digest=source.digest, source=source.content, **options,
+                )
+        except BudgetExceeded as exc:
+            return _budget_error(exc)
+
+
+# Conversion pipelines: a small DAG of convert steps run server-side. Intermediate
+# results never leave the server, and every step goes through the result cache, which
+# is keyed by the digest of its input, so unchanged prefixes of a pipeline are free.
+PIPELINE_MAX_STEPS = int(os.getenv("TWEEKIT_PIPELINE_MAX_STEPS", "16"))
+
+# Options a step may set, with their defaults; they mirror `convert`.
+_PIPELINE_STEP_OPTIONS: Dict[str, Any] = {
+    "noRasterize": False,
+    "width": 0,
+    "height": 0,
+    "x1": 0,
+    "y1": 0,
+    "x2": 0,
+    "y2": 0,
+    "page": 1,
+    "alpha": True,
+    "bgColor": "",
+    "maxBytes": 0,
+    "maxPixels": 0,
+}
+
+
+def _pipeline_plan(steps: List[Dict[str, Any]], outputs: Optional[List[str]]) -> Any:
+    """Validate pipeline steps; returns (steps, outputs) with defaults filled in, or an error payload."""
+    if not steps:
+        return {"error": "Provide at least one step."}
+    if len(steps) > PIPELINE_MAX_STEPS:
+        return {"error": f"Too many steps: {len(steps)} given, at most {PIPELINE_MAX_STEPS} allowed."}
+
+    plan: List[Dict[str, Any]] = []
+    known = set()
+    for index, step in enumerate(steps, start=1):
+        step_id = str(step.get("id") or f"step{index}")
+        if step_id in known or step_id == "source":
+            return {"error": f"Step id '{step_id}' is reserved or used twice."}
+        step_input = str(step.get("input") or "source")
+        if step_input != "source" and step_input not in known:
+            return {"error": f"Step '{step_id}' reads '{step_input}', which is not an earlier step."}
+        outfmt = step.get("outfmt")
+        if not isinstance(outfmt, str) or not outfmt.strip():
+            return {"error": f"Step '{step_id}' needs an outfmt."}
+        unknown = sorted(set(step) - {"id", "input", "outfmt"} - set(_PIPELINE_STEP_OPTIONS))
+        if unknown:
+            return {"error": f"Step '{step_id}' has unknown options: {', '.join(unknown)}."}
+        options = {name: step.get(name, default) for name, default in _PIPELINE_STEP_OPTIONS.items()}
+        for name, value in options.items():
+            expected = type(_PIPELINE_STEP_OPTIONS[name])
+            if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+                return {"error": f"Step '{step_id}' option {name} must be {expected.__name__}."}
+        known.add(step_id)
+        plan.append({"id": step_id, "input": step_input, "outfmt": outfmt, "options": options})
+
+    consumed = {step["input"] for step in plan}
+    if outputs is None:
+        outputs = [step["id"] for step in plan if step["id"] not in consumed]
+    missing = [name for name in outputs if name not in known]
+    if missing:
+        return {"error": f"Unknown output steps: {', '.join(missing)}."}
+    return plan, outputs
+
+
+async def _run_pipeline(
+    apiKey: str, apiSecret: str, source: _Source, plan: List[Dict[str, Any]], outputs: List[str]
+) -> Any:
+    consumed = {step["input"] for step in plan}
+    if source.digest is None and RESULT_CACHE_BYTES > 0:
+        source.digest = await _offload(len(source.blob), _digest_text, source.blob)
+    tasks: Dict[str, "asyncio.Task[Optional[_Source]]"] = {}
+    payloads: Dict[str, Any] = {}
+    report: Dict[str, Dict[str, Any]] = {step["id"]: {"id": step["id"], "input": step["input"]} for step in plan}
+
+    async def run_step(step: Dict[str, Any]) -> Optional[_Source]:
+        entry = report[step["id"]]
+        if step["input"] == "source":
+            step_source = source
+        else:
+            parent = await tasks[step["input"]]
+            if parent is None:
+                entry.update(status="skipped", error=f"Input step '{step['input']}' did not produce a result.")
+                return None
+            step_source = parent
+
+        started = time.perf_counter()
+        try:
+            # Each step builds its own request body, so it is reserved while the
+            # step converts, on top of the source the caller already holds.
+            async with _payload_budget.reserve(estimate_base64_request_bytes(len(step_source.blob))):
+                result = await _convert_impl(
+                    apiKey=apiKey,
+                    apiSecret=apiSecret,
+                    inext=step_source.inext,
+                    outfmt=step["outfmt"],
+                    blob=step_source.blob,
+                    blob_digest=step_source.digest,
+                    source=step_source.content,
+                    **step["options"],
+                )
+        except BudgetExceeded as exc:
+            result = _budget_error(exc)
+        if isinstance(result, list):
+            result = result[0]  # outfmt="auto" appends its summary
+        entry["ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+        if not isinstance(result, (Image, File)) or not result.data:
+            entry.update(status="failed", error=result.get("error", "Conversion failed.") if isinstance(result, dict) else "Conversion failed.")
+            _metrics.incr("pipeline_steps_failed_total")
+            return None
+
+        content = result.data
+        output_format = sniff_extension(content[:SNIFF_BYTES]) or _normalize_extension(step["outfmt"])
+        entry.update(status="ok", format=output_format, bytes=len(content))
+        _metrics.incr("pipeline_steps_total")
+        payloads[step["id"]] = result
+        if step["id"] not in consumed:
+            return _Source(inext=output_format, blob="", content=content)
+        # Encoded and hashed once for every step that reads this one.
+        blob = await _offload(len(content), _b64encode, content)
+        digest = await _offload(len(blob), _digest_text, blob) if RESULT_CACHE_BYTES > 0 else None
+        return _Source(inext=output_format, blob=blob, digest=digest, content=content)
+
+    for step in plan:
+        tasks[step["id"]] = asyncio.ensure_future(run_step(step))
+    try:
+        await asyncio.gather(*tasks.values())
+    finally:
+        unfinished = [task for task in tasks.values() if not task.done()]
+        for task in unfinished:
+            task.cancel()
+        await asyncio.gather(*unfinished, return_exceptions=True)
+
+    delivered = [name for name in outputs if name in payloads]
+    summary: Dict[str, Any] = {"outputs": delivered, "steps": [report[step["id"]] for step in plan]}
+    if not delivered:
+        return {"error": "The pipeline produced no outputs.", **summary}
+    return [payloads[name] for name in delivered] + [summary]
+
+
+@mcp.tool()
+async def convert_pipeline(
+    steps: Annotated[List[Dict[str, Any]], Field(description="Conversion steps, each an object with id, input ('source' or an earlier step's id), outfmt and any convert options (noRasterize, width, height, x1, y1, x2, y2, page, alpha, bgColor, maxBytes, maxPixels).")],
+    url: Annotated[Optional[str], Field(description="Direct download URL for the source document. Give either url or blob.")] = None,
+    blob: Annotated[Optional[str], Field(description="Base64 encoded source payload. Give either url or blob.")] = None,
+    inext: Annotated[Optional[str], Field(description="Input file extension; required with blob, detected for url when omitted.")] = None,
+    outputs: Annotated[Optional[List[str]], Field(description="Ids of the steps whose results to return. Defaults to every step no other step reads.")] = None,
+    apiKey: Annotated[Optional[str], Field(description="TweekIT API key passed via the ApiKey header. Defaults to the TWEEKIT_API_KEY environment variable when omitted.")] = None,
+    apiSecret: Annotated[Optional[str], Field(description="TweekIT API secret paired with the apiKey. Defaults to the TWEEKIT_API_SECRET environment variable when omitted.")] = None,
+    fetchHeaders: Annotated[Optional[Dict[str, str]], Field(description="Optional HTTP headers to include when downloading the URL.")] = None,
+) -> Any:
+    """Run several dependent conversions in one call, keeping intermediates on the server.
+
+    For example DOCX to PDF, then page 3 of that PDF to PNG, then a crop and
+    resize of the PNG, without sending the PDF and full-size PNG back and forth.
+    Steps may only read the source or an earlier step, so the steps form a DAG;
+    steps whose inputs are ready run concurrently. Each step's result is cached
+    by the digest of its input and its options.
+
+    Args:
+        steps: The conversion steps, in dependency order.
+        url: Direct download URL for the source. Give either `url` or `blob`.
+        blob: Base64 encoded source payload (`DocData`).
+        inext: Source extension; required with `blob`.
+        outputs: Optional ids of the steps to return; defaults to the final steps.
+        apiKey: TweekIT API key (`ApiKey` header). Falls back to `TWEEKIT_API_KEY` env var.
+        apiSecret: TweekIT API secret (`ApiSecret` header). Falls back to `TWEEKIT_API_SECRET` env var.
+        fetchHeaders: Optional mapping of HTTP headers to include when fetching `url`.
+
+    Returns:
+        The `Image` or `File` of each output step followed by a summary of every
+        step, or an error description.
+    """
+    if (url is None) == (blob is None):
+        return {"error": "Provide either url or blob."}
+    if blob is not None and not inext:
+        return {"error": "inext is required with blob."}
+    planned = _pipeline_plan(steps, outputs)
+    if isinstance(planned, dict):
+        return planned
+
+    overloaded = _overload_error("convert_pipeline")
+    if overloaded:
+        return overloaded
+
+    try:
+        key, secret = _resolve_credentials(apiKey, apiSecret)
+    except RuntimeError as exc:
+        return {"error": str(exc)}
+
+    with _in_flight_slot():
+        try:
+            async with _payload_budget.reserve() as reservation:
+                source = await _open_source(url, blob, inext, fetchHeaders, (key, secret), reservation)
+                if isinstance(source, dict):
+                    return source
+                return await _run_pipeline(key, secret, source, *planned)
+        except BudgetExceeded as exc:
+            return _budget_error(exc)
+
+
+@mcp.tool()
+async def get_artifact(
+    artifactId: Annotated[str, Field(description="The artifactId returned by a progressive convert or convert_url call, or listed in a convert_tiles manifest.")],
+    apiKey: Annotated[Optional[str], Field(description="TweekIT API key passed via the ApiKey header. Defaults to the TWEEKIT_API_KEY environment variable when omitted.")] = None,
+    apiSecret: Annotated[Optional[str], Field(description="TweekIT API secret paired with the apiKey. Defaults to the TWEEKIT_API_SECRET environment variable when omitted.")] = None,
+    waitMs: Annotated[int, Field(description="How long to wait for a render that is still running, in milliseconds.", ge=0, le=60000)] = 0,
+) -> Any:
+    """Fetch the full-resolution result of a progressive conversion, or a tile.
+
+    Returns the converted `Image` or `File` once the background render has
+    finished, or `{"status": "pending"}` if it is still running after `waitMs`.
+    Artifacts can be fetched with the API key that started them until
+    `TWEEKIT_ARTIFACT_SECONDS` after they finish.
+
+    Args:
+        artifactId: The `artifactId` from a `progressive` conversion or a tile manifest.
+        apiKey: TweekIT API key (`ApiKey` header). Falls back to `TWEEKIT_API_KEY` env var.
+        apiSecret: TweekIT API secret (`ApiSecret` header). Falls back to `TWEEKIT_API_SECRET` env var.
+        waitMs: Optional time to wait for a pending render.
+
+    Returns:
+        The conversion result, a pending status, or an error description.
+    """
+    try:
+        key, _ = _resolve_credentials(apiKey, apiSecret)
+    except RuntimeError as exc:
+        return {"error": str(exc)}
+
+    found, result = await _artifacts.get(_tenant_label(key), artifactId, waitMs / 1000.0)
+    if not found:
+        return {
+            "error": "Unknown or expired artifact.",
+            "details": "Artifacts expire after TWEEKIT_ARTIFACT_SECONDS.",
+        }
+    if result is None:
+        return {"artifactId": artifactId, "status": "pending"}
+    _metrics.incr("artifacts_delivered_total")
+    return result
 
 
 @mcp.tool()
@@ -527,60 +3174,367 @@ async def delete_document(
         return {"error": str(exc)}
 
     url = f"{BASE_URL}{docId}"
-    async with httpx.AsyncClient(timeout=10.0) as client:
+    client = _upstream_client()
+    try:
+        response = await client.delete(url, headers={"ApiKey": key, "ApiSecret": secret}, timeout=_timeout(10.0))
+        response.raise_for_status()
         try:
-            response = await client.delete(url, headers={"ApiKey": key, "ApiSecret": secret})
-            response.raise_for_status()
-            try:
-                return response.json()
-            except Exception:
-                return {"message": "Document deleted successfully", "docId": docId}
-        except httpx.HTTPStatusError as e:
-            details = _extract_error_details(e.response)
-            return {"error": f"HTTP {e.response.status_code} deleting document", "details": details}
-        except httpx.RequestError as e:
-            return {"error": f"Network error: {e}"}
-        except Exception as e:
-            return {"error": f"Unexpected error: {e}"}
+            return response.json()
+        except Exception:
+            return {"message": "Document deleted successfully", "docId": docId}
+    except httpx.HTTPStatusError as e:
+        details = _extract_error_details(e.response)
+        return {"error": f"HTTP {e.response.status_code} deleting document", "details": details}
+    except httpx.RequestError as e:
+        return {"error": f"Network error: {e}"}
+    except Exception as e:
+        return {"error": f"Unexpected error: {e}"}
+
+
+# Private HTTP cache for `fetch`: an in-memory LRU, optionally backed by a directory
+# shared between worker processes.
+FETCH_CACHE_BYTES = int(os.getenv("TWEEKIT_FETCH_CACHE_BYTES", str(64 * 1024 * 1024)))
+FETCH_CACHE_DIR = os.getenv("TWEEKIT_FETCH_CACHE_DIR", "")
+FETCH_CACHE_DISK_BYTES = int(os.getenv("TWEEKIT_FETCH_CACHE_DISK_BYTES", str(1024 * 1024 * 1024)))
+
+FETCH_MAX_BYTES = int(os.getenv("TWEEKIT_FETCH_MAX_BYTES", str(1024 * 1024)))
+
+FETCH_MANY_PER_HOST = int(os.getenv("TWEEKIT_FETCH_MANY_PER_HOST", "4"))
+FETCH_MANY_MAX_URLS = int(os.getenv("TWEEKIT_FETCH_MANY_MAX_URLS", "25"))
+
+_fetch_cache = _LRUCache("fetch", FETCH_CACHE_BYTES)
+_fetch_disk_cache: Optional[DiskCache] = DiskCache(FETCH_CACHE_DIR, FETCH_CACHE_DISK_BYTES) if FETCH_CACHE_DIR else None
+
+
+async def _fetch_cache_get(url: str) -> Optional[CachedResponse]:
+    entry = _fetch_cache.get(url)
+    if entry is None and _fetch_disk_cache is not None:
+        entry = await asyncio.get_running_loop().run_in_executor(_get_offload_executor(), _fetch_disk_cache.get, url)
+        if entry is not None:
+            _metrics.incr("cache_hits_total.fetch_disk")
+            _fetch_cache.put(url, entry, len(entry.content))
+    return entry
+
+
+async def _fetch_cache_put(url: str, entry: CachedResponse) -> None:
+    _fetch_cache.put(url, entry, len(entry.content))
+    if _fetch_disk_cache is not None:
+        await asyncio.get_running_loop().run_in_executor(_get_offload_executor(), _fetch_disk_cache.put, url, entry)
+
+
+def _is_textual(content_type: str) -> bool:
+    return content_type.startswith("text/") or "json" in content_type
+
+
+def _fetch_result(
+    url: str,
+    entry: CachedResponse,
+    cache_status: str,
+    max_bytes: int,
+    extract: str,
+    text: Optional[str] = None,
+    truncated: bool = False,
+) -> Any:
+    """Shape a fetched or cached response; `text` is passed when it was decoded while streaming."""
+    _metrics.incr(f"fetch_cache_total.{cache_status}")
+    ct = entry.headers.get("content-type", "").lower()
+    if ct.startswith("image/"):
+        return Image(data=entry.content, format=ct.split("/")[-1])
+    if ct.startswith("application/pdf"):
+        return File(data=entry.content, format="pdf")
+    if _is_textual(ct):
+        if text is None:
+            stream = TextStream(ct, extract, entry.url)
+            stream.feed(entry.content[:max_bytes])
+            truncated = len(entry.content) > max_bytes
+            text = stream.finish(complete=not truncated)
+        return {
+            "url": str(url),
+            "status": entry.status,
+            "content_type": ct,
+            "text": text,
+            "truncated": truncated,
+            "cache": cache_status,
+        }
+    # Fallback for other binary types
+    return File(data=entry.content, format="bin")
+
+
+async def _binary_size(client: httpx.AsyncClient, url: str, response: httpx.Response) -> Optional[int]:
+    """Size of a binary body from Content-Length, or a one-byte range request when it is missing."""
+    declared = _declared_length(response)
+    if declared or "content-length" in response.headers:
+        return declared
+    try:
+        probe = await client.get(url, headers={"Range": "bytes=0-0"}, timeout=_timeout(20.0))
+    except httpx.RequestError:
+        return None
+    total = probe.headers.get("content-range", "").rpartition("/")[2]
+    return int(total) if probe.status_code == 206 and total.isdigit() else None
+
+
+async def _fetch_entry(
+    client: httpx.AsyncClient,
+    url: str,
+    max_bytes: int,
+    extract: str,
+    reservation: Optional[Reservation] = None,
+    summarize_binary: bool = False,
+) -> Any:
+    """Fetch `url` through the response cache.
+
+    Returns `(entry, cache_status, text, truncated)`, where `text` is set when it was
+    decoded while streaming, or an error dict. With `summarize_binary`, a binary
+    body is not read at all and a `{status, content_type, bytes, cache}` dict is
+    returned instead. Bytes read into memory are held against `reservation`.
+    """
+    cached = await _fetch_cache_get(url)
+    if cached is not None and cached.is_fresh():
+        return cached, "hit", None, False
+
+    try:
+        request_time = time.time()
+        try:
+            request = client.build_request(
+                "GET", url, headers=cached.conditional_headers() if cached else None, timeout=_timeout(20.0)
+            )
+            resp = await client.send(request, stream=True)
+        except httpx.RequestError:
+            if cached is not None and cached.may_serve_stale():
+                return cached, "stale", None, False
+            raise
+        try:
+            response_time = time.time()
+            if cached is not None and resp.status_code == 304:
+                entry = cached.refreshed(resp.headers, request_time, response_time)
+                await _fetch_cache_put(url, entry)
+                return entry, "revalidated", None, False
+            resp.raise_for_status()
+
+            ct = resp.headers.get("content-type", "").lower()
+            textual = _is_textual(ct)
+            if summarize_binary and not textual:
+                await resp.aclose()
+                _metrics.incr("fetch_cache_total.miss")
+                return {
+                    "status": resp.status_code,
+                    "content_type": ct,
+                    "bytes": await _binary_size(client, url, resp),
+                    "cache": "miss",
+                }
+            limit = max_bytes if textual else MAX_DOWNLOAD_BYTES
+            if not textual and _declared_length(resp) > limit:
+                return _too_large_error(f"Content-Length {_declared_length(resp)} exceeds the {limit} byte limit.")
+            stream = TextStream(ct, extract, str(resp.url)) if textual else None
+            body = bytearray()
+            truncated = False
+            async for chunk in resp.aiter_bytes():
+                if len(body) + len(chunk) > limit:
+                    chunk = chunk[: limit - len(body)]
+                    truncated = True
+                if reservation is not None:
+                    await reservation.resize(len(body) + len(chunk))
+                body += chunk
+                if stream is not None:
+                    stream.feed(chunk)
+                if truncated:
+                    break
+        finally:
+            await resp.aclose()
+
+        if truncated and stream is None:
+            return _too_large_error(f"Download exceeded the {limit} byte limit.")
+        entry = CachedResponse.from_response(
+            str(resp.url), resp.status_code, resp.headers, bytes(body), request_time, response_time
+        )
+        if not truncated and is_storable(resp.status_code, resp.headers):
+            await _fetch_cache_put(url, entry)
+        text = stream.finish(complete=not truncated) if stream is not None else None
+        return entry, "miss", text, truncated
+    except BudgetExceeded as exc:
+        return _budget_error(exc)
+    except httpx.HTTPStatusError as e:
+        return {"error": f"HTTP error: {e.response.status_code}"}
+    except httpx.RequestError as e:
+        return {"error": f"Network error: {e}"}
+    except Exception as e:
+        return {"error": f"Unexpected error: {e}"}
+
+
+def _fetch_limits(max_bytes: Optional[int], extract: str) -> tuple[int, Optional[Dict[str, Any]]]:
+    if extract not in EXTRACT_MODES:
+        return 0, {"error": f"Unsupported extract mode '{extract}'. Use one of: {', '.join(EXTRACT_MODES)}."}
+    if max_bytes is not None and max_bytes > MAX_DOWNLOAD_BYTES:
+        return 0, {"error": f"max_bytes must be at most {MAX_DOWNLOAD_BYTES}.", "details": f"Got {max_bytes}."}
+    return (FETCH_MAX_BYTES if max_bytes is None or max_bytes <= 0 else max_bytes), None
 
 
 @mcp.tool()
 async def fetch(
     url: Annotated[str, Field(description="HTTP or HTTPS URL to retrieve and normalize.")],
+    max_bytes: Annotated[Optional[int], Field(description="Stop reading text/JSON bodies after this many bytes and mark the result truncated. Defaults to TWEEKIT_FETCH_MAX_BYTES; at most TWEEKIT_MAX_DOWNLOAD_BYTES.")] = None,
+    extract: Annotated[str, Field(description="For HTML pages: 'none' returns the markup, 'text' readable text, 'markdown' readable markdown with links.")] = "none",
 ) -> Any:
     """Fetch a URL and return content.
 
     - Images return as FastMCP Image.
     - PDFs return as File(format="pdf").
     - Text/JSON return as a JSON payload with metadata and text.
+
+    Text bodies are streamed and decoded incrementally and cut off at `max_bytes`
+    (`truncated` is then true); `extract` reduces HTML to text or markdown in the
+    same pass. Responses are cached following their Cache-Control/Expires headers
+    and revalidated with ETag/Last-Modified; text payloads report `cache` as
+    "miss", "hit", "revalidated" or "stale".
     """
     parsed = urlparse(url)
     if parsed.scheme not in {"http", "https"}:
         return {"error": "Unsupported URL scheme. Use http or https."}
+    max_bytes, invalid = _fetch_limits(max_bytes, extract)
+    if invalid:
+        return invalid
+
+    overloaded = _overload_error("fetch")
+    if overloaded:
+        return overloaded
+
+    with _in_flight_slot():
+        outcome = await _fetch_entry(_egress_client(), url, max_bytes, extract)
+    if isinstance(outcome, dict):
+        return outcome
+    entry, cache_status, text, truncated = outcome
+    return _fetch_result(url, entry, cache_status, max_bytes, extract, text, truncated)
+
+
+def _fetch_many_item(url: str, outcome: Any, max_bytes: int, extract: str) -> Dict[str, Any]:
+    if isinstance(outcome, dict):
+        return {"url": url, **outcome}
+    entry, cache_status, text, truncated = outcome
+    ct = entry.headers.get("content-type", "").lower()
+    if _is_textual(ct):
+        return _fetch_result(url, entry, cache_status, max_bytes, extract, text, truncated)
+    # Binary bodies are summarised; fetch or convert_url return them inline.
+    _metrics.incr(f"fetch_cache_total.{cache_status}")
+    return {
+        "url": url,
+        "status": entry.status,
+        "content_type": ct,
+        "bytes": len(entry.content),
+        "cache": cache_status,
+    }
 
-    headers = {
-        "User-Agent": "tweekit-mcp/0.1 (+https://github.com/equilibrium-team/tweekit-mcp)"
+
+@mcp.tool()
+async def fetch_many(
+    urls: Annotated[List[str], Field(description="HTTP or HTTPS URLs to retrieve concurrently.")],
+    max_bytes: Annotated[Optional[int], Field(description="Per-URL limit for text/JSON bodies, as in fetch. Defaults to TWEEKIT_FETCH_MAX_BYTES.")] = None,
+    extract: Annotated[str, Field(description="For HTML pages: 'none', 'text' or 'markdown', as in fetch.")] = "none",
+    deadline_seconds: Annotated[float, Field(description="Overall time limit. URLs still pending when it passes are reported as timed out.")] = 30.0,
+    ctx: Optional[Context] = None,
+) -> Dict[str, Any]:
+    """Fetch several URLs concurrently and return one result per URL, in input order.
+
+    All requests share one pooled client, at most TWEEKIT_FETCH_MANY_PER_HOST run
+    against the same host at a time, and a progress notification is sent as each URL
+    completes. Text/JSON results match `fetch`; images, PDFs and other binaries are
+    summarised by content type and size without downloading the body. The size
+    comes from Content-Length or a one-byte range request, and is null when neither
+    gives it.
+    """
+    if not urls:
+        return {"error": "Provide at least one URL."}
+    if len(urls) > FETCH_MANY_MAX_URLS:
+        return {"error": f"Too many URLs: {len(urls)} given, at most {FETCH_MANY_MAX_URLS} allowed."}
+    max_bytes, invalid = _fetch_limits(max_bytes, extract)
+    if invalid:
+        return invalid
+
+    overloaded = _overload_error("fetch_many")
+    if overloaded:
+        return overloaded
+
+    client = _egress_client()
+    host_slots: Dict[str, asyncio.Semaphore] = {}
+    results: List[Optional[Dict[str, Any]]] = [None] * len(urls)
+    completed = 0
+    started = time.perf_counter()
+
+    async def fetch_one(index: int, url: str) -> None:
+        nonlocal completed
+        parsed = urlparse(url)
+        if parsed.scheme not in {"http", "https"}:
+            result: Dict[str, Any] = {"url": url, "error": "Unsupported URL scheme. Use http or https."}
+        else:
+            slot = host_slots.setdefault(parsed.netloc.lower(), asyncio.Semaphore(FETCH_MANY_PER_HOST))
+            async with slot, _payload_budget.reserve() as reservation:
+                outcome = await _fetch_entry(client, url, max_bytes, extract, reservation, summarize_binary=True)
+                result = _fetch_many_item(url, outcome, max_bytes, extract)
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+        results[index] = result
+        completed += 1
+        if ctx is not None:
+            with contextlib.suppress(Exception):
+                await ctx.report_progress(completed, len(urls), url)
+
+    with _in_flight_slot():
+        tasks = [asyncio.create_task(fetch_one(index, url)) for index, url in enumerate(urls)]
+        try:
+            _, pending = await asyncio.wait(tasks, timeout=max(0.0, deadline_seconds))
+        finally:
+            # Also runs when the call itself is cancelled, so no fetch outlives it.
+            unfinished = [task for task in tasks if not task.done()]
+            for task in unfinished:
+                task.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+
+    for index, url in enumerate(urls):
+        if results[index] is None:
+            results[index] = {"url": url, "error": f"Deadline of {deadline_seconds:g}s exceeded."}
+    if pending:
+        _metrics.incr("fetch_many_deadline_exceeded_total", len(pending))
+    return {
+        "results": results,
+        "completed": completed,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 1),
     }
-    try:
-        async with httpx.AsyncClient(timeout=20.0, headers=headers, follow_redirects=True) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            ct = resp.headers.get("content-type", "").lower()
 
-            if ct.startswith("image/"):
-                return Image(data=resp.content, format=ct.split("/")[-1])
-            if ct.startswith("application/pdf"):
-                return File(data=resp.content, format="pdf")
-            if ct.startswith("text/") or "json" in ct:
-                text = resp.text
-                return {
-                    "url": str(url),
-                    "status": resp.status_code,
-                    "content_type": ct,
-                    "text": text,
-                }
-            # Fallback for other binary types
-            return File(data=resp.content, format="bin")
+
+# Parsed DuckDuckGo results per query; concurrent identical queries share one request.
+SEARCH_MAX_RESULTS = 10
+SEARCH_CACHE_SECONDS = float(os.getenv("TWEEKIT_SEARCH_CACHE_SECONDS", "60"))
+SEARCH_CACHE_BYTES = int(os.getenv("TWEEKIT_SEARCH_CACHE_BYTES", str(4 * 1024 * 1024)))
+
+_search_cache = _LRUCache("search", SEARCH_CACHE_BYTES)
+_inflight: Dict[str, "asyncio.Future[Any]"] = {}
+
+
+async def _coalesced(key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """Run `factory` once for concurrent callers sharing `key`; all of them get its result."""
+    future = _inflight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(factory())
+        _inflight[key] = future
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+    else:
+        _metrics.incr("coalesced_requests_total")
+    return await asyncio.shield(future)
+
+
+async def _search_duckduckgo(query: str) -> Any:
+    url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
+    headers = {"Accept-Language": "en-US,en;q=0.9"}
+    try:
+        client = _egress_client()
+        async with client.stream("GET", url, headers=headers, timeout=_timeout(20.0), follow_redirects=False) as r:
+            r.raise_for_status()
+            parser = SearchResultParser(SEARCH_MAX_RESULTS)
+            async for chunk in r.aiter_text():
+                parser.feed(chunk)
+                if parser.done:
+                    break
+        items = parser.finish()
+        _search_cache.put(query, items, len(json.dumps(items)), SEARCH_CACHE_SECONDS)
+        return items
     except httpx.HTTPStatusError as e:
         return {"error": f"HTTP error: {e.response.status_code}"}
     except httpx.RequestError as e:
@@ -597,43 +3551,15 @@ async def search(
     """Simple web search using DuckDuckGo HTML endpoint.
 
     Returns a list of {title, url, snippet} objects. Best‑effort parsing.
+    Results are cached per query for TWEEKIT_SEARCH_CACHE_SECONDS.
     """
-    max_results = max(1, min(int(max_results), 10))
-    q = quote_plus(query)
-    url = f"https://html.duckduckgo.com/html/?q={q}"
-    headers = {
-        "User-Agent": "tweekit-mcp/0.1 (+https://github.com/equilibrium-team/tweekit-mcp)",
-        "Accept-Language": "en-US,en;q=0.9",
-    }
-    try:
-        async with httpx.AsyncClient(timeout=20.0, headers=headers) as client:
-            r = await client.get(url)
-            r.raise_for_status()
-            html = r.text
-
-        # Very light parsing for result blocks
-        items: List[Dict[str, str]] = []
-        # Anchor tags have class result__a and href; snippets often in result__snippet
-        # This is heuristic and may change.
-        for m in re.finditer(r'<a[^>]*class="result__a"[^>]*href="([^"]+)"[^>]*>(.*?)</a>', html, re.I | re.S):
-            href = m.group(1)
-            title = re.sub("<.*?>", "", m.group(2))
-            # Try to find a nearby snippet
-            start = m.end()
-            snippet_match = re.search(r'<a[^>]*class="result__snippet"[^>]*>(.*?)</a>|<div[^>]*class="result__snippet"[^>]*>(.*?)</div>', html[start:start+2000], re.I | re.S)
-            snippet_html = snippet_match.group(1) if snippet_match and snippet_match.group(1) else (snippet_match.group(2) if snippet_match and snippet_match.group(2) else "")
-            snippet = re.sub("<.*?>", "", snippet_html)
-            items.append({"title": title.strip(), "url": href, "snippet": snippet.strip()})
-            if len(items) >= max_results:
-                break
-
-        return {"query": query, "results": items}
-    except httpx.HTTPStatusError as e:
-        return {"error": f"HTTP error: {e.response.status_code}"}
-    except httpx.RequestError as e:
-        return {"error": f"Network error: {e}"}
-    except Exception as e:
-        return {"error": f"Unexpected error: {e}"}
+    max_results = max(1, min(int(max_results), SEARCH_MAX_RESULTS))
+    items = _search_cache.get(query)
+    if items is None:
+        items = await _coalesced(f"search:{query}", functools.partial(_search_duckduckgo, query))
+    if isinstance(items, dict):
+        return items
+    return {"query": query, "results": items[:max_results]}
 
 
 def _parse_args() -> argparse.Namespace:
@@ -655,14 +3581,74 @@ def _parse_args() -> argparse.Namespace:
         default=int(os.getenv("PORT", "8080")),
         help="Port for streamable-http transport (default: 8080).",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WEB_CONCURRENCY", "1")),
+        help="Number of pre-forked worker processes for streamable-http transport (default: 1).",
+    )
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1 and args.transport != "streamable-http":
+        parser.error("--workers requires the streamable-http transport")
+    return args
+
+
+def _worker_app():
+    """Build the ASGI app served by each pre-forked worker process."""
+    app = mcp.http_app(transport="streamable-http")
+    session_lifespan = app.router.lifespan_context
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app_: Any) -> AsyncIterator[None]:
+        async with _background_services():
+            async with session_lifespan(app_):
+                yield
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
+# How long workers may spend finishing in-flight calls after a shutdown signal. The
+# default matches the upstream read timeout, so a running conversion can complete.
+WORKER_SHUTDOWN_SECONDS = float(os.getenv("TWEEKIT_WORKER_SHUTDOWN_SECONDS", "60"))
+
+
+def _run_workers(host: str, port: int, workers: int) -> None:
+    # Workers are spawned as fresh interpreters, so the shared metrics and artifact
+    # directories have to travel through the environment. Directories created here
+    # are removed once every worker has exited.
+    created = []
+    for variable, prefix in (("TWEEKIT_METRICS_DIR", "tweekit-metrics-"), ("TWEEKIT_ARTIFACT_DIR", "tweekit-artifacts-")):
+        if not os.getenv(variable):
+            os.environ[variable] = tempfile.mkdtemp(prefix=prefix)
+            created.append(os.environ[variable])
+    try:
+        uvicorn.run(
+            "server:_worker_app",
+            factory=True,
+            host=host,
+            port=port,
+            workers=workers,
+            lifespan="on",
+            timeout_graceful_shutdown=WORKER_SHUTDOWN_SECONDS,
+        )
+    finally:
+        for directory in created:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+async def _serve(transport: str, **rpc_kwargs: Any) -> None:
+    async with _background_services():
+        await mcp.run_async(transport=transport, **rpc_kwargs)
 
 
 def main() -> None:
     args = _parse_args()
 
     if args.transport == "streamable-http":
-        logger.info("🚀 TweekIT MCP server starting (HTTP) on %s:%s", args.host, args.port)
+        logger.info("🚀 TweekIT MCP server starting (HTTP) on %s:%s with %s worker(s)", args.host, args.port, args.workers)
     else:
         logger.info("🚀 TweekIT MCP server starting (stdio)")
 
@@ -671,12 +3657,10 @@ def main() -> None:
         rpc_kwargs.update({"host": args.host, "port": args.port})
 
     try:
-        asyncio.run(
-            mcp.run_async(
-                transport=args.transport,
-                **rpc_kwargs,
-            )
-        )
+        if args.workers > 1:
+            _run_workers(args.host, args.port, args.workers)
+        else:
+            asyncio.run(_serve(args.transport, **rpc_kwargs))
     except KeyboardInterrupt:
         logger.info("Server stopped by user.")
     except Exception as e:
@@ -29,3 +29,14 @@ def proxy_module(monkeypatch):
     module = importlib.import_module("plugin_proxy")
     importlib.reload(module)
     return module
+
+
+@pytest.fixture(autouse=True)
+def _empty_server_caches():
+    import server
+
+    server._result_cache.clear()
+    server._source_cache.clear()
+    server._fetch_cache.clear()
+    server._search_cache.clear()
+    yield
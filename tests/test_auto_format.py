@@ -0,0 +1,134 @@
+"""Tests for outfmt="auto"."""
+import base64
+import io
+import json
+
+import pytest
+import respx
+from httpx import Response
+
+import raster_engine
+import server
+
+BLOB = base64.b64encode(b"%PDF-1.4 document").decode("ascii")
+PNG = b"\x89PNG\r\n\x1a\n"
+
+
+def _png(size: int, color_type: int = 2) -> bytes:
+    """Bytes that look like a PNG with the given IHDR colour type, padded to `size`."""
+    header = PNG + b"\x00\x00\x00\x0dIHDR" + b"\x00\x00\x00\x10\x00\x00\x00\x10\x08" + bytes([color_type])
+    return header + b"\x00" * (size - len(header))
+
+
+def _webp(size: int) -> bytes:
+    header = b"RIFF\x00\x00\x00\x00WEBPVP8 "
+    return header + b"\x00" * (size - len(header))
+
+
+def _jpg(size: int) -> bytes:
+    return b"\xff\xd8\xff\xe0" + b"\x00" * (size - 4)
+
+
+def _by_format(responses):
+    """Mock side effect answering each upstream call according to its Fmt."""
+    def respond(request):
+        content, content_type = responses[json.loads(request.content)["Fmt"]]
+        return Response(200, content=content, headers={"content-type": content_type})
+    return respond
+
+
+@pytest.fixture(autouse=True)
+def _fresh_metrics(monkeypatch):
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+    monkeypatch.setattr(server, "AUTO_FORMATS", ("png", "webp", "jpg"))
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_pillow_encodes_candidates_locally_and_reports_savings():
+    """With Pillow only the PNG is converted upstream; a photo comes back as a smaller WebP."""
+    Image = pytest.importorskip("PIL.Image")
+    photo = Image.linear_gradient("L").resize((200, 200)).convert("RGB")
+    output = io.BytesIO()
+    photo.save(output, format="PNG")
+    route = respx.post(server.BASE_URL).mock(
+        return_value=Response(200, content=output.getvalue(), headers={"content-type": "image/png"})
+    )
+
+    image, summary = await server.convert.fn(inext="pdf", outfmt="auto", blob=BLOB, apiKey="k", apiSecret="s")
+
+    assert route.call_count == 1 and json.loads(route.calls[0].request.content)["Fmt"] == "png"
+    assert summary["format"] in ("webp", "jpg") and summary["baselineFormat"] == "png"
+    assert summary["bytes"] == len(image.data) and summary["bytesSaved"] == summary["baselineBytes"] - len(image.data) > 0
+    assert server._metrics.snapshot()["counters"][f"auto_format_total.{summary['format']}"] == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_without_pillow_listed_candidates_are_converted_upstream(monkeypatch):
+    """Each format the caller lists is requested from TweekIT and the smallest result is returned."""
+    monkeypatch.setattr(raster_engine, "available", lambda: False)
+    route = respx.post(server.BASE_URL).mock(side_effect=_by_format({
+        "png": (_png(9_000), "image/png"),
+        "webp": (_webp(3_000), "image/webp"),
+        "jpg": (_jpg(4_000), "image/jpeg"),
+    }))
+
+    image, summary = await server.convert.fn(
+        inext="pdf", outfmt="auto", blob=BLOB, autoFormats=["png", "webp", "jpg"], apiKey="k", apiSecret="s"
+    )
+
+    assert sorted(json.loads(call.request.content)["Fmt"] for call in route.calls) == ["jpg", "png", "webp"]
+    assert len(image.data) == 3_000
+    assert summary == {"format": "webp", "bytes": 3_000, "baselineFormat": "png", "baselineBytes": 9_000, "bytesSaved": 6_000}
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_without_pillow_the_default_is_one_upstream_conversion(monkeypatch):
+    """Unless formats are listed, auto converts once to the first TWEEKIT_AUTO_FORMATS entry."""
+    monkeypatch.setattr(raster_engine, "available", lambda: False)
+    route = respx.post(server.BASE_URL).mock(side_effect=_by_format({"png": (_png(9_000), "image/png")}))
+
+    _, summary = await server.convert.fn(inext="pdf", outfmt="auto", blob=BLOB, apiKey="k", apiSecret="s")
+    rejected = await server.convert.fn(inext="pdf", outfmt="auto", blob=BLOB, autoFormats=["svg"], apiKey="k", apiSecret="s")
+
+    assert route.call_count == 1
+    assert summary == {"format": "png", "bytes": 9_000, "baselineFormat": "png", "baselineBytes": 9_000, "bytesSaved": 0}
+    assert server._metrics.snapshot()["counters"]["auto_format_fallback_total"] == 1
+    assert rejected["error"] == "Unsupported autoFormats."
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_jpeg_is_not_chosen_for_transparent_images(monkeypatch):
+    """A smaller JPEG loses to WebP when the PNG has alpha and alpha is requested."""
+    monkeypatch.setattr(raster_engine, "available", lambda: False)
+    respx.post(server.BASE_URL).mock(side_effect=_by_format({
+        "png": (_png(9_000, color_type=6), "image/png"),
+        "webp": (_webp(5_000), "image/webp"),
+        "jpg": (_jpg(1_000), "image/jpeg"),
+    }))
+
+    formats = ["png", "webp", "jpg"]
+
+    _, summary = await server.convert.fn(inext="pdf", outfmt="auto", blob=BLOB, autoFormats=formats, apiKey="k", apiSecret="s")
+    assert summary["format"] == "webp"
+
+    _, flattened = await server.convert.fn(
+        inext="pdf", outfmt="auto", blob=BLOB, alpha=False, autoFormats=formats, apiKey="k", apiSecret="s"
+    )
+    assert flattened["format"] == "jpg"
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_upstream_errors_are_returned_unchanged(monkeypatch):
+    """When the baseline conversion fails, its error is the result."""
+    monkeypatch.setattr(raster_engine, "available", lambda: False)
+    respx.post(server.BASE_URL).mock(return_value=Response(500, text="boom"))
+
+    result = await server.convert.fn(inext="pdf", outfmt="auto", blob=BLOB, apiKey="k", apiSecret="s")
+
+    assert "error" in result
+    assert "auto_format_total.png" not in server._metrics.snapshot()["counters"]
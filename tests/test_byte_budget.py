@@ -0,0 +1,131 @@
+"""Tests for the in-flight payload byte budget."""
+import asyncio
+import base64
+
+import pytest
+import respx
+from fastapi.testclient import TestClient
+from httpx import Response
+
+import server
+from byte_budget import BudgetExceeded, ByteBudget
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_granted_in_order_on_release():
+    """A request that doesn't fit waits until earlier reservations are released."""
+    budget = ByteBudget(limit_bytes=100, wait_seconds=1)
+
+    async with budget.reserve(80):
+        waiter = asyncio.create_task(budget.acquire(50))
+        await asyncio.sleep(0)
+        assert budget.snapshot()["waiting"] == 1
+        assert not waiter.done()
+
+    await asyncio.wait_for(waiter, 1)
+    assert budget.used_bytes == 50
+
+
+@pytest.mark.asyncio
+async def test_waiting_request_is_rejected_after_timeout():
+    """When nothing frees up within the wait limit the request is rejected."""
+    budget = ByteBudget(limit_bytes=100, wait_seconds=0.01)
+
+    async with budget.reserve(100):
+        with pytest.raises(BudgetExceeded):
+            await budget.acquire(1)
+
+    snapshot = budget.snapshot()
+    assert snapshot == {"limitBytes": 100, "usedBytes": 0, "waiting": 0, "rejected": 1}
+
+
+@pytest.mark.asyncio
+async def test_small_reservation_goes_ahead_of_blocked_large_one_a_bounded_number_of_times():
+    """A request that fits skips a blocked larger waiter, until max_bypass is used up."""
+    budget = ByteBudget(limit_bytes=100, wait_seconds=1, max_bypass=2)
+
+    async with budget.reserve(60):
+        bulk = asyncio.create_task(budget.acquire(50))
+        await asyncio.sleep(0)
+        await asyncio.wait_for(budget.acquire(10), 0.1)
+        await asyncio.wait_for(budget.acquire(10), 0.1)
+        queued = asyncio.create_task(budget.acquire(10))
+        await asyncio.sleep(0)
+        assert not bulk.done() and not queued.done()
+        budget.release(20)
+
+    await asyncio.wait_for(asyncio.gather(bulk, queued), 1)
+    assert budget.used_bytes == 60
+
+
+@pytest.mark.asyncio
+async def test_convert_rejects_payload_larger_than_budget(monkeypatch):
+    """convert estimates its footprint from the base64 length before calling TweekIT."""
+    monkeypatch.setattr(server, "_payload_budget", ByteBudget(limit_bytes=64, wait_seconds=0))
+    blob = base64.b64encode(b"x" * 300).decode("ascii")
+
+    result = await server.convert.fn(inext="png", outfmt="png", blob=blob, apiKey="k", apiSecret="s")
+
+    assert result["retryable"] is True
+    assert "budget" in result["error"]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_convert_url_reserves_from_content_length(monkeypatch):
+    """convert_url rejects oversized downloads as soon as the headers arrive."""
+    monkeypatch.setattr(server, "_payload_budget", ByteBudget(limit_bytes=1000, wait_seconds=0))
+    remote_url = "https://example.com/huge.pdf"
+    respx.get(remote_url).mock(
+        return_value=Response(200, content=b"%PDF" * 200, headers={"content-type": "application/pdf"})
+    )
+    convert_route = respx.post(server.BASE_URL).mock(return_value=Response(200, json={"status": "ok"}))
+
+    result = await server._convert_url_impl(apiKey="k", apiSecret="s", url=remote_url, outfmt="png")
+
+    assert "budget" in result["error"]
+    assert not convert_route.called
+    assert server._payload_budget.used_bytes == 0
+
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_convert_url_grows_reservation_for_chunked_downloads(monkeypatch):
+    """Without a Content-Length the reservation grows with the body and stops it at the budget."""
+    monkeypatch.setattr(server, "_payload_budget", ByteBudget(limit_bytes=1000, wait_seconds=0))
+    monkeypatch.setattr(server, "PREFLIGHT_DOCTYPE", False)
+    remote_url = "https://example.com/chunked.pdf"
+    sent = 0
+
+    async def body():
+        nonlocal sent
+        for _ in range(20):
+            sent += 1
+            yield b"%PDF" * 10
+
+    respx.get(remote_url).mock(return_value=Response(200, content=body(), headers={"content-type": "application/pdf"}))
+    convert_route = respx.post(server.BASE_URL).mock(return_value=Response(200, json={"status": "ok"}))
+
+    result = await server._convert_url_impl(apiKey="k", apiSecret="s", url=remote_url, outfmt="png")
+
+    assert "budget" in result["error"]
+    assert sent < 20 and not convert_route.called
+    assert server._payload_budget.used_bytes == 0
+
+
+@respx.mock
+def test_proxy_convert_returns_503_when_budget_exhausted(proxy_module, monkeypatch):
+    """The plugin proxy answers with 503 and Retry-After instead of buffering more bytes."""
+    monkeypatch.setattr(proxy_module, "payload_budget", ByteBudget(limit_bytes=10, wait_seconds=0))
+    client = TestClient(proxy_module.app)
+
+    response = client.post(
+        "/convert",
+        json={"inext": "pdf", "outfmt": "png", "blob": base64.b64encode(b"data" * 10).decode("ascii")},
+        headers={"Authorization": "Bearer test-key", "X-Api-Secret": "test-secret"},
+    )
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+    assert client.get("/metrics").json()["payloadBudget"]["rejected"] == 1
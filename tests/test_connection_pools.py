@@ -0,0 +1,147 @@
+"""Tests for the separate upstream/egress connection pools and per-host limits."""
+import asyncio
+
+import httpcore
+import httpx
+import pytest
+import respx
+from httpx import Response
+
+import server
+
+
+@pytest.fixture(autouse=True)
+def _fresh_pools(monkeypatch):
+    monkeypatch.setattr(server, "_clients", {})
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+
+
+def _slow_text(peaks):
+    active = {}
+
+    async def respond(request):
+        host = request.url.host
+        active[host] = active.get(host, 0) + 1
+        peaks[host] = max(peaks.get(host, 0), active[host])
+        await asyncio.sleep(0.03)
+        active[host] -= 1
+        return Response(200, text="ok", headers={"content-type": "text/plain"})
+
+    return respond
+
+
+@pytest.mark.asyncio
+async def test_upstream_and_egress_use_separate_shared_clients():
+    """Each pool is one client reused across calls, and the two never coincide."""
+    upstream = server._upstream_client()
+    egress = server._egress_client()
+
+    assert upstream is server._upstream_client()
+    assert egress is server._egress_client()
+    assert upstream is not egress
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_egress_requests_are_capped_per_host(monkeypatch):
+    """A busy origin is held to its per-host cap while other hosts proceed."""
+    monkeypatch.setattr(server, "EGRESS_MAX_PER_HOST", 2)
+    peaks = {}
+    respx.get(host="busy.example").mock(side_effect=_slow_text(peaks))
+    respx.get(host="quiet.example").mock(side_effect=_slow_text(peaks))
+
+    calls = [server.fetch.fn(url=f"https://busy.example/{i}") for i in range(5)]
+    calls += [server.fetch.fn(url=f"https://quiet.example/{i}") for i in range(2)]
+    results = await asyncio.gather(*calls)
+
+    assert all(result["text"] == "ok" for result in results)
+    assert peaks == {"busy.example": 2, "quiet.example": 2}
+    snapshot = server._metrics.snapshot()
+    assert snapshot["gauges"]["pool_active.egress"] == 0
+    assert snapshot["summaries"]["pool_wait_ms.egress"]["count"] == 7
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_pool_wait_timeout_fails_fast(monkeypatch):
+    """Requests that cannot get a host slot within the wait limit fail with a network error."""
+    monkeypatch.setattr(server, "EGRESS_MAX_PER_HOST", 1)
+    monkeypatch.setattr(server, "POOL_WAIT_SECONDS", 0.01)
+    respx.get(host="stuck.example").mock(side_effect=_slow_text({}))
+
+    first, second = await asyncio.gather(
+        server.fetch.fn(url="https://stuck.example/a"),
+        server.fetch.fn(url="https://stuck.example/b"),
+    )
+
+    assert first["text"] == "ok"
+    assert "Waited" in second["error"]
+    assert server._metrics.snapshot()["counters"]["pool_timeouts_total.egress"] == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_slow_egress_does_not_block_upstream(monkeypatch):
+    """Conversions still reach TweekIT while egress slots are all taken."""
+    monkeypatch.setattr(server, "EGRESS_MAX_PER_HOST", 1)
+    release = asyncio.Event()
+
+    async def hold(request):
+        await release.wait()
+        return Response(200, text="late", headers={"content-type": "text/plain"})
+
+    respx.get("https://slow.example/").mock(side_effect=hold)
+    respx.post(server.BASE_URL).mock(return_value=Response(200, json={"status": "ok"}))
+
+    stalled = asyncio.create_task(server.fetch.fn(url="https://slow.example/"))
+    await asyncio.sleep(0.01)
+    converted = await server._convert_impl(apiKey="k", apiSecret="s", inext="png", outfmt="png", blob="aGk=")
+    release.set()
+    await stalled
+
+    assert converted == {"status": "ok"}
+    assert server._metrics.snapshot()["gauges"]["pool_utilization.upstream"] == 0
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_pooled_clients_do_not_share_cookies():
+    """A cookie set for one caller is never replayed on another caller's request."""
+    route = respx.get(host="cookies.example").mock(return_value=Response(
+        200, text="ok", headers={"content-type": "text/plain", "set-cookie": "session=first-caller; Path=/"},
+    ))
+
+    await server.fetch.fn(url="https://cookies.example/a")
+    await server.fetch.fn(url="https://cookies.example/b")
+
+    assert "cookie" not in route.calls[1].request.headers
+    assert not server._egress_client().cookies
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_host_slots_are_dropped_once_idle():
+    """Per-host semaphores do not pile up for origins that are no longer in use."""
+    respx.get(host__regex=r"origin\d+\.example").mock(side_effect=_slow_text({}))
+
+    await asyncio.gather(*(server.fetch.fn(url=f"https://origin{i}.example/") for i in range(20)))
+
+    transport = server._egress_client()._transport
+    assert transport._slots == {}
+    assert transport._slot_users == {}
+
+
+@pytest.mark.asyncio
+async def test_pooled_clients_honour_proxy_environment(monkeypatch):
+    """HTTPS_PROXY routes pooled requests through the proxy, except for NO_PROXY hosts."""
+    monkeypatch.setenv("HTTPS_PROXY", "http://proxy.internal:3128")
+    monkeypatch.setenv("NO_PROXY", "direct.example")
+
+    transport = server._egress_client()._transport
+    proxied = transport._transport_for(httpx.URL("https://origin.example/file.pdf"))
+    direct = transport._transport_for(httpx.URL("https://direct.example/file.pdf"))
+
+    assert isinstance(proxied._pool, httpcore.AsyncHTTPProxy)
+    assert proxied._pool._proxy_url.host == b"proxy.internal"
+    assert direct is transport._transport
+    assert isinstance(server._upstream_client()._transport._transport_for(httpx.URL(server.BASE_URL))._pool, httpcore.AsyncHTTPProxy)
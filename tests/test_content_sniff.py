@@ -0,0 +1,86 @@
+"""Tests for signature-based input type detection."""
+import io
+import zipfile
+
+import pytest
+import respx
+from httpx import Response
+
+import server
+from content_sniff import matches, sniff_extension
+
+
+def _zip(names, mimetype=None):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        if mimetype:
+            archive.writestr("mimetype", mimetype)
+        for name in names:
+            archive.writestr(name, "<xml/>")
+    return buffer.getvalue()
+
+
+def test_common_signatures_are_recognised():
+    """Images, PDFs, HEIC and PSD are identified from their first bytes."""
+    assert sniff_extension(b"%PDF-1.7\n") == "pdf"
+    assert sniff_extension(b"\x89PNG\r\n\x1a\n....") == "png"
+    assert sniff_extension(b"\xff\xd8\xff\xe1....") == "jpg"
+    assert sniff_extension(b"II*\x00\x08\x00") == "tiff"
+    assert sniff_extension(b"\x00\x00\x00\x18ftypheic\x00\x00\x00\x00") == "heic"
+    assert sniff_extension(b"RIFF\x10\x00\x00\x00WEBPVP8 ") == "webp"
+    assert sniff_extension(b"8BPS\x00\x01") == "psd"
+    assert sniff_extension(b"plain text") is None
+
+
+def test_heif_brands_and_photoshop_versions_are_told_apart():
+    """Generic HEIF major brands defer to the compatible brands; PSB is version 2 of PSD."""
+    assert sniff_extension(b"\x00\x00\x00\x1cftypmif1\x00\x00\x00\x00mif1avifmiaf") == "avif"
+    assert sniff_extension(b"\x00\x00\x00\x1cftypmsf1\x00\x00\x00\x00msf1avismiaf") == "avif"
+    assert sniff_extension(b"\x00\x00\x00\x18ftypmif1\x00\x00\x00\x00mif1heic") == "heic"
+    assert sniff_extension(b"\x00\x00\x00\x14ftypmif1\x00\x00\x00\x00mif1" + b"avif") == "heic"
+    assert sniff_extension(b"\x00\x00\x00\x18ftypavif\x00\x00\x00\x00mif1miaf") == "avif"
+    assert sniff_extension(b"8BPS\x00\x02\x00\x00") == "psb"
+    assert sniff_extension(b"8BPS\x00\x07") is None
+
+
+def test_office_containers_are_told_apart():
+    """ZIP and OLE containers resolve to the document type inside, or None when unknown."""
+    assert sniff_extension(_zip(["[Content_Types].xml", "word/document.xml"])) == "docx"
+    assert sniff_extension(_zip(["[Content_Types].xml", "xl/workbook.xml"])) == "xlsx"
+    assert sniff_extension(_zip(["content.xml"], "application/vnd.oasis.opendocument.text")) == "odt"
+    assert sniff_extension(_zip(["notes.txt"])) is None
+    ole = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + b"\x00" * 64
+    assert sniff_extension(ole + "WordDocument".encode("utf-16-le") + b"\x00\x00") == "doc"
+    assert sniff_extension(ole) is None
+    assert matches("docm", "docx") and matches("ai", "pdf") and not matches("png", "jpg")
+
+
+def test_resolve_extension_prefers_the_signature_over_a_wrong_hint():
+    """A misnamed or untyped download gets its real type; a variant extension is kept."""
+    png = b"\x89PNG\r\n\x1a\n" + b"x" * 16
+    pdf = b"%PDF-1.4\n"
+
+    assert server._resolve_extension("https://x.test/photo.jpg", None, "image/jpeg", png) == "png"
+    assert server._resolve_extension("https://x.test/download", None, "application/octet-stream", pdf) == "pdf"
+    assert server._resolve_extension("https://x.test/logo.ai", None, "application/pdf", pdf) == "ai"
+    assert server._resolve_extension("https://x.test/photo.jpg", "png", None, pdf) == "png"
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_convert_keeps_an_explicit_inext_and_sniffs_a_blank_one(monkeypatch):
+    """A declared `inext` wins over the signature; a blank one is filled in from it."""
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+    convert_route = respx.post(server.BASE_URL).mock(
+        return_value=Response(200, content=b"converted", headers={"content-type": "image/png"})
+    )
+    blob = server._b64encode(b"%PDF-1.4\n" + b"x" * 32)
+
+    await server.convert.fn(inext="docx", outfmt="png", blob=blob, apiKey="k", apiSecret="s")
+    await server.convert.fn(inext="", outfmt="png", blob=blob, apiKey="k", apiSecret="s")
+
+    assert b'"DocDataType":"docx"' in convert_route.calls[0].request.content
+    assert b'"DocDataType":"pdf"' in convert_route.calls[1].request.content
+    counters = server._metrics.snapshot()["counters"]
+    assert counters["content_sniff_mismatch_total"] == 1
+    assert counters["content_sniff_resolved_total"] == 1
@@ -0,0 +1,74 @@
+"""Tests for the interactive and bulk conversion lanes."""
+import asyncio
+import base64
+
+import pytest
+import respx
+from httpx import Response
+
+import server
+
+
+@pytest.fixture(autouse=True)
+def _fresh_lanes(monkeypatch):
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+    monkeypatch.setattr(server, "_conversion_lanes", {
+        "interactive": server._lane_scheduler("interactive", 2),
+        "bulk": server._lane_scheduler("bulk", 1),
+    })
+
+
+def test_lane_follows_size_and_format_pair(monkeypatch):
+    """Small single-page work is interactive; big inputs and whole documents are bulk."""
+    monkeypatch.setattr(server, "INTERACTIVE_MAX_BYTES", 1000)
+
+    assert server._conversion_lane("png", "webp", 1000, False) == "interactive"
+    assert server._conversion_lane("docx", "png", 1000, False) == "interactive"
+    assert server._conversion_lane("png", "webp", 2000, False) == "bulk"
+    assert server._conversion_lane("docx", "PDF", 100, False) == "bulk"
+    assert server._conversion_lane("jpeg", "pdf", 100, False) == "interactive"
+    assert server._conversion_lane("pdf", "png", 100, True) == "bulk"
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_interactive_work_is_not_held_up_by_a_full_bulk_lane():
+    """A thumbnail completes while every bulk slot is busy."""
+    respx.post(server.BASE_URL).mock(return_value=Response(200, content=b"thumb", headers={"content-type": "image/png"}))
+    blob = base64.b64encode(b"small png").decode("ascii")
+
+    async with server._conversion_lanes["bulk"].slot("batch-key"):
+        result = await asyncio.wait_for(
+            server.convert.fn(inext="png", outfmt="png", blob=blob, apiKey="k", apiSecret="s"), 1
+        )
+
+    assert result.data == b"thumb"
+    assert server._metrics.snapshot()["counters"]["convert_lane_total.interactive"] == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_each_lane_has_its_own_concurrency_limit():
+    """Upstream concurrency per lane never exceeds that lane's slots."""
+    active = {"pdf": 0, "png": 0}
+    peak = {"pdf": 0, "png": 0}
+
+    async def slow(request):
+        fmt = "pdf" if b'"Fmt":"pdf"' in request.content else "png"
+        active[fmt] += 1
+        peak[fmt] = max(peak[fmt], active[fmt])
+        await asyncio.sleep(0.02)
+        active[fmt] -= 1
+        return Response(200, content=b"out", headers={"content-type": "image/png"})
+
+    respx.post(server.BASE_URL).mock(side_effect=slow)
+
+    def call(outfmt, index):
+        blob = base64.b64encode(f"document {index}".encode()).decode("ascii")
+        return server.convert.fn(inext="docx", outfmt=outfmt, blob=blob, apiKey="k", apiSecret="s")
+
+    await asyncio.gather(*(call(fmt, i) for i in range(4) for fmt in ("pdf", "png")))
+
+    assert peak == {"pdf": 1, "png": 2}
+    counters = server._metrics.snapshot()["counters"]
+    assert counters["convert_lane_total.bulk"] == counters["convert_lane_total.interactive"] == 4
@@ -0,0 +1,133 @@
+"""Tests for the convert_pipeline tool."""
+import asyncio
+import base64
+import json
+
+import pytest
+import respx
+from httpx import Response
+
+import server
+from byte_budget import ByteBudget
+
+DOCX = base64.b64encode(b"PK\x03\x04" + b"\x00" * 26 + b"word/document.xml").decode("ascii")
+PNG = b"\x89PNG\r\n\x1a\n"
+
+
+@pytest.fixture(autouse=True)
+def _fresh_state(monkeypatch):
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+    server._result_cache.clear()
+
+
+def _upstream(request):
+    """Fake TweekIT: DOCX becomes a PDF, a PDF page becomes a PNG, a PNG is cropped."""
+    body = json.loads(request.content)
+    if body["DocDataType"] == "docx":
+        return Response(200, content=b"%PDF-1.7 converted", headers={"content-type": "application/pdf"})
+    if body["DocDataType"] == "pdf":
+        return Response(200, content=PNG + f"page{body['Page']}".encode(), headers={"content-type": "image/png"})
+    source = base64.b64decode(body["DocData"])
+    return Response(200, content=source + f"|{body['Width']}x{body['X2']}".encode(), headers={"content-type": "image/png"})
+
+
+CHAIN = [
+    {"id": "pdf", "outfmt": "pdf", "noRasterize": True},
+    {"id": "page", "input": "pdf", "outfmt": "png", "page": 3},
+    {"id": "thumb", "input": "page", "outfmt": "png", "x2": 400, "y2": 300, "width": 200},
+]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_chain_returns_only_the_final_step_and_is_cached():
+    """Intermediates stay on the server; rerunning the pipeline is served from the result cache."""
+    route = respx.post(server.BASE_URL).mock(side_effect=_upstream)
+
+    image, summary = await server.convert_pipeline.fn(steps=CHAIN, blob=DOCX, inext="docx", apiKey="k", apiSecret="s")
+
+    assert image.data == PNG + b"page3|200x400"
+    assert summary["outputs"] == ["thumb"]
+    assert [(step["id"], step["status"], step["format"]) for step in summary["steps"]] == [
+        ("pdf", "ok", "pdf"), ("page", "ok", "png"), ("thumb", "ok", "png"),
+    ]
+    assert route.call_count == 3
+
+    again = await server.convert_pipeline.fn(steps=CHAIN, blob=DOCX, inext="docx", apiKey="k", apiSecret="s")
+    assert again[0].data == image.data and route.call_count == 3
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_independent_branches_run_concurrently():
+    """Two pages of the same intermediate PDF are converted at the same time."""
+    in_flight, peak = 0, 0
+
+    async def respond(request):
+        nonlocal in_flight, peak
+        if json.loads(request.content)["DocDataType"] == "pdf":
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.05)
+            in_flight -= 1
+        return _upstream(request)
+
+    respx.post(server.BASE_URL).mock(side_effect=respond)
+    steps = [
+        {"id": "pdf", "outfmt": "pdf", "noRasterize": True},
+        {"id": "first", "input": "pdf", "outfmt": "png", "page": 1},
+        {"id": "second", "input": "pdf", "outfmt": "png", "page": 2},
+    ]
+
+    first, second, summary = await server.convert_pipeline.fn(steps=steps, blob=DOCX, inext="docx", apiKey="k", apiSecret="s")
+
+    assert (first.data, second.data) == (PNG + b"page1", PNG + b"page2")
+    assert summary["outputs"] == ["first", "second"] and peak == 2
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_failed_step_skips_its_dependents():
+    """Steps reading a failed step are skipped; other requested outputs are still returned."""
+    def respond(request):
+        if json.loads(request.content)["Page"] == 3:
+            return Response(500, text="no page 3")
+        return _upstream(request)
+
+    respx.post(server.BASE_URL).mock(side_effect=respond)
+
+    failed = await server.convert_pipeline.fn(steps=CHAIN, blob=DOCX, inext="docx", apiKey="k", apiSecret="s")
+    assert failed["error"] == "The pipeline produced no outputs."
+    assert [step["status"] for step in failed["steps"]] == ["ok", "failed", "skipped"]
+
+    pdf, summary = await server.convert_pipeline.fn(
+        steps=CHAIN, outputs=["pdf", "thumb"], blob=DOCX, inext="docx", apiKey="k", apiSecret="s"
+    )
+    assert pdf.data.startswith(b"%PDF-") and summary["outputs"] == ["pdf"]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_source_steps_are_reserved_from_the_payload_budget(monkeypatch):
+    """A step reading the source reserves its own request body, like intermediate steps do."""
+    request_bytes = server.estimate_base64_request_bytes(len(DOCX))
+    monkeypatch.setattr(server, "_payload_budget", ByteBudget(limit_bytes=2 * request_bytes - 1, wait_seconds=0))
+    route = respx.post(server.BASE_URL).mock(side_effect=_upstream)
+
+    failed = await server.convert_pipeline.fn(steps=CHAIN[:1], blob=DOCX, inext="docx", apiKey="k", apiSecret="s")
+
+    assert [step["status"] for step in failed["steps"]] == ["failed"]
+    assert "budget" in failed["steps"][0]["error"]
+    assert not route.called
+
+
+@pytest.mark.asyncio
+async def test_invalid_pipelines_are_rejected():
+    """Forward references, unknown or mistyped options and unknown outputs are errors."""
+    async def run(steps, **kwargs):
+        return await server.convert_pipeline.fn(steps=steps, blob=DOCX, inext="docx", apiKey="k", apiSecret="s", **kwargs)
+
+    assert "not an earlier step" in (await run([{"input": "later", "outfmt": "png"}, {"id": "later", "outfmt": "pdf"}]))["error"]
+    assert "unknown options: dpi" in (await run([{"outfmt": "png", "dpi": 300}]))["error"]
+    assert "width must be int" in (await run([{"outfmt": "png", "width": "wide"}]))["error"]
+    assert "Unknown output steps: nope" in (await run([{"outfmt": "png"}], outputs=["nope"]))["error"]
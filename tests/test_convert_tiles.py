@@ -0,0 +1,155 @@
+"""Tests for the convert_tiles tool."""
+import base64
+import json
+import struct
+
+import pytest
+import respx
+from httpx import Response
+
+import server
+from byte_budget import ByteBudget
+
+
+@pytest.fixture(autouse=True)
+def _fresh_state(monkeypatch):
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+    monkeypatch.setattr(server, "_artifacts", server._Artifacts(1024 * 1024, 60))
+    monkeypatch.setattr(server, "PREFLIGHT_DOCTYPE", False)
+    server._result_cache.clear()
+
+
+def _png_blob(width: int, height: int) -> str:
+    header = b"\x89PNG\r\n\x1a\n" + b"\x00\x00\x00\x0dIHDR" + struct.pack(">II", width, height) + b"\x08\x02\x00\x00\x00"
+    return base64.b64encode(header + b"\x00" * 64).decode("ascii")
+
+
+def _tiff(width: int, height: int) -> bytes:
+    """A little-endian TIFF header with one IFD holding ImageWidth (LONG) and ImageLength (SHORT)."""
+    ifd = struct.pack("<H", 2) + struct.pack("<HHII", 256, 4, 1, width) + struct.pack("<HHIHH", 257, 3, 1, height, 0)
+    return b"II*\x00" + struct.pack("<I", 8) + ifd + struct.pack("<I", 0) + b"\x00" * 64
+
+
+def _crops(route):
+    return sorted(
+        tuple(json.loads(call.request.content)[name] for name in ("X1", "Y1", "X2", "Y2", "Width", "Height"))
+        for call in route.calls
+    )
+
+
+def _tile_image(request):
+    body = json.loads(request.content)
+    return Response(200, content=b"\x89PNG\r\n\x1a\n" + f"{body['X1']},{body['Y1']}".encode(), headers={"content-type": "image/png"})
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_pyramid_tiles_are_cropped_rendered_and_fetchable():
+    """Two levels over 1000x600 at 512px give a 2x2 grid plus one half-resolution tile."""
+    route = respx.post(server.BASE_URL).mock(side_effect=_tile_image)
+
+    manifest = await server.convert_tiles.fn(
+        outfmt="png", blob=_png_blob(1000, 600), inext="png", tileSize=512, levels=3, apiKey="k", apiSecret="s"
+    )
+
+    assert [(level["columns"], level["rows"]) for level in manifest["levels"]] == [(2, 2), (1, 1)]
+    assert manifest["rendered"] == 5 and manifest["failed"] == 0
+    assert _crops(route) == [
+        (0, 0, 512, 512, 512, 512),
+        (0, 0, 1000, 600, 500, 300),
+        (0, 512, 512, 600, 512, 88),
+        (512, 0, 1000, 512, 488, 512),
+        (512, 512, 1000, 600, 488, 88),
+    ]
+    corner = next(tile for tile in manifest["tiles"] if (tile["level"], tile["column"], tile["row"]) == (0, 1, 1))
+    image = await server.get_artifact.fn(artifactId=corner["artifactId"], apiKey="k", apiSecret="s")
+    assert image.data.endswith(b"512,512")
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_region_limits_tiles_and_repeats_hit_the_result_cache():
+    """Only tiles overlapping the region are rendered, and a second call reuses them."""
+    route = respx.post(server.BASE_URL).mock(side_effect=_tile_image)
+    blob = _png_blob(2048, 2048)
+
+    first = await server.convert_tiles.fn(outfmt="png", blob=blob, inext="png", region=[600, 100, 700, 900], apiKey="k", apiSecret="s")
+    second = await server.convert_tiles.fn(outfmt="png", blob=blob, inext="png", region=[600, 100, 700, 900], apiKey="k", apiSecret="s")
+
+    assert [(tile["column"], tile["row"]) for tile in first["tiles"]] == [(1, 0), (1, 1)]
+    assert second["rendered"] == 2 and route.call_count == 2
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_tiff_url_size_is_read_and_documents_need_explicit_dimensions(monkeypatch):
+    """TIFF dimensions come from the header; a PDF needs sourceWidth/sourceHeight."""
+    respx.get("https://example.com/plan.tif").mock(
+        return_value=Response(200, content=_tiff(70_000, 300), headers={"content-type": "image/tiff"})
+    )
+    respx.get("https://example.com/plan.pdf").mock(
+        return_value=Response(200, content=b"%PDF-1.7 drawing", headers={"content-type": "application/pdf"})
+    )
+    route = respx.post(server.BASE_URL).mock(side_effect=_tile_image)
+    monkeypatch.setattr(server, "TILES_MAX", 2)
+
+    too_many = await server.convert_tiles.fn(outfmt="webp", url="https://example.com/plan.tif", tileSize=4096, apiKey="k", apiSecret="s")
+    unknown = await server.convert_tiles.fn(outfmt="png", url="https://example.com/plan.pdf", apiKey="k", apiSecret="s")
+    drawing = await server.convert_tiles.fn(
+        outfmt="png", url="https://example.com/plan.pdf", sourceWidth=800, sourceHeight=400, apiKey="k", apiSecret="s"
+    )
+
+    assert too_many["error"].startswith("Too many tiles: 18 needed")
+    assert unknown["error"] == "Could not read the source dimensions."
+    assert drawing["source"] == {"width": 800, "height": 400, "format": "pdf"} and route.call_count == 2
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_failed_tiles_are_reported_in_the_manifest():
+    """A tile TweekIT rejects carries its error; the others still get artifacts."""
+    def respond(request):
+        if json.loads(request.content)["X1"]:
+            return Response(500, text="tile failed")
+        return _tile_image(request)
+
+    respx.post(server.BASE_URL).mock(side_effect=respond)
+
+    manifest = await server.convert_tiles.fn(outfmt="png", blob=_png_blob(600, 100), inext="png", apiKey="k", apiSecret="s")
+
+    assert (manifest["rendered"], manifest["failed"]) == (1, 1)
+    assert manifest["tiles"][0]["artifactId"] and manifest["tiles"][1]["error"] == "HTTP 500 from TweekIT"
+    assert server._metrics.snapshot()["counters"]["tiles_failed_total"] == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_tiles_are_fetchable_from_another_worker(monkeypatch, tmp_path):
+    """Tiles written to the shared artifact directory are served by a fresh store."""
+    monkeypatch.setattr(server, "_artifacts", server._Artifacts(1024 * 1024, 60, str(tmp_path)))
+    respx.post(server.BASE_URL).mock(side_effect=_tile_image)
+
+    manifest = await server.convert_tiles.fn(
+        outfmt="png", blob=_png_blob(1000, 600), inext="png", tileSize=512, levels=1, apiKey="k", apiSecret="s"
+    )
+
+    monkeypatch.setattr(server, "_artifacts", server._Artifacts(1024 * 1024, 60, str(tmp_path)))
+    corner = next(tile for tile in manifest["tiles"] if (tile["column"], tile["row"]) == (1, 0))
+    image = await server.get_artifact.fn(artifactId=corner["artifactId"], apiKey="k", apiSecret="s")
+    assert image.data.endswith(b"512,0")
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_each_tile_request_is_reserved_from_the_payload_budget(monkeypatch):
+    """A budget that holds the source but not a tile's request body fails the tiles."""
+    blob = _png_blob(600, 100)
+    request_bytes = server.estimate_base64_request_bytes(len(blob))
+    monkeypatch.setattr(server, "_payload_budget", ByteBudget(limit_bytes=2 * request_bytes - 1, wait_seconds=0))
+    route = respx.post(server.BASE_URL).mock(side_effect=_tile_image)
+
+    manifest = await server.convert_tiles.fn(outfmt="png", blob=blob, inext="png", apiKey="k", apiSecret="s")
+
+    assert (manifest["rendered"], manifest["failed"]) == (0, 2)
+    assert all("budget" in tile["error"] for tile in manifest["tiles"])
+    assert not route.called
@@ -0,0 +1,125 @@
+"""Tests for convert_url pre-flight size and type checks."""
+import base64
+import json
+
+import pytest
+import respx
+from httpx import Response
+
+import server
+
+
+@pytest.fixture(autouse=True)
+def _fresh_doctype_cache(monkeypatch):
+    monkeypatch.setattr(server, "_doctype_cache", {})
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_rejects_declared_size_over_limit(monkeypatch):
+    """A Content-Length above the limit is rejected without converting."""
+    monkeypatch.setattr(server, "MAX_DOWNLOAD_BYTES", 100)
+    remote_url = "https://example.com/big.png"
+    respx.get(remote_url).mock(
+        return_value=Response(200, content=b"x" * 500, headers={"content-type": "image/png"})
+    )
+    convert_route = respx.post(server.BASE_URL).mock(return_value=Response(200, json={"status": "ok"}))
+
+    result = await server._convert_url_impl(apiKey="k", apiSecret="s", url=remote_url, outfmt="png")
+
+    assert result["error"] == "Remote file is too large to convert."
+    assert "Content-Length 500" in result["details"]
+    assert not convert_route.called
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_aborts_undeclared_stream_over_limit(monkeypatch):
+    """Without a Content-Length the download stops once it passes the limit."""
+    monkeypatch.setattr(server, "MAX_DOWNLOAD_BYTES", 100)
+    remote_url = "https://example.com/stream.png"
+
+    async def body():
+        for _ in range(10):
+            yield b"x" * 50
+
+    respx.get(remote_url).mock(return_value=Response(200, content=body(), headers={"content-type": "image/png"}))
+    convert_route = respx.post(server.BASE_URL).mock(return_value=Response(200, json={"status": "ok"}))
+
+    result = await server._convert_url_impl(apiKey="k", apiSecret="s", url=remote_url, outfmt="png")
+
+    assert "exceeded" in result["details"]
+    assert not convert_route.called
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_rejects_html_page_served_for_document_url():
+    """An HTML page where a PDF was expected is reported instead of converted."""
+    remote_url = "https://example.com/report.pdf"
+    respx.get(remote_url).mock(
+        return_value=Response(200, content=b"<html>Sign in</html>", headers={"content-type": "text/html"})
+    )
+    convert_route = respx.post(server.BASE_URL).mock(return_value=Response(200, json={"status": "ok"}))
+
+    result = await server._convert_url_impl(apiKey="k", apiSecret="s", url=remote_url, outfmt="png")
+
+    assert "HTML page" in result["error"]
+    assert not convert_route.called
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_html_content_type_alone_does_not_reject_a_real_document():
+    """A PDF mislabelled as text/html is converted; the header is only a hint."""
+    remote_url = "https://example.com/report.pdf"
+    body = b"%PDF-1.4\n" + b"x" * 4096
+    respx.get(remote_url).mock(return_value=Response(200, content=body, headers={"content-type": "text/html"}))
+    convert_route = respx.post(server.BASE_URL).mock(return_value=Response(200, json={"status": "ok"}))
+
+    result = await server._convert_url_impl(apiKey="k", apiSecret="s", url=remote_url, outfmt="png")
+
+    assert result == {"status": "ok"}
+    sent = json.loads(convert_route.calls[0].request.content)
+    assert sent["DocDataType"] == "pdf" and base64.b64decode(sent["DocData"]) == body
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_rejects_type_unsupported_by_tweekit_and_caches_lookup():
+    """An empty doctype answer rejects the input, and the answer is cached."""
+    doctype_route = respx.get(f"{server.BASE_URL}doctype").mock(
+        return_value=Response(200, json={"ext": "xyz", "DocType": ""})
+    )
+    convert_route = respx.post(server.BASE_URL).mock(return_value=Response(200, json={"status": "ok"}))
+    for name in ("a", "b"):
+        respx.get(f"https://example.com/{name}.xyz").mock(return_value=Response(200, content=b"data"))
+
+    first = await server._convert_url_impl(apiKey="k", apiSecret="s", url="https://example.com/a.xyz", outfmt="png")
+    second = await server._convert_url_impl(apiKey="k", apiSecret="s", url="https://example.com/b.xyz", outfmt="png")
+
+    assert first["error"] == "TweekIT cannot read 'xyz' files."
+    assert second["error"] == first["error"]
+    assert doctype_route.call_count == 1
+    assert not convert_route.called
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_doctype_lookup_uses_sniffed_type_over_misleading_path():
+    """A PDF served from download.aspx is looked up and converted as a PDF."""
+    def doctype(request):
+        supported = request.url.params["extension"] == "pdf"
+        return Response(200, json={"DocType": "pdf" if supported else ""})
+
+    doctype_route = respx.get(f"{server.BASE_URL}doctype").mock(side_effect=doctype)
+    convert_route = respx.post(server.BASE_URL).mock(return_value=Response(200, json={"status": "ok"}))
+    body = b"%PDF-1.7\n" + b"x" * 4096
+    remote_url = "https://example.com/download.aspx"
+    respx.get(remote_url).mock(return_value=Response(200, content=body, headers={"content-type": "application/octet-stream"}))
+
+    result = await server._convert_url_impl(apiKey="k", apiSecret="s", url=remote_url, outfmt="png")
+
+    assert result == {"status": "ok"}
+    assert [call.request.url.params["extension"] for call in doctype_route.calls] == ["pdf"]
+    assert json.loads(convert_route.calls[0].request.content)["DocDataType"] == "pdf"
@@ -0,0 +1,138 @@
+"""Tests for per-call deadlines and cancellation of abandoned calls."""
+import asyncio
+import json
+import socket
+from typing import Optional
+
+import pytest
+import respx
+import uvicorn
+from httpx import Response
+
+import server
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"x" * 64
+
+
+@pytest.fixture(autouse=True)
+def _fresh_state(monkeypatch):
+    monkeypatch.setattr(server, "PREFLIGHT_DOCTYPE", False)
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+
+
+def _hanging(cancelled: list, started: Optional[list] = None):
+    async def respond(request):
+        if started is not None:
+            started.append(str(request.url))
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(str(request.url))
+            raise
+        return Response(200, content=b"late", headers={"content-type": "image/webp"})
+
+    return respond
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_slow_download_stops_at_its_share_of_the_deadline():
+    """The download phase is cut off and the conversion is never started."""
+    cancelled: list = []
+    respx.get("https://example.com/slow.png").mock(side_effect=_hanging(cancelled))
+    convert_route = respx.post(server.BASE_URL).mock(return_value=Response(200, content=b"converted"))
+    server._egress_client()
+
+    result = await server._convert_url_impl(
+        apiKey="k", apiSecret="s", url="https://example.com/slow.png", outfmt="webp", timeoutMs=400
+    )
+
+    assert result["error"] == "Deadline of 400 ms exceeded during download."
+    assert cancelled == ["https://example.com/slow.png"]
+    assert convert_route.call_count == 0
+    assert server._metrics.snapshot()["counters"]["deadline_exceeded_total.download"] == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_conversion_gets_the_rest_of_the_deadline():
+    """A fast download leaves its unused share to the conversion, whose request is cancelled at the deadline."""
+    cancelled: list = []
+    respx.get("https://example.com/photo.png").mock(
+        return_value=Response(200, content=PNG, headers={"content-type": "image/png"})
+    )
+    respx.post(server.BASE_URL).mock(side_effect=_hanging(cancelled))
+    server._egress_client()  # build the client up front so TLS setup doesn't eat the download share
+
+    started = asyncio.get_running_loop().time()
+    result = await server._convert_url_impl(
+        apiKey="k", apiSecret="s", url="https://example.com/photo.png", outfmt="webp", timeoutMs=200
+    )
+
+    assert result["error"] == "Deadline of 200 ms exceeded during conversion."
+    assert cancelled == [server.BASE_URL]
+    assert asyncio.get_running_loop().time() - started >= 0.15
+    assert server._payload_budget.snapshot()["usedBytes"] == 0
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_client_disconnect_cancels_the_tool_call(monkeypatch):
+    """Closing the HTTP connection mid-call cancels the call and its upstream request."""
+    monkeypatch.setattr(server, "DISCONNECT_POLL_SECONDS", 0.02)
+    monkeypatch.setattr(server, "UPSTREAM_PREWARM_CONNECTIONS", 0)
+    cancelled: list = []
+    started: list = []
+    respx.post(server.BASE_URL).mock(side_effect=_hanging(cancelled, started))
+
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    http = uvicorn.Server(uvicorn.Config(server._worker_app(), log_level="critical", lifespan="on"))
+    serving = asyncio.create_task(http.serve(sockets=[listener]))
+    try:
+        while not http.started:
+            await asyncio.sleep(0.01)
+        body = json.dumps({
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "tools/call",
+            "params": {"name": "convert", "arguments": {"inext": "png", "outfmt": "webp", "blob": "aGVsbG8=", "apiKey": "k", "apiSecret": "s"}},
+        }).encode()
+        reader, writer = await asyncio.open_connection(*listener.getsockname())
+        writer.write(
+            b"POST /mcp HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+            b"Accept: application/json, text/event-stream\r\nContent-Length: %d\r\n\r\n" % len(body) + body
+        )
+        await writer.drain()
+        while not started:
+            await asyncio.sleep(0.01)
+        writer.close()
+
+        for _ in range(200):
+            if cancelled:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        http.should_exit = True
+        await serving
+
+    assert cancelled == [server.BASE_URL]
+    assert server._metrics.snapshot()["counters"]["tool_cancellations_total.convert"] == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_cancelled_fetch_many_cancels_its_fetches():
+    """Cancelling fetch_many does not leave its per-URL fetches running."""
+    cancelled: list = []
+    started: list = []
+    respx.get(host="slow.example").mock(side_effect=_hanging(cancelled, started))
+
+    call = asyncio.create_task(server.fetch_many.fn(urls=["https://slow.example/a", "https://slow.example/b"]))
+    while len(started) < 2:
+        await asyncio.sleep(0.01)
+    call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await call
+
+    assert sorted(cancelled) == ["https://slow.example/a", "https://slow.example/b"]
@@ -0,0 +1,95 @@
+"""Tests for fair sharing of conversion slots between API keys."""
+import asyncio
+import base64
+
+import pytest
+import respx
+from httpx import Response
+
+import server
+from fair_scheduler import FairScheduler, SchedulerTimeout, parse_weights
+
+
+async def _grant_order(scheduler, jobs):
+    """Queue `jobs` behind a held slot and return the keys in the order they are granted."""
+    order = []
+
+    async def run(key):
+        async with scheduler.slot(key):
+            order.append(key)
+            await asyncio.sleep(0)
+
+    await scheduler.acquire("holder")
+    tasks = []
+    for key in jobs:
+        tasks.append(asyncio.create_task(run(key)))
+        await asyncio.sleep(0)
+    scheduler.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_backlogged_key_takes_turns_with_a_newcomer():
+    """A key that queued late is served next, not behind another key's batch."""
+    scheduler = FairScheduler(max_concurrent=1, wait_seconds=1)
+
+    order = await _grant_order(scheduler, ["batch"] * 5 + ["interactive"])
+
+    assert order.index("interactive") <= 1
+    assert scheduler.snapshot()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_weights_scale_a_keys_share():
+    """A key with weight 2 is granted twice as often while both keys are backlogged."""
+    scheduler = FairScheduler(max_concurrent=1, wait_seconds=1, weights={"gold": 2.0})
+
+    order = await _grant_order(scheduler, ["gold"] * 6 + ["basic"] * 6)
+
+    assert order[:6].count("gold") == 4
+
+
+@pytest.mark.asyncio
+async def test_waiter_times_out_without_a_slot():
+    """A caller that isn't granted a slot within the wait limit is rejected and dequeued."""
+    scheduler = FairScheduler(max_concurrent=1, wait_seconds=0.01)
+
+    async with scheduler.slot("a"):
+        with pytest.raises(SchedulerTimeout):
+            await scheduler.acquire("b")
+
+    assert scheduler.snapshot() == {"maxConcurrent": 1, "active": 0, "waiting": 0, "waitingByKey": {}, "rejected": 1}
+    assert parse_weights("a=2, b=0, c=x,d=0.5") == {"a": 2.0, "d": 0.5}
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_convert_records_queue_wait_per_key(monkeypatch):
+    """Queue waits are reported per key under a label that hides the key."""
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+    respx.post(server.BASE_URL).mock(return_value=Response(200, content=b"out", headers={"content-type": "image/png"}))
+    blob = base64.b64encode(b"png bytes").decode("ascii")
+
+    await server.convert.fn(inext="png", outfmt="png", blob=blob, apiKey="tenant-key", apiSecret="s")
+
+    summaries = server._metrics.snapshot()["summaries"]
+    label = server._tenant_label("tenant-key")
+    assert "tenant-key" not in label
+    assert summaries[f"convert_queue_wait_ms.{label}"]["count"] == 1
+    assert summaries["convert_queue_wait_ms.interactive"]["count"] == 1
+
+
+def test_per_key_wait_series_are_capped(monkeypatch):
+    """Keys past the cap share one series instead of adding a series each."""
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+    monkeypatch.setattr(server, "_tenant_series", set())
+    monkeypatch.setattr(server, "TENANT_METRICS_MAX", 10)
+
+    for n in range(300):
+        server._record_conversion_wait("bulk", f"key-{n}", 0.001)
+
+    summaries = server._metrics.snapshot()["summaries"]
+    assert len(summaries) == 12  # the lane, 10 keys, and "other"
+    assert summaries["convert_queue_wait_ms.other"]["count"] == 290
+    assert summaries[f"convert_queue_wait_ms.{server._tenant_label('key-0')}"]["count"] == 1
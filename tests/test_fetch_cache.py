@@ -0,0 +1,105 @@
+"""Tests for the HTTP-semantics response cache behind the fetch tool."""
+import httpx
+import pytest
+import respx
+from httpx import Response
+
+import server
+from http_cache import CachedResponse, DiskCache
+
+URL = "https://example.com/article"
+
+
+def _page(**headers):
+    return Response(200, content=b"cached body", headers={"content-type": "text/plain", **headers})
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_fresh_response_is_served_from_memory():
+    """Within max-age the second call does not touch the network."""
+    route = respx.get(URL).mock(return_value=_page(**{"cache-control": "max-age=60"}))
+
+    first = await server.fetch.fn(url=URL)
+    second = await server.fetch.fn(url=URL)
+
+    assert (first["cache"], second["cache"]) == ("miss", "hit")
+    assert second["text"] == "cached body"
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_stale_response_is_revalidated_with_etag():
+    """A stale entry sends If-None-Match and a 304 keeps the stored body."""
+    route = respx.get(URL).mock(
+        side_effect=[_page(**{"cache-control": "no-cache", "etag": '"abc"'}), Response(304, headers={"etag": '"abc"'})]
+    )
+
+    await server.fetch.fn(url=URL)
+    second = await server.fetch.fn(url=URL)
+
+    assert second["cache"] == "revalidated"
+    assert second["text"] == "cached body"
+    assert route.calls[1].request.headers["if-none-match"] == '"abc"'
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_no_store_response_is_not_cached():
+    """no-store responses are fetched again every time."""
+    route = respx.get(URL).mock(return_value=_page(**{"cache-control": "no-store, max-age=60"}))
+
+    await server.fetch.fn(url=URL)
+    second = await server.fetch.fn(url=URL)
+
+    assert second["cache"] == "miss"
+    assert route.call_count == 2
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_stale_entry_stands_in_when_origin_is_unreachable():
+    """A network failure during revalidation falls back to the stale copy."""
+    respx.get(URL).mock(side_effect=[_page(**{"etag": '"abc"'}), httpx.ConnectError("down")])
+
+    await server.fetch.fn(url=URL)
+    second = await server.fetch.fn(url=URL)
+
+    assert second["cache"] == "stale"
+    assert second["text"] == "cached body"
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_disk_tier_survives_memory_eviction(monkeypatch, tmp_path):
+    """Entries written to the disk tier are found after the memory tier is cleared."""
+    monkeypatch.setattr(server, "_fetch_disk_cache", DiskCache(str(tmp_path), 1024 * 1024))
+    route = respx.get(URL).mock(return_value=_page(**{"cache-control": "max-age=60"}))
+
+    await server.fetch.fn(url=URL)
+    server._fetch_cache.clear()
+    second = await server.fetch.fn(url=URL)
+
+    assert second["cache"] == "hit"
+    assert route.call_count == 1
+
+
+def test_freshness_from_expires_and_age_headers():
+    """Expires minus Date sets the lifetime and the Age header counts against it."""
+    entry = CachedResponse.from_response(
+        URL,
+        200,
+        {
+            "date": "Mon, 19 Oct 2026 10:00:00 GMT",
+            "expires": "Mon, 19 Oct 2026 10:10:00 GMT",
+            "age": "300",
+        },
+        b"",
+        request_time=1000.0,
+        response_time=1000.0,
+    )
+
+    assert entry.freshness_lifetime() == 600
+    assert entry.is_fresh(now=1000.0 + 299)
+    assert not entry.is_fresh(now=1000.0 + 301)
@@ -0,0 +1,122 @@
+"""Tests for the fetch_many tool."""
+import asyncio
+
+import pytest
+import respx
+from httpx import Response
+
+import server
+from byte_budget import ByteBudget
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_results_follow_input_order_with_per_url_errors():
+    """Each URL gets its own result, binaries are summarised and failures stay local."""
+    respx.get("https://a.example/page").mock(
+        return_value=Response(200, text="hello", headers={"content-type": "text/plain"})
+    )
+    respx.get("https://b.example/logo.png").mock(
+        return_value=Response(200, content=b"\x89PNG" + b"x" * 10, headers={"content-type": "image/png"})
+    )
+    respx.get("https://c.example/missing").mock(return_value=Response(404))
+
+    result = await server.fetch_many.fn(
+        urls=["https://a.example/page", "https://b.example/logo.png", "https://c.example/missing", "ftp://x"]
+    )
+
+    first, second, third, fourth = result["results"]
+    assert first["text"] == "hello"
+    assert second["content_type"] == "image/png" and second["bytes"] == 14
+    assert third["url"] == "https://c.example/missing" and "404" in third["error"]
+    assert "Unsupported URL scheme" in fourth["error"]
+    assert result["completed"] == 4
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_requests_to_one_host_are_capped(monkeypatch):
+    """No more than TWEEKIT_FETCH_MANY_PER_HOST requests hit the same host at once."""
+    monkeypatch.setattr(server, "FETCH_MANY_PER_HOST", 2)
+    active = {"same.example": 0}
+    peak = {"same.example": 0}
+
+    async def slow(request):
+        host = request.url.host
+        active[host] = active.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), active[host])
+        await asyncio.sleep(0.02)
+        active[host] -= 1
+        return Response(200, text="ok", headers={"content-type": "text/plain"})
+
+    respx.get(host="same.example").mock(side_effect=slow)
+    respx.get(host="other.example").mock(side_effect=slow)
+    urls = [f"https://same.example/{i}" for i in range(6)] + [f"https://other.example/{i}" for i in range(2)]
+
+    result = await server.fetch_many.fn(urls=urls)
+
+    assert all(item["text"] == "ok" for item in result["results"])
+    assert peak["same.example"] == 2
+    assert peak["other.example"] == 2
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_deadline_reports_pending_urls():
+    """URLs still running at the deadline are cancelled and reported."""
+
+    async def stalled(request):
+        await asyncio.sleep(5)
+        return Response(200, text="late")
+
+    respx.get("https://fast.example/").mock(return_value=Response(200, text="quick", headers={"content-type": "text/plain"}))
+    respx.get("https://slow.example/").mock(side_effect=stalled)
+
+    result = await server.fetch_many.fn(urls=["https://fast.example/", "https://slow.example/"], deadline_seconds=0.1)
+
+    fast, slow = result["results"]
+    assert fast["text"] == "quick"
+    assert "Deadline" in slow["error"]
+    assert result["completed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_rejects_empty_and_oversized_url_lists(monkeypatch):
+    """Empty lists and lists above the URL cap are rejected up front."""
+    monkeypatch.setattr(server, "FETCH_MANY_MAX_URLS", 2)
+
+    empty = await server.fetch_many.fn(urls=[])
+    too_many = await server.fetch_many.fn(urls=["https://a/", "https://b/", "https://c/"])
+
+    assert "at least one" in empty["error"]
+    assert "Too many URLs" in too_many["error"]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_binaries_are_sized_without_downloading_and_text_is_budgeted(monkeypatch):
+    """A binary body is left unread and sized by a range probe; text is held against the budget."""
+    monkeypatch.setattr(server, "_payload_budget", ByteBudget(limit_bytes=64, wait_seconds=0))
+    pulled = []
+
+    async def body():
+        for _ in range(100):
+            pulled.append(1)
+            yield b"x" * 1024
+
+    def video(request):
+        if request.headers.get("range") == "bytes=0-0":
+            return Response(206, content=b"x", headers={"content-range": "bytes 0-0/102400"})
+        return Response(200, content=body(), headers={"content-type": "video/mp4"})
+
+    respx.get("https://a.example/clip.mp4").mock(side_effect=video)
+    respx.get("https://b.example/big.txt").mock(
+        return_value=Response(200, text="y" * 1000, headers={"content-type": "text/plain"})
+    )
+
+    clip, text = (await server.fetch_many.fn(urls=["https://a.example/clip.mp4", "https://b.example/big.txt"]))["results"]
+
+    assert clip["bytes"] == 102400 and clip["content_type"] == "video/mp4"
+    assert len(pulled) <= 1
+    assert text["retryable"] is True and "budget" in text["error"]
+    assert server._payload_budget.used_bytes == 0
@@ -0,0 +1,95 @@
+"""Tests for bounded streaming fetch and HTML text extraction."""
+import pytest
+import respx
+from httpx import Response
+
+import server
+from text_extract import TextStream
+
+PAGE = """<html><head><title>Ignored</title><script>var x = 1;</script></head>
+<body><h1>Release notes</h1>
+<p>Read the <a href="/docs/guide">guide</a> before <b>upgrading</b>.</p>
+<ul><li>Faster</li><li>Smaller</li></ul>
+<style>p { color: red }</style></body></html>"""
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_text_body_is_truncated_and_reading_stops_early():
+    """Reading stops once max_bytes is reached and the result is marked truncated."""
+    url = "https://example.com/huge.txt"
+    sent = []
+
+    async def body():
+        for _ in range(100):
+            sent.append(1)
+            yield b"a" * 1000
+
+    respx.get(url).mock(return_value=Response(200, content=body(), headers={"content-type": "text/plain"}))
+
+    result = await server.fetch.fn(url=url, max_bytes=2500)
+
+    assert result["truncated"] is True
+    assert result["text"] == "a" * 2500
+    assert len(sent) < 100
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_max_bytes_above_the_download_limit_is_rejected(monkeypatch):
+    """max_bytes can't lift a fetch past MAX_DOWNLOAD_BYTES; the limit itself is allowed."""
+    monkeypatch.setattr(server, "MAX_DOWNLOAD_BYTES", 5000)
+    url = "https://example.com/page.txt"
+    route = respx.get(url).mock(return_value=Response(200, content=b"a" * 100, headers={"content-type": "text/plain"}))
+
+    rejected = await server.fetch.fn(url=url, max_bytes=5001)
+    allowed = await server.fetch.fn(url=url, max_bytes=5000)
+
+    assert rejected["error"] == "max_bytes must be at most 5000."
+    assert allowed["text"] == "a" * 100 and route.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_html_markdown_extraction():
+    """Markdown mode keeps headings, lists and absolute links and drops scripts and styles."""
+    url = "https://example.com/news/index.html"
+    respx.get(url).mock(
+        return_value=Response(200, content=PAGE.encode(), headers={"content-type": "text/html; charset=utf-8"})
+    )
+
+    result = await server.fetch.fn(url=url, extract="markdown")
+
+    text = result["text"]
+    assert text.startswith("# Release notes")
+    assert "[guide](https://example.com/docs/guide)" in text
+    assert "**upgrading**" in text
+    assert "- Faster\n- Smaller" in text
+    assert "var x" not in text and "color" not in text and "Ignored" not in text
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_html_text_extraction_and_unknown_mode():
+    """Text mode returns plain readable text; unknown modes are rejected."""
+    url = "https://example.com/page"
+    respx.get(url).mock(return_value=Response(200, content=PAGE.encode(), headers={"content-type": "text/html"}))
+
+    result = await server.fetch.fn(url=url, extract="text")
+    rejected = await server.fetch.fn(url=url, extract="pdf")
+
+    assert result["text"].startswith("Release notes\n\nRead the guide before upgrading.")
+    assert "unsupported extract mode" in rejected["error"].lower()
+
+
+def test_multibyte_characters_split_across_chunks():
+    """A UTF-8 sequence split between chunks decodes intact; a cut-off tail is dropped."""
+    encoded = "naïve café".encode("utf-8")
+    stream = TextStream("text/plain; charset=utf-8")
+    for index in range(len(encoded)):
+        stream.feed(encoded[index:index + 1])
+    assert stream.finish() == "naïve café"
+
+    truncated = TextStream("text/plain")
+    truncated.feed(encoded[:-1])
+    assert truncated.finish(complete=False) == "naïve caf"
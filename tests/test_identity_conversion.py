@@ -0,0 +1,87 @@
+"""Tests for the local fast path for conversions that would return the input unchanged."""
+import base64
+
+import pytest
+import respx
+from httpx import Response
+
+import server
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"x" * 64
+JPEG = b"\xff\xd8\xff\xe0" + b"x" * 64
+
+
+@pytest.fixture(autouse=True)
+def _fresh_metrics(monkeypatch):
+    monkeypatch.setattr(server, "PREFLIGHT_DOCTYPE", False)
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+
+
+def _blob(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_same_format_without_options_skips_tweekit():
+    """PNG to PNG and JPEG to JPG (an alias) return the input without an upstream call."""
+    convert_route = respx.post(server.BASE_URL).mock(return_value=Response(500))
+
+    png = await server.convert.fn(inext="PNG", outfmt="png", blob=_blob(PNG), apiKey="k", apiSecret="s")
+    jpeg = await server.convert.fn(inext="jpeg", outfmt="jpg", blob=_blob(JPEG), apiKey="k", apiSecret="s")
+
+    assert png.data == PNG and png._mime_type == "image/png"
+    assert jpeg.data == JPEG and jpeg._mime_type == "image/jpeg"
+    assert convert_route.call_count == 0
+    counters = server._metrics.snapshot()["counters"]
+    assert counters["convert_identity_total.png"] == counters["convert_identity_total.jpg"] == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_options_or_mislabelled_input_still_convert():
+    """Any geometry option, a non-default page or bytes of another format go upstream."""
+    convert_route = respx.post(server.BASE_URL).mock(
+        return_value=Response(200, content=b"converted", headers={"content-type": "image/png"})
+    )
+
+    resized = await server.convert.fn(inext="png", outfmt="png", blob=_blob(PNG), width=32, apiKey="k", apiSecret="s")
+    paged = await server.convert.fn(inext="png", outfmt="png", blob=_blob(PNG), page=2, apiKey="k", apiSecret="s")
+    mislabelled = await server.convert.fn(inext="png", outfmt="png", blob=_blob(JPEG), apiKey="k", apiSecret="s")
+
+    assert resized.data == paged.data == mislabelled.data == b"converted"
+    assert convert_route.call_count == 3
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_pdf_is_only_an_identity_with_no_rasterize():
+    """PDF to PDF renders the first page unless noRasterize asks for the whole document."""
+    pdf = b"%PDF-1.7\n" + b"x" * 64
+    convert_route = respx.post(server.BASE_URL).mock(
+        return_value=Response(200, content=b"%PDF-rendered", headers={"content-type": "application/pdf"})
+    )
+
+    rendered = await server.convert.fn(inext="pdf", outfmt="pdf", blob=_blob(pdf), apiKey="k", apiSecret="s")
+    untouched = await server.convert.fn(inext="pdf", outfmt="pdf", blob=_blob(pdf), noRasterize=True, apiKey="k", apiSecret="s")
+
+    assert rendered.data == b"%PDF-rendered"
+    assert untouched.data == pdf
+    assert convert_route.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_convert_url_returns_identity_downloads_without_encoding(monkeypatch):
+    """A downloaded PNG requested as PNG is returned before it is base64 encoded."""
+    monkeypatch.setattr(server, "OFFLOAD_THRESHOLD_BYTES", 0)
+    respx.get("https://example.com/photo.png").mock(
+        return_value=Response(200, content=PNG, headers={"content-type": "image/png"})
+    )
+    convert_route = respx.post(server.BASE_URL).mock(return_value=Response(500))
+
+    result = await server._convert_url_impl(apiKey="k", apiSecret="s", url="https://example.com/photo.png", outfmt="png")
+
+    assert result.data == PNG
+    assert convert_route.call_count == 0
+    assert "offload_calls_total" not in server._metrics.snapshot()["counters"]
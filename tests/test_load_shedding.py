@@ -0,0 +1,60 @@
+"""Tests for the event-loop lag sampler and load shedding."""
+import asyncio
+import time
+
+import pytest
+
+import server
+
+
+@pytest.mark.asyncio
+async def test_lag_sampler_records_blocked_loop(monkeypatch):
+    """Blocking the loop shows up as lag in the exported percentiles."""
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+    monkeypatch.setattr(server, "LAG_SAMPLE_INTERVAL_SECONDS", 0.01)
+    monkeypatch.setattr(server, "_loop_lag_ms", 0.0)
+
+    task = asyncio.create_task(server._sample_loop_lag())
+    await asyncio.sleep(0.02)
+    time.sleep(0.1)
+    await asyncio.sleep(0.03)
+    task.cancel()
+
+    summary = server._metrics.summary("event_loop_lag_ms")
+    assert summary["count"] >= 1
+    assert summary["max"] >= 50
+    assert server._loop_lag_ms > 0
+
+
+@pytest.mark.asyncio
+async def test_convert_sheds_when_in_flight_limit_reached(monkeypatch):
+    """New conversions are rejected quickly once the in-flight cap is hit."""
+    monkeypatch.setattr(server, "SHED_MAX_IN_FLIGHT", 2)
+    monkeypatch.setattr(server, "_in_flight", 2)
+
+    result = await server.convert.fn(inext="png", outfmt="png", blob="", apiKey="k", apiSecret="s")
+
+    assert result["retryable"] is True
+    assert "overloaded" in result["error"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_sheds_when_loop_lag_is_high(monkeypatch):
+    """Smoothed loop lag above the threshold rejects fetch calls."""
+    monkeypatch.setattr(server, "SHED_LAG_MS", 200.0)
+    monkeypatch.setattr(server, "_loop_lag_ms", 450.0)
+
+    result = await server.fetch.fn(url="https://example.com/")
+
+    assert "overloaded" in result["error"]
+    assert "450" in result["details"]
+
+
+def test_shedding_disabled_by_default(monkeypatch):
+    """With zero thresholds nothing is rejected regardless of load."""
+    monkeypatch.setattr(server, "SHED_LAG_MS", 0.0)
+    monkeypatch.setattr(server, "SHED_MAX_IN_FLIGHT", 0)
+    monkeypatch.setattr(server, "_loop_lag_ms", 10_000.0)
+    monkeypatch.setattr(server, "_in_flight", 10_000)
+
+    assert server._overload_error("convert_url") is None
@@ -0,0 +1,88 @@
+"""Tests for moving large base64/JSON work off the event loop."""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+
+import pytest
+import respx
+from httpx import Response
+
+import server
+
+
+async def _max_loop_gap(size, fn, *args):
+    """Run ``fn`` through ``_offload`` and return (longest ticker gap, elapsed seconds)."""
+    gaps = []
+    done = False
+
+    async def tick():
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    ticker = asyncio.create_task(tick())
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    await server._offload(size, fn, *args)
+    elapsed = time.perf_counter() - started
+    done = True
+    await ticker
+    return max(gaps), elapsed
+
+
+@pytest.mark.asyncio
+async def test_large_payload_keeps_the_event_loop_responsive(monkeypatch):
+    """A ticker keeps running while a large payload is JSON encoded and base64 decoded."""
+    monkeypatch.setattr(server, "OFFLOAD_THRESHOLD_BYTES", 1024)
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+    blob = base64.b64encode(os.urandom(16 * 1024 * 1024)).decode("ascii")
+
+    for fn, arg in ((server._encode_json, {"Fmt": "png", "DocData": blob}), (server._b64decode, blob)):
+        gap, elapsed = await _max_loop_gap(len(blob), fn, arg)
+        assert gap < elapsed / 3, fn.__name__
+
+    assert server._metrics.snapshot()["counters"]["offload_calls_total"] == 2
+
+
+def test_chunked_codecs_match_the_one_shot_encoders(monkeypatch):
+    """Chunked encoding and decoding agree with the stdlib across chunk boundaries."""
+    monkeypatch.setattr(server, "OFFLOAD_CHUNK_BYTES", 12)
+    data = os.urandom(100)
+    text = base64.b64encode(data).decode("ascii")
+    payload = {"Fmt": "png", "DocData": "caf\u00e9 \"quoted\" " * 5, "Width": 0}
+
+    assert server._b64encode(data) == text
+    assert server._b64decode(text) == data
+    assert server._b64decode(text[:7] + "\n " + text[7:]) == data
+    assert server._b64decode(text[:-1]) is None
+    assert server._encode_json(payload) == json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    assert server._digest_text(text) == hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_convert_url_offloads_encoding(monkeypatch):
+    """Offloaded encoding produces the same DocData and a JSON request body."""
+    monkeypatch.setattr(server, "OFFLOAD_THRESHOLD_BYTES", 0)
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+    remote_url = "https://example.com/large.png"
+    payload_bytes = b"\x89PNG" + b"x" * 4096
+
+    respx.get(remote_url).mock(return_value=Response(200, content=payload_bytes))
+    convert_route = respx.post(server.BASE_URL).mock(return_value=Response(200, json={"status": "ok"}))
+
+    result = await server._convert_url_impl(apiKey="key", apiSecret="secret", url=remote_url, outfmt="png")
+
+    assert result == {"status": "ok"}
+    request = convert_route.calls[0].request
+    assert request.headers["content-type"] == "application/json"
+    sent_json = json.loads(request.content.decode())
+    assert sent_json["DocData"] == base64.b64encode(payload_bytes).decode("ascii")
+    # base64 encode of the download, its result-cache digest and the JSON request body
+    assert server._metrics.snapshot()["counters"]["offload_calls_total"] == 3
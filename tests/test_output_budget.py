@@ -0,0 +1,130 @@
+"""Tests for fitting image outputs to maxBytes/maxPixels."""
+import base64
+import io
+import json
+import os
+import struct
+
+import pytest
+import respx
+from httpx import Response
+
+import raster_engine
+import server
+
+
+def _png_header(width: int, height: int, size: int) -> bytes:
+    """Bytes that look like a PNG of the given dimensions, padded to `size`."""
+    header = b"\x89PNG\r\n\x1a\n" + b"\x00\x00\x00\x0dIHDR" + struct.pack(">II", width, height)
+    return header + b"\x00" * (size - len(header))
+
+
+def _webp_header(width: int, height: int, size: int) -> bytes:
+    header = b"RIFF\x00\x00\x00\x00WEBPVP8X" + b"\x00" * 8 + (width - 1).to_bytes(3, "little") + (height - 1).to_bytes(3, "little")
+    return header + b"\x00" * (size - len(header))
+
+
+def _sent(route, index):
+    return json.loads(route.calls[index].request.content)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_metrics(monkeypatch):
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+
+
+BLOB = base64.b64encode(b"%PDF-1.4 document").decode("ascii")
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_upstream_retries_switch_format_then_shrink(monkeypatch):
+    """Without Pillow an oversized PNG is retried as WebP, then at a smaller width."""
+    monkeypatch.setattr(raster_engine, "available", lambda: False)
+    route = respx.post(server.BASE_URL).mock(side_effect=[
+        Response(200, content=_png_header(1000, 800, 40_000), headers={"content-type": "image/png"}),
+        Response(200, content=_webp_header(1000, 800, 20_000), headers={"content-type": "image/webp"}),
+        Response(200, content=_webp_header(500, 400, 6_000), headers={"content-type": "image/webp"}),
+    ])
+
+    result = await server.convert.fn(inext="pdf", outfmt="png", blob=BLOB, maxBytes=8_000, apiKey="k", apiSecret="s")
+
+    assert len(result.data) == 6_000
+    assert [_sent(route, i)["Fmt"] for i in range(3)] == ["png", "webp", "webp"]
+    assert _sent(route, 2)["Width"] < 1000 and _sent(route, 2)["Height"] == 0
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_fixed_size_is_scaled_to_max_pixels_up_front(monkeypatch):
+    """A requested width and height over maxPixels are reduced before the first call."""
+    monkeypatch.setattr(raster_engine, "available", lambda: False)
+    route = respx.post(server.BASE_URL).mock(
+        return_value=Response(200, content=_png_header(1000, 500, 100), headers={"content-type": "image/png"})
+    )
+
+    await server.convert.fn(inext="pdf", outfmt="png", blob=BLOB, width=2000, height=1000, maxPixels=500_000, apiKey="k", apiSecret="s")
+
+    assert route.call_count == 1
+    assert (_sent(route, 0)["Width"], _sent(route, 0)["Height"]) == (1000, 500)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_pillow_refits_the_first_result_locally():
+    """With Pillow the first upstream result is re-encoded locally; TweekIT is called once."""
+    Image = pytest.importorskip("PIL.Image")
+    noisy = io.BytesIO()
+    Image.frombytes("RGB", (300, 300), os.urandom(300 * 300 * 3)).save(noisy, format="PNG")
+    route = respx.post(server.BASE_URL).mock(
+        return_value=Response(200, content=noisy.getvalue(), headers={"content-type": "image/png"})
+    )
+
+    result = await server.convert.fn(
+        inext="pdf", outfmt="png", blob=BLOB, maxBytes=20_000, maxPixels=40_000, apiKey="k", apiSecret="s"
+    )
+
+    width, height = Image.open(io.BytesIO(result.data)).size
+    assert len(result.data) <= 20_000 and width * height <= 40_000
+    assert route.call_count == 1
+    assert server._metrics.snapshot()["counters"]["budget_fit_total.local"] == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_unfittable_output_is_an_error_and_documents_pass_through(monkeypatch):
+    """Attempts stop at TWEEKIT_BUDGET_MAX_ATTEMPTS; non-image results are returned as they are."""
+    monkeypatch.setattr(raster_engine, "available", lambda: False)
+    monkeypatch.setattr(server, "BUDGET_MAX_ATTEMPTS", 2)
+    respx.post(server.BASE_URL).mock(
+        return_value=Response(200, content=_webp_header(1000, 800, 50_000), headers={"content-type": "image/webp"})
+    )
+
+    result = await server.convert.fn(inext="pdf", outfmt="webp", blob=BLOB, maxBytes=1_000, apiKey="k", apiSecret="s")
+
+    assert "maxBytes" in result["error"]
+    assert server._metrics.snapshot()["counters"]["budget_fit_failed_total"] == 1
+
+    respx.post(server.BASE_URL).mock(
+        return_value=Response(200, content=b"%PDF-" + b"x" * 5_000, headers={"content-type": "application/pdf"})
+    )
+    document = await server.convert.fn(inext="docx", outfmt="pdf", blob=BLOB, maxBytes=1_000, apiKey="k", apiSecret="s")
+    assert document.data.startswith(b"%PDF-")
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_zero_max_attempts_still_checks_the_first_result(monkeypatch):
+    """TWEEKIT_BUDGET_MAX_ATTEMPTS below 1 behaves as a single attempt."""
+    monkeypatch.setattr(raster_engine, "available", lambda: False)
+    monkeypatch.setattr(server, "BUDGET_MAX_ATTEMPTS", 0)
+    route = respx.post(server.BASE_URL).mock(side_effect=[
+        Response(200, content=_png_header(1000, 800, 40_000), headers={"content-type": "image/png"}),
+        Response(200, json={"status": "not an image"}),
+    ])
+
+    oversized = await server.convert.fn(inext="pdf", outfmt="png", blob=BLOB, maxBytes=8_000, apiKey="k", apiSecret="s")
+    document = await server.convert.fn(inext="pdf", outfmt="png", blob=BLOB, width=10, maxBytes=8_000, apiKey="k", apiSecret="s")
+
+    assert "Could not fit" in oversized["error"] and route.call_count == 2
+    assert document == {"status": "not an image"}
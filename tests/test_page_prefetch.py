@@ -0,0 +1,115 @@
+"""Tests for speculative prefetch of the pages after a converted one."""
+import asyncio
+import base64
+import json
+
+import pytest
+import respx
+from httpx import Response
+
+import server
+
+BLOB = base64.b64encode(b"%PDF-1.4 document").decode("ascii")
+
+
+@pytest.fixture(autouse=True)
+def _prefetch_on(monkeypatch):
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+    monkeypatch.setattr(server, "PREFETCH_PAGES", 2)
+    monkeypatch.setattr(server, "PREFETCH_CONCURRENCY", 2)
+    monkeypatch.setattr(server, "_prefetched", server.OrderedDict())
+    server._result_cache.clear()
+
+
+def _pages(last_page: int = 10, gate: asyncio.Event = None):
+    """Render each page as a tiny PNG; pages past `last_page` are errors."""
+    async def respond(request):
+        page = json.loads(request.content)["Page"]
+        if gate is not None and page > 1:
+            await gate.wait()
+        if page > last_page:
+            return Response(400, json={"error": "Page out of range"})
+        return Response(200, content=b"\x89PNG\r\n\x1a\n" + bytes([page]), headers={"content-type": "image/png"})
+    return respond
+
+
+def _requested_pages(route):
+    return sorted(json.loads(call.request.content)["Page"] for call in route.calls)
+
+
+async def _settle():
+    while server._prefetch_tasks:
+        await asyncio.gather(*list(server._prefetch_tasks))
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_sequential_walk_hits_prefetched_pages():
+    """Page 1 prefetches pages 2-3; asking for page 2 is a cache hit that extends the window."""
+    route = respx.post(server.BASE_URL).mock(side_effect=_pages())
+
+    await server.convert.fn(inext="docx", outfmt="png", blob=BLOB, page=1, apiKey="k", apiSecret="s")
+    await _settle()
+    assert _requested_pages(route) == [1, 2, 3]
+
+    second = await server.convert.fn(inext="docx", outfmt="png", blob=BLOB, page=2, apiKey="k", apiSecret="s")
+    await _settle()
+
+    assert second.data.endswith(b"\x02")
+    assert _requested_pages(route) == [1, 2, 3, 4]
+    counters = server._metrics.snapshot()["counters"]
+    assert counters["prefetch_pages_total"] == 3 and counters["prefetch_hits_total"] == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_prefetch_stops_after_the_last_page():
+    """A failing page ends the walk instead of requesting the pages after it."""
+    route = respx.post(server.BASE_URL).mock(side_effect=_pages(last_page=2))
+    server.PREFETCH_PAGES = 4
+
+    await server.convert.fn(inext="pdf", outfmt="png", blob=BLOB, page=1, apiKey="k", apiSecret="s")
+    await _settle()
+
+    assert _requested_pages(route) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_single_images_and_budget_limits_skip_prefetch(monkeypatch):
+    """Raster inputs, oversized inputs and a full prefetch pool convert only the requested page."""
+    route = respx.post(server.BASE_URL).mock(side_effect=_pages())
+    png = base64.b64encode(b"\x89PNG\r\n\x1a\n" + b"\x00" * 64).decode("ascii")
+
+    await server.convert.fn(inext="png", outfmt="jpg", blob=png, apiKey="k", apiSecret="s")
+    monkeypatch.setattr(server, "PREFETCH_MAX_BYTES", 4)
+    await server.convert.fn(inext="pdf", outfmt="png", blob=BLOB, page=5, apiKey="k", apiSecret="s")
+    monkeypatch.setattr(server, "PREFETCH_MAX_BYTES", 1024)
+    monkeypatch.setattr(server, "PREFETCH_CONCURRENCY", 0)
+    await server.convert.fn(inext="pdf", outfmt="png", blob=BLOB, page=7, apiKey="k", apiSecret="s")
+    await _settle()
+
+    assert route.call_count == 3
+    counters = server._metrics.snapshot()["counters"]
+    assert counters["prefetch_skipped_total.size"] == 1 and counters["prefetch_skipped_total.concurrency"] == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_request_for_a_page_being_prefetched_waits_for_it():
+    """A request arriving mid-prefetch joins it rather than converting the page again."""
+    gate = asyncio.Event()
+    route = respx.post(server.BASE_URL).mock(side_effect=_pages(gate=gate))
+    server.PREFETCH_PAGES = 1
+
+    await server.convert.fn(inext="pdf", outfmt="png", blob=BLOB, page=1, apiKey="k", apiSecret="s")
+    while not server._prefetch_inflight:
+        await asyncio.sleep(0.01)
+    second = asyncio.create_task(server.convert.fn(inext="pdf", outfmt="png", blob=BLOB, page=2, apiKey="k", apiSecret="s"))
+    await asyncio.sleep(0.05)
+    gate.set()
+
+    assert (await second).data.endswith(b"\x02")
+    await _settle()
+    assert _requested_pages(route) == [1, 2, 3]
+    assert server._metrics.snapshot()["counters"]["prefetch_joined_total"] == 1
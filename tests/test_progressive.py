@@ -0,0 +1,145 @@
+"""Tests for progressive preview-then-full conversions."""
+import asyncio
+import base64
+import json
+
+import pytest
+import respx
+from httpx import Response
+
+import server
+
+BLOB = base64.b64encode(b"%PDF-1.4 document").decode("ascii")
+
+
+@pytest.fixture(autouse=True)
+def _fresh_state(monkeypatch):
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+    monkeypatch.setattr(server, "_artifacts", server._Artifacts(1024 * 1024, 60))
+    monkeypatch.setattr(server, "PREVIEW_WIDTH", 100)
+    server._result_cache.clear()
+
+
+def _gated(release: asyncio.Event):
+    """Answer preview-sized requests at once and hold larger ones until `release` is set."""
+    async def respond(request):
+        width = json.loads(request.content)["Width"]
+        if width > 100:
+            await release.wait()
+        return Response(200, content=b"\x89PNG\r\n\x1a\n" + bytes([width % 256]) * width, headers={"content-type": "image/png"})
+    return respond
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_preview_first_then_full_through_get_artifact():
+    """The call returns a preview and an artifactId; get_artifact delivers the full render."""
+    release = asyncio.Event()
+    route = respx.post(server.BASE_URL).mock(side_effect=_gated(release))
+
+    preview, summary = await server.convert.fn(
+        inext="pdf", outfmt="png", blob=BLOB, width=800, height=400, progressive=True, apiKey="k", apiSecret="s"
+    )
+
+    assert (summary["previewWidth"], summary["previewHeight"], summary["status"]) == (100, 50, "pending")
+    assert len(preview.data) == 8 + 100
+    pending = await server.get_artifact.fn(artifactId=summary["artifactId"], apiKey="k", apiSecret="s")
+    assert pending == {"artifactId": summary["artifactId"], "status": "pending"}
+
+    release.set()
+    full = await server.get_artifact.fn(artifactId=summary["artifactId"], waitMs=5000, apiKey="k", apiSecret="s")
+    assert len(full.data) == 8 + 800
+    assert sorted(json.loads(call.request.content)["Width"] for call in route.calls) == [100, 800]
+    assert server._metrics.snapshot()["counters"]["artifacts_delivered_total"] == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_small_requests_and_documents_are_rendered_once():
+    """Sizes within the preview width and non-image outputs skip the preview."""
+    route = respx.post(server.BASE_URL).mock(side_effect=_gated(asyncio.Event()))
+
+    small = await server.convert.fn(inext="pdf", outfmt="png", blob=BLOB, width=80, progressive=True, apiKey="k", apiSecret="s")
+    assert len(small.data) == 8 + 80
+
+    respx.post(server.BASE_URL).mock(
+        return_value=Response(200, content=b"%PDF-1.7", headers={"content-type": "application/pdf"})
+    )
+    document = await server.convert.fn(inext="docx", outfmt="pdf", blob=BLOB, progressive=True, apiKey="k", apiSecret="s")
+    assert document.data == b"%PDF-1.7"
+    assert route.call_count == 2 and len(server._artifacts) == 0
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_artifacts_belong_to_their_api_key():
+    """Another API key, or an unknown id, gets an error instead of the render."""
+    release = asyncio.Event()
+    respx.post(server.BASE_URL).mock(side_effect=_gated(release))
+    _, summary = await server.convert.fn(
+        inext="pdf", outfmt="png", blob=BLOB, width=400, progressive=True, apiKey="k", apiSecret="s"
+    )
+    release.set()
+    await server.get_artifact.fn(artifactId=summary["artifactId"], waitMs=5000, apiKey="k", apiSecret="s")
+
+    other = await server.get_artifact.fn(artifactId=summary["artifactId"], apiKey="other", apiSecret="s")
+    unknown = await server.get_artifact.fn(artifactId="missing", apiKey="k", apiSecret="s")
+
+    assert other["error"] == unknown["error"] == "Unknown or expired artifact."
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_failed_full_render_is_delivered_as_an_error():
+    """An upstream error in the background render is what get_artifact returns."""
+    release = asyncio.Event()
+    preview_only = _gated(release)
+
+    async def respond(request):
+        if json.loads(request.content)["Width"] > 100:
+            await release.wait()
+            return Response(500, text="render failed")
+        return await preview_only(request)
+
+    respx.post(server.BASE_URL).mock(side_effect=respond)
+    _, summary = await server.convert.fn(
+        inext="pdf", outfmt="webp", blob=BLOB, width=1000, progressive=True, apiKey="k", apiSecret="s"
+    )
+    release.set()
+
+    result = await server.get_artifact.fn(artifactId=summary["artifactId"], waitMs=5000, apiKey="k", apiSecret="s")
+
+    assert result["error"] == "HTTP 500 from TweekIT"
+
+
+@pytest.mark.asyncio
+async def test_list_results_are_sized_by_their_images():
+    """An [Image, summary] artifact counts the image bytes, so it is evicted by size."""
+    artifacts = server._Artifacts(4096, 60)
+    first = await artifacts.put("k", [server.Image(data=b"x" * 3000, format="png"), {"status": "ok"}])
+    second = await artifacts.put("k", [server.Image(data=b"y" * 3000, format="png"), {"status": "ok"}])
+
+    assert await artifacts.get("k", first, 0) == (False, None)
+    found, result = await artifacts.get("k", second, 0)
+    assert found and len(result[0].data) == 3000
+
+
+@pytest.mark.asyncio
+async def test_another_worker_serves_artifacts_from_the_shared_directory(tmp_path):
+    """A second worker on the same directory reports the render as pending, then delivers it."""
+    release = asyncio.Event()
+
+    async def render():
+        await release.wait()
+        return [server.Image(data=b"\x89PNG full render", format="png"), {"page": 2}]
+
+    rendering = server._Artifacts(1024 * 1024, 60, str(tmp_path))
+    other = server._Artifacts(1024 * 1024, 60, str(tmp_path))
+    artifact_id = rendering.start("k", asyncio.ensure_future(render()))
+
+    assert await other.get("k", artifact_id, 0) == (True, None)
+    release.set()
+    found, (image, summary) = await other.get("k", artifact_id, 5)
+    assert found and image.data == b"\x89PNG full render" and image._mime_type == "image/png"
+    assert summary == {"page": 2}
+    assert await server._Artifacts(1024 * 1024, 60, str(tmp_path)).get("someone-else", artifact_id, 0) == (False, None)
@@ -0,0 +1,111 @@
+"""Tests for parallel ranged downloads in convert_url."""
+import base64
+import json
+import re
+
+import httpx
+import pytest
+import respx
+from httpx import Response
+
+import server
+
+PAYLOAD = bytes(range(256)) * 40  # 10240 bytes
+REMOTE_URL = "https://bucket.example.com/large.tiff"
+RANGE_HEADERS = {"accept-ranges": "bytes", "etag": '"v1"', "content-type": "image/tiff"}
+
+
+@pytest.fixture(autouse=True)
+def _small_ranged_threshold(monkeypatch):
+    monkeypatch.setattr(server, "RANGED_DOWNLOAD_MIN_BYTES", 1024)
+    monkeypatch.setattr(server, "RANGED_DOWNLOAD_PARTS", 4)
+    monkeypatch.setattr(server, "PREFLIGHT_DOCTYPE", False)
+
+
+def _range_of(request):
+    match = re.fullmatch(r"bytes=(\d+)-(\d+)", request.headers.get("range", ""))
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def _sent_docdata(route) -> bytes:
+    return base64.b64decode(json.loads(route.calls[0].request.content)["DocData"])
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_large_object_is_fetched_in_parallel_ranges():
+    """An origin advertising byte ranges is downloaded as several 206 parts."""
+    seen_ranges = []
+
+    def origin(request):
+        requested = _range_of(request)
+        if requested is None:
+            return Response(200, content=PAYLOAD, headers=RANGE_HEADERS)
+        assert request.headers["if-range"] == '"v1"'
+        seen_ranges.append(requested)
+        start, end = requested
+        return Response(206, content=PAYLOAD[start:end + 1], headers=RANGE_HEADERS)
+
+    respx.get(REMOTE_URL).mock(side_effect=origin)
+    convert_route = respx.post(server.BASE_URL).mock(return_value=Response(200, json={"status": "ok"}))
+
+    result = await server._convert_url_impl(apiKey="k", apiSecret="s", url=REMOTE_URL, outfmt="png")
+
+    assert result == {"status": "ok"}
+    assert sorted(seen_ranges) == [(0, 2559), (2560, 5119), (5120, 7679), (7680, 10239)]
+    assert _sent_docdata(convert_route) == PAYLOAD
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_interrupted_part_resumes_from_last_byte():
+    """A part that drops mid-stream is resumed instead of restarted."""
+    seen_ranges = []
+
+    def origin(request):
+        requested = _range_of(request)
+        if requested is None:
+            return Response(200, content=PAYLOAD, headers=RANGE_HEADERS)
+        seen_ranges.append(requested)
+        start, end = requested
+        if requested == (0, 2559):
+            async def flaky():
+                yield PAYLOAD[0:1000]
+                raise httpx.ReadError("connection reset")
+            return Response(206, content=flaky(), headers=RANGE_HEADERS)
+        return Response(206, content=PAYLOAD[start:end + 1], headers=RANGE_HEADERS)
+
+    respx.get(REMOTE_URL).mock(side_effect=origin)
+    convert_route = respx.post(server.BASE_URL).mock(return_value=Response(200, json={"status": "ok"}))
+
+    await server._convert_url_impl(apiKey="k", apiSecret="s", url=REMOTE_URL, outfmt="png")
+
+    assert (1000, 2559) in seen_ranges
+    assert _sent_docdata(convert_route) == PAYLOAD
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_falls_back_to_single_stream_when_ranges_ignored():
+    """An origin that answers range requests with 200 gets one plain download."""
+    respx.get(REMOTE_URL).mock(return_value=Response(200, content=PAYLOAD, headers=RANGE_HEADERS))
+    convert_route = respx.post(server.BASE_URL).mock(return_value=Response(200, json={"status": "ok"}))
+
+    result = await server._convert_url_impl(apiKey="k", apiSecret="s", url=REMOTE_URL, outfmt="png")
+
+    assert result == {"status": "ok"}
+    assert _sent_docdata(convert_route) == PAYLOAD
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_small_or_unranged_objects_use_single_stream():
+    """Origins without Accept-Ranges are read from the initial response only."""
+    fetch_route = respx.get(REMOTE_URL).mock(
+        return_value=Response(200, content=PAYLOAD, headers={"content-type": "image/tiff"})
+    )
+    respx.post(server.BASE_URL).mock(return_value=Response(200, json={"status": "ok"}))
+
+    await server._convert_url_impl(apiKey="k", apiSecret="s", url=REMOTE_URL, outfmt="png")
+
+    assert fetch_route.call_count == 1
@@ -0,0 +1,88 @@
+"""Tests for the optional local raster engine."""
+import base64
+import io
+
+import pytest
+import respx
+from httpx import Response
+
+import raster_engine
+import server
+
+Image = pytest.importorskip("PIL.Image")
+
+DEFAULTS = {"noRasterize": False, "width": 0, "height": 0, "x1": 0, "y1": 0, "x2": 0, "y2": 0, "page": 1, "alpha": True, "bgColor": ""}
+
+
+def _png(size=(40, 20), color=(255, 0, 0, 128)) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGBA", size, color).save(output, format="PNG")
+    return output.getvalue()
+
+
+def _options(**overrides):
+    return {**DEFAULTS, **overrides}
+
+
+def test_supports_only_plain_raster_work():
+    """Image-to-image conversions are local; documents, pages and partial crop boxes are not."""
+    assert raster_engine.supports("png", "jpg", _options(width=100))
+    assert raster_engine.supports("webp", "png", _options(x1=-5, y1=0, x2=10, y2=10))
+    assert not raster_engine.supports("pdf", "png", _options())
+    assert not raster_engine.supports("png", "gif", _options())
+    assert not raster_engine.supports("png", "png", _options(page=2))
+    assert not raster_engine.supports("png", "png", _options(x1=5))
+
+
+def test_render_crops_resizes_and_flattens():
+    """The crop box pads with bgColor, one dimension keeps the aspect and JPEG drops alpha."""
+    padded, content_type = raster_engine.render(
+        _png(), "png", "png", _options(x1=-10, y1=0, x2=40, y2=20, bgColor="#00ff00"), 10_000
+    )
+    image = Image.open(io.BytesIO(padded))
+    assert content_type == "image/png" and image.size == (50, 20)
+    assert image.getpixel((0, 0)) == (0, 255, 0, 255)
+
+    resized, content_type = raster_engine.render(_png(), "png", "jpg", _options(width=20, bgColor="0000ff"), 10_000)
+    image = Image.open(io.BytesIO(resized))
+    assert content_type == "image/jpeg" and image.size == (20, 10) and image.mode == "RGB"
+    red, green, blue = image.getpixel((10, 5))
+    assert red > 100 and blue > 100 and green < 30
+
+    with pytest.raises(raster_engine.RasterError):
+        raster_engine.render(_png(), "png", "png", _options(), 100)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_convert_renders_locally_when_enabled(monkeypatch):
+    """With TWEEKIT_LOCAL_RASTER on, a PNG resize never reaches TweekIT."""
+    monkeypatch.setattr(server, "LOCAL_RASTER", True)
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+    convert_route = respx.post(server.BASE_URL).mock(return_value=Response(500))
+    blob = base64.b64encode(_png()).decode("ascii")
+
+    result = await server.convert.fn(inext="png", outfmt="webp", blob=blob, width=10, apiKey="k", apiSecret="s")
+
+    assert Image.open(io.BytesIO(result.data)).size == (10, 5)
+    assert convert_route.call_count == 0
+    assert server._metrics.snapshot()["counters"]["raster_local_total.webp"] == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_unreadable_input_falls_back_to_tweekit(monkeypatch):
+    """A payload Pillow can't decode is converted upstream instead."""
+    monkeypatch.setattr(server, "LOCAL_RASTER", True)
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+    convert_route = respx.post(server.BASE_URL).mock(
+        return_value=Response(200, content=b"converted", headers={"content-type": "image/jpeg"})
+    )
+    truncated = _png()[:40]
+    blob = base64.b64encode(truncated).decode("ascii")
+
+    result = await server.convert.fn(inext="png", outfmt="jpg", blob=blob, apiKey="k", apiSecret="s")
+
+    assert result.data == b"converted"
+    assert convert_route.call_count == 1
+    assert server._metrics.snapshot()["counters"]["raster_local_fallback_total"] == 1
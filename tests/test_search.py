@@ -0,0 +1,80 @@
+"""Tests for the search tool's result parser, cache and request coalescing."""
+import asyncio
+from pathlib import Path
+
+import pytest
+import respx
+from httpx import Response
+
+import server
+from search_results import SearchResultParser
+
+PAGE = (Path(__file__).parent / "assets" / "duckduckgo_results.html").read_text(encoding="utf-8")
+SEARCH_URL = "https://html.duckduckgo.com/html/"
+
+
+def _parse(chunk_size: int, limit: int = 10):
+    parser = SearchResultParser(limit)
+    for offset in range(0, len(PAGE), chunk_size):
+        parser.feed(PAGE[offset:offset + chunk_size])
+    return parser.finish()
+
+
+def test_parser_extracts_results_regardless_of_chunking():
+    """Titles, links and snippets come out unescaped and identical for any chunk size."""
+    results = _parse(len(PAGE))
+
+    assert results == _parse(7) == _parse(512)
+    assert len(results) == 10
+    assert results[1] == {
+        "title": "TweekIT - Convert any file for AI workflows",
+        "url": "//duckduckgo.com/l/?uddg=https%3A%2F%2Fwww.tweekit.io%2F&rut=abc123",
+        "snippet": "Convert and optimize almost any file on-demand for AI workflows & websites.",
+    }
+    assert _parse(len(PAGE), limit=3) == results[:3]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_repeat_query_is_served_from_cache():
+    """A repeated query within the TTL does not hit DuckDuckGo again, whatever max_results asks for."""
+    route = respx.get(SEARCH_URL).mock(return_value=Response(200, text=PAGE))
+
+    first = await server.search.fn(query="file conversion", max_results=2)
+    second = await server.search.fn(query="file conversion", max_results=5)
+
+    assert len(first["results"]) == 2
+    assert second["results"][:2] == first["results"]
+    assert len(second["results"]) == 5
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_concurrent_identical_queries_share_one_request():
+    """Identical in-flight queries are coalesced onto a single upstream request."""
+
+    async def slow(request):
+        await asyncio.sleep(0.05)
+        return Response(200, text=PAGE)
+
+    route = respx.get(SEARCH_URL).mock(side_effect=slow)
+
+    results = await asyncio.gather(*(server.search.fn(query="pdf tools") for _ in range(5)))
+
+    assert route.call_count == 1
+    assert all(result == results[0] for result in results)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_errors_are_not_cached():
+    """A failed search is retried on the next call."""
+    route = respx.get(SEARCH_URL).mock(side_effect=[Response(503), Response(200, text=PAGE)])
+
+    failed = await server.search.fn(query="heic")
+    recovered = await server.search.fn(query="heic")
+
+    assert "503" in failed["error"]
+    assert len(recovered["results"]) == 5
+    assert route.call_count == 2
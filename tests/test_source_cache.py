@@ -0,0 +1,95 @@
+"""Tests for the conditional-GET source cache and the conversion-result cache."""
+import pytest
+import respx
+from httpx import Response
+
+import server
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"x" * 64
+
+
+@pytest.fixture(autouse=True)
+def _no_doctype_lookup(monkeypatch):
+    monkeypatch.setattr(server, "PREFLIGHT_DOCTYPE", False)
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_not_modified_source_reuses_cached_conversion():
+    """A 304 skips the download and answers from the result cache."""
+    remote_url = "https://example.com/photo.png"
+    source_route = respx.get(remote_url).mock(
+        side_effect=[
+            Response(200, content=PNG, headers={"content-type": "image/png", "etag": '"v1"'}),
+            Response(304, headers={"etag": '"v1"'}),
+        ]
+    )
+    convert_route = respx.post(server.BASE_URL).mock(
+        return_value=Response(200, content=b"converted", headers={"content-type": "image/webp"})
+    )
+
+    first = await server._convert_url_impl(apiKey="k", apiSecret="s", url=remote_url, outfmt="webp")
+    second = await server._convert_url_impl(apiKey="k", apiSecret="s", url=remote_url, outfmt="webp")
+
+    assert first.data == second.data == b"converted"
+    assert source_route.calls[1].request.headers["if-none-match"] == '"v1"'
+    assert convert_route.call_count == 1
+    counters = server._metrics.snapshot()["counters"]
+    assert counters["source_cache_revalidated_total"] == 1
+    assert counters["cache_hits_total.result"] == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_not_modified_source_with_new_options_converts_cached_bytes():
+    """Different options on a revalidated source re-convert the cached bytes."""
+    remote_url = "https://example.com/photo.png"
+    respx.get(remote_url).mock(
+        side_effect=[
+            Response(200, content=PNG, headers={"content-type": "image/png", "last-modified": "Tue, 01 Sep 2026 10:00:00 GMT"}),
+            Response(304),
+        ]
+    )
+    convert_route = respx.post(server.BASE_URL).mock(
+        return_value=Response(200, content=b"converted", headers={"content-type": "image/webp"})
+    )
+
+    await server._convert_url_impl(apiKey="k", apiSecret="s", url=remote_url, outfmt="webp")
+    await server._convert_url_impl(apiKey="k", apiSecret="s", url=remote_url, outfmt="webp", width=100)
+
+    assert convert_route.call_count == 2
+    first_body, second_body = (call.request.content for call in convert_route.calls)
+    assert server.json.loads(first_body)["DocData"] == server.json.loads(second_body)["DocData"]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_fetch_headers_are_part_of_the_source_key():
+    """A source fetched with different headers is not revalidated against another entry."""
+    remote_url = "https://example.com/private.png"
+    source_route = respx.get(remote_url).mock(
+        return_value=Response(200, content=PNG, headers={"content-type": "image/png", "etag": '"v1"'})
+    )
+    respx.post(server.BASE_URL).mock(return_value=Response(200, json={"status": "ok"}))
+
+    await server._convert_url_impl(apiKey="k", apiSecret="s", url=remote_url, outfmt="png", fetchHeaders={"Authorization": "a"})
+    await server._convert_url_impl(apiKey="k", apiSecret="s", url=remote_url, outfmt="png", fetchHeaders={"Authorization": "b"})
+
+    assert "if-none-match" not in source_route.calls[1].request.headers
+
+
+def test_lru_cache_evicts_oldest_entries_by_size():
+    """Entries beyond the byte limit push out the least recently used ones."""
+    cache = server._LRUCache("test", max_bytes=100, max_entry_bytes=60)
+
+    cache.put("a", "A", 40)
+    cache.put("b", "B", 40)
+    assert cache.get("a") == "A"
+    cache.put("c", "C", 40)
+    cache.put("huge", "H", 80)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.get("huge") is None
+    assert cache.bytes_used == 80
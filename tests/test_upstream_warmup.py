@@ -0,0 +1,125 @@
+"""Tests for the DNS cache and upstream connection prewarming."""
+import asyncio
+
+import httpcore
+import pytest
+import respx
+from httpx import Response
+
+import server
+
+
+class _RecordingBackend(httpcore.AsyncNetworkBackend):
+    def __init__(self, refuse=()):
+        self.refuse = set(refuse)
+        self.connected = []
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        self.connected.append(host)
+        if host in self.refuse:
+            raise httpcore.ConnectError(f"refused {host}")
+        return object()
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        raise NotImplementedError
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls = []
+
+    async def fake_getaddrinfo(loop, host, port, **kwargs):
+        calls.append(host)
+        return [(None, None, None, "", ("10.0.0.1", port)), (None, None, None, "", ("10.0.0.2", port))]
+
+    monkeypatch.setattr(asyncio.BaseEventLoop, "getaddrinfo", fake_getaddrinfo)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_resolved_addresses_are_cached_until_ttl(monkeypatch, lookups):
+    """Repeat connections reuse the cached lookup until DNS_CACHE_SECONDS passes."""
+    backend = server._CachingNetworkBackend(_RecordingBackend())
+
+    await backend.connect_tcp("dapp.tweekit.io", 443)
+    await backend.connect_tcp("dapp.tweekit.io", 443)
+    assert lookups == ["dapp.tweekit.io"]
+
+    monkeypatch.setattr(server, "DNS_CACHE_SECONDS", 0)
+    backend._cache.clear()
+    await backend.connect_tcp("dapp.tweekit.io", 443)
+    await backend.connect_tcp("dapp.tweekit.io", 443)
+    assert len(lookups) == 3
+
+
+@pytest.mark.asyncio
+async def test_cache_is_bounded_and_drops_expired_names(monkeypatch, lookups):
+    """Least recently used names are evicted past the cap, and expired ones on lookup."""
+    monkeypatch.setattr(server, "DNS_CACHE_MAX_HOSTS", 2)
+    backend = server._CachingNetworkBackend(_RecordingBackend())
+
+    for host in ("a.example", "b.example", "a.example", "c.example"):
+        await backend.connect_tcp(host, 443)
+    assert list(backend._cache) == ["a.example", "c.example"]
+
+    backend._cache["a.example"] = (0.0, ["10.0.0.9"])
+    await backend.connect_tcp("a.example", 443)
+    assert backend._cache["a.example"][1] == ["10.0.0.1", "10.0.0.2"]
+    assert lookups == ["a.example", "b.example", "c.example", "a.example"]
+
+
+def test_only_the_upstream_pool_caches_dns():
+    """Egress connections resolve every time, so arbitrary fetched hosts never fill the cache."""
+    upstream = server._HostLimitedTransport("upstream", 4, 4, cache_dns=True)
+    egress = server._HostLimitedTransport("egress", 4, 4)
+
+    assert isinstance(upstream._transport._pool._network_backend, server._CachingNetworkBackend)
+    assert not isinstance(egress._transport._pool._network_backend, server._CachingNetworkBackend)
+
+
+@pytest.mark.asyncio
+async def test_unreachable_address_falls_through_and_failure_evicts(lookups):
+    """The next cached address is tried, and a host with no reachable address is resolved again."""
+    inner = _RecordingBackend(refuse={"10.0.0.1"})
+    backend = server._CachingNetworkBackend(inner)
+
+    await backend.connect_tcp("dapp.tweekit.io", 443)
+    assert inner.connected == ["10.0.0.1", "10.0.0.2"]
+
+    inner.refuse.add("10.0.0.2")
+    with pytest.raises(httpcore.ConnectError):
+        await backend.connect_tcp("dapp.tweekit.io", 443)
+    assert "dapp.tweekit.io" not in backend._cache
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_prewarm_opens_configured_number_of_connections(monkeypatch):
+    """Warming sends one concurrent version request per connection to keep open."""
+    monkeypatch.setattr(server, "_clients", {})
+    monkeypatch.setattr(server, "UPSTREAM_PREWARM_CONNECTIONS", 3)
+    route = respx.get(f"{server.BASE_URL}version").mock(return_value=Response(200, text="1.0"))
+
+    warmed = await server._warm_upstream()
+
+    assert warmed == 3
+    assert route.call_count == 3
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_background_services_keep_upstream_warm(monkeypatch):
+    """The warm-up repeats every keepalive interval while the server runs."""
+    monkeypatch.setattr(server, "_clients", {})
+    monkeypatch.setattr(server, "UPSTREAM_PREWARM_CONNECTIONS", 1)
+    monkeypatch.setattr(server, "UPSTREAM_KEEPALIVE_SECONDS", 0.01)
+    monkeypatch.setattr(server, "METRICS_DIR", "")
+    route = respx.get(f"{server.BASE_URL}version").mock(return_value=Response(200, text="1.0"))
+
+    async with server._background_services():
+        await asyncio.sleep(0.3)
+
+    assert route.call_count >= 3
@@ -0,0 +1,101 @@
+"""Tests for multi-worker mode and per-worker metrics aggregation."""
+import json
+import os
+import sys
+import time
+
+import pytest
+from fastmcp import Client
+
+import server
+
+
+def test_collect_metrics_merges_worker_snapshots(monkeypatch, tmp_path):
+    """Sibling snapshots are summed into the totals; lag and utilization gauges take the maximum."""
+    monkeypatch.setattr(server, "METRICS_DIR", str(tmp_path))
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+    server._metrics.incr("tool_calls_total.convert", 2)
+    server._metrics.gauge("pool_utilization.upstream", 0.6)
+    server._metrics.gauge("event_loop_lag_ewma_ms", 4.0)
+
+    sibling = {
+        "pid": 999999,
+        "timestamp": time.time(),
+        "counters": {"tool_calls_total.convert": 3},
+        "gauges": {"tool_calls_in_flight": 1, "pool_utilization.upstream": 0.6, "event_loop_lag_ewma_ms": 9.0},
+        "summaries": {},
+    }
+    (tmp_path / "worker-999999.json").write_text(json.dumps(sibling))
+    stale = dict(sibling, pid=888888, timestamp=time.time() - 3600)
+    (tmp_path / "worker-888888.json").write_text(json.dumps(stale))
+
+    collected = server._collect_metrics()
+
+    assert collected["workerCount"] == 2
+    assert set(collected["workers"]) == {str(os.getpid()), "999999"}
+    assert collected["totals"]["counters"]["tool_calls_total.convert"] == 5
+    assert collected["totals"]["gauges"]["tool_calls_in_flight"] == 1
+    assert collected["totals"]["gauges"]["pool_utilization.upstream"] == 0.6
+    assert collected["totals"]["gauges"]["event_loop_lag_ewma_ms"] == 9.0
+
+
+@pytest.mark.asyncio
+async def test_background_services_flush_and_clean_up_snapshot(monkeypatch, tmp_path):
+    """Each worker writes its own snapshot while running and removes it on shutdown."""
+    monkeypatch.setattr(server, "METRICS_DIR", str(tmp_path))
+    monkeypatch.setattr(server, "UPSTREAM_PREWARM_CONNECTIONS", 0)
+    snapshot_path = tmp_path / f"worker-{os.getpid()}.json"
+
+    async with server._background_services():
+        for _ in range(50):
+            if snapshot_path.exists():
+                break
+            await server.asyncio.sleep(0.01)
+        assert json.loads(snapshot_path.read_text())["pid"] == os.getpid()
+
+    assert not snapshot_path.exists()
+
+
+@pytest.mark.asyncio
+async def test_tool_calls_are_counted(monkeypatch):
+    """The metrics middleware records calls made through the MCP protocol."""
+    monkeypatch.setattr(server, "_metrics", server._Metrics())
+    monkeypatch.delenv("TWEEKIT_API_KEY", raising=False)
+    monkeypatch.delenv("TWEEKIT_API_SECRET", raising=False)
+
+    async with Client(server.mcp) as client:
+        await client.call_tool("doctype", {})
+
+    snapshot = server._metrics.snapshot()
+    assert snapshot["counters"]["tool_calls_total.doctype"] == 1
+    assert snapshot["gauges"]["tool_calls_in_flight"] == 0
+    assert snapshot["summaries"]["tool_latency_ms.doctype"]["count"] == 1
+
+
+def test_workers_require_streamable_http(monkeypatch):
+    """--workers > 1 is rejected for the stdio transport."""
+    monkeypatch.setattr(sys, "argv", ["server.py", "--transport", "stdio", "--workers", "2"])
+
+    with pytest.raises(SystemExit):
+        server._parse_args()
+
+
+def test_run_workers_bounds_shutdown_and_removes_its_temporary_directories(monkeypatch, tmp_path):
+    """Workers get a graceful shutdown window, and directories created for them are deleted."""
+    monkeypatch.setenv("TWEEKIT_METRICS_DIR", "")
+    monkeypatch.setenv("TWEEKIT_ARTIFACT_DIR", str(tmp_path))
+    seen = {}
+
+    def fake_run(app, **kwargs):
+        seen.update(kwargs, metrics_dir=os.environ["TWEEKIT_METRICS_DIR"])
+        assert os.path.isdir(seen["metrics_dir"])
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(server.uvicorn, "run", fake_run)
+
+    with pytest.raises(KeyboardInterrupt):
+        server._run_workers("127.0.0.1", 8080, 2)
+
+    assert seen["timeout_graceful_shutdown"] == server.WORKER_SHUTDOWN_SECONDS > 0
+    assert not os.path.exists(seen["metrics_dir"])
+    assert tmp_path.is_dir()
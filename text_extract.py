@@ -0,0 +1,164 @@
+"""Incremental text decoding and HTML-to-text/markdown extraction for the `fetch` tool.
+
+`TextStream` is fed raw body chunks as they arrive. Bytes are decoded with an
+incremental decoder, so a multi-byte character split across chunks is handled, and
+HTML can be reduced to readable text or markdown by a streaming `HTMLParser` in the
+same pass. Nothing is buffered beyond the output itself.
+"""
+from __future__ import annotations
+
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+EXTRACT_MODES = ("none", "text", "markdown")
+
+_SKIP_TAGS = frozenset({"script", "style", "noscript", "template", "svg", "head", "iframe", "object"})
+_BLOCK_TAGS = frozenset({
+    "address", "article", "aside", "blockquote", "dd", "div", "dl", "dt", "figcaption", "figure",
+    "footer", "form", "header", "hr", "li", "main", "nav", "ol", "p", "section", "table", "tr", "ul",
+    "h1", "h2", "h3", "h4", "h5", "h6", "pre",
+})
+_VOID_TAGS = frozenset({"br", "hr", "img", "input", "meta", "link", "area", "base", "col", "embed", "source", "wbr"})
+_INLINE_MARKS = {"strong": "**", "b": "**", "em": "*", "i": "*"}
+_WHITESPACE = re.compile(r"\s+")
+_BLANK_LINES = re.compile(r"\n[ \t]*(?:\n[ \t]*)+")
+_TRAILING_SPACE = re.compile(r"[ \t]+\n")
+
+
+def charset_of(content_type: str) -> str:
+    match = re.search(r"charset=[\"']?([\w.:-]+)", content_type or "", re.I)
+    if match:
+        try:
+            return codecs.lookup(match.group(1)).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+class _HTMLExtractor(HTMLParser):
+    def __init__(self, markdown: bool, base_url: str) -> None:
+        super().__init__(convert_charrefs=True)
+        self.markdown = markdown
+        self.base_url = base_url
+        self.parts: List[str] = []
+        self._skip_depth = 0
+        self._pre_depth = 0
+        self._links: List[Tuple[int, Optional[str]]] = []
+        self._list_depth = 0
+
+    def _block(self, separator: str = "\n\n") -> None:
+        if self.parts and not self.parts[-1].endswith(separator):
+            self.parts.append(separator)
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag == "body":
+            # Recover from a <head> that was never closed.
+            self._skip_depth = 0
+            return
+        if tag in _SKIP_TAGS:
+            if tag not in _VOID_TAGS:
+                self._skip_depth += 1
+            return
+        if self._skip_depth:
+            return
+        if tag == "br":
+            self.parts.append("\n")
+            return
+        if tag in ("ul", "ol"):
+            self._list_depth += 1
+        if tag in _BLOCK_TAGS:
+            self._block("\n" if tag == "li" else "\n\n")
+        if tag == "pre":
+            self._pre_depth += 1
+        if not self.markdown:
+            return
+        attributes: Dict[str, Optional[str]] = dict(attrs)
+        if tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            self.parts.append("#" * int(tag[1]) + " ")
+        elif tag == "li":
+            self.parts.append("  " * max(0, self._list_depth - 1) + "- ")
+        elif tag == "pre":
+            self.parts.append("```\n")
+        elif tag == "code" and not self._pre_depth:
+            self.parts.append("`")
+        elif tag in _INLINE_MARKS:
+            self.parts.append(_INLINE_MARKS[tag])
+        elif tag == "hr":
+            self.parts.append("---\n\n")
+        elif tag == "a":
+            self._links.append((len(self.parts), attributes.get("href")))
+        elif tag == "img" and attributes.get("src"):
+            alt = _WHITESPACE.sub(" ", attributes.get("alt") or "").strip()
+            self.parts.append(f"![{alt}]({urljoin(self.base_url, attributes['src'] or '')})")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in _SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+            return
+        if self._skip_depth:
+            return
+        if tag in ("ul", "ol"):
+            self._list_depth = max(0, self._list_depth - 1)
+        if self.markdown:
+            if tag == "pre" and self._pre_depth:
+                self.parts.append("\n```")
+            elif tag == "code" and not self._pre_depth:
+                self.parts.append("`")
+            elif tag in _INLINE_MARKS:
+                self.parts.append(_INLINE_MARKS[tag])
+            elif tag == "a" and self._links:
+                start, href = self._links.pop()
+                text = "".join(self.parts[start:]).strip()
+                if href and text and not href.startswith(("javascript:", "#")):
+                    self.parts[start:] = [f"[{text}]({urljoin(self.base_url, href)})"]
+        if tag == "pre":
+            self._pre_depth = max(0, self._pre_depth - 1)
+        if tag in _BLOCK_TAGS:
+            self._block("\n" if tag == "li" else "\n\n")
+
+    def handle_data(self, data: str) -> None:
+        if self._skip_depth:
+            return
+        if self._pre_depth:
+            self.parts.append(data)
+            return
+        text = _WHITESPACE.sub(" ", data)
+        if text == " " and (not self.parts or self.parts[-1].endswith((" ", "\n"))):
+            return
+        self.parts.append(text)
+
+    def text(self) -> str:
+        joined = "".join(self.parts)
+        joined = _TRAILING_SPACE.sub("\n", joined)
+        return _BLANK_LINES.sub("\n\n", joined).strip()
+
+
+class TextStream:
+    """Decode a text body chunk by chunk, optionally extracting readable HTML text."""
+
+    def __init__(self, content_type: str, extract: str = "none", base_url: str = "") -> None:
+        self._decoder = codecs.getincrementaldecoder(charset_of(content_type))(errors="replace")
+        is_html = "html" in (content_type or "").lower()
+        self._html = _HTMLExtractor(extract == "markdown", base_url) if is_html and extract != "none" else None
+        self._parts: List[str] = []
+
+    def feed(self, chunk: bytes) -> None:
+        text = self._decoder.decode(chunk)
+        if self._html is not None:
+            self._html.feed(text)
+        else:
+            self._parts.append(text)
+
+    def finish(self, complete: bool = True) -> str:
+        """Return the text. With `complete=False` a trailing partial character is dropped."""
+        tail = self._decoder.decode(b"", final=complete)
+        if self._html is None:
+            self._parts.append(tail)
+            return "".join(self._parts)
+        self._html.feed(tail)
+        if complete:
+            self._html.close()
+        return self._html.text()